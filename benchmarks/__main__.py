@@ -0,0 +1,68 @@
+"""
+Microbenchmarks of the request hot path
+
+    python -m benchmarks
+    python -m benchmarks --compare benchmarks/results/<commit>.json
+    python -m benchmarks --filter http
+
+Results are written to benchmarks/results/<commit>.json. With --compare the
+exit code is 1 if any benchmark got slower than --threshold.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the app is imported from a temporary working directory
+sys.path.insert(0, ROOT)
+
+from benchmarks import environment, runner  # noqa: E402
+
+
+async def run(args) -> dict:
+    from benchmarks import cases
+
+    await cases.setup()
+    try:
+        benchmarks = [
+            bench
+            for bench in runner.registered()
+            if not args.filter
+            or args.filter in bench.name
+            or args.filter == bench.group
+        ]
+        return await runner.run(benchmarks, args.rounds)
+    finally:
+        await cases.teardown()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--compare", type=str, default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--filter", type=str, default=None)
+    args = parser.parse_args()
+
+    commit_id = runner.commit()
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{commit_id or 'local'}.json"
+    )
+    output = os.path.abspath(output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    with environment.temporary_config():
+        results = asyncio.run(run(args))
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    runner.save(output, results, commit_id)
+    print(f"\nResults saved to {output}")
+
+    if baseline and runner.compare(baseline, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
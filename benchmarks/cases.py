@@ -0,0 +1,141 @@
+import base64
+import typing
+
+import fastapi
+import httpx
+
+import main
+from charcreator_backend.database import AuthCache
+from charcreator_backend.database.functions.assets import Asset
+from charcreator_backend.database.functions.codes import Code
+from charcreator_backend.database.functions.sessions import Session
+from charcreator_backend.database.functions.users import User
+from charcreator_backend.dependencies import SessionData, must_be_logged_in
+from charcreator_backend.middleware import check_auth
+from charcreator_backend.responses import NOT_LOGGED_IN, trusted_response, validate_trusted
+from charcreator_backend.shared_models import AssetModel, ErrorModel, UserModel
+
+from . import environment
+from .runner import benchmark
+
+USER = User.from_row(environment.USER_ROW)
+USERS = [User.from_row(environment.USER_ROW) for _ in range(100)]
+ASSETS = [Asset.from_row(environment.ASSET_ROW) for _ in range(100)]
+ASSET_URL = "/static/hairstyle/long.png?v=0123456789abcdef"
+DOCS_AUTH = "Basic " + base64.b64encode(
+    b"docs_read:H6AmdL296HeMX094J7AqRQN2OC8TBvtP"
+).decode("utf-8")
+WRONG_DOCS_AUTH = "Basic " + base64.b64encode(b"docs_read:wrong").decode("utf-8")
+SESSION_COOKIE = {"Cookie": f"authorization={environment.SESSION_TOKEN}"}
+
+client: typing.Optional[httpx.AsyncClient] = None
+
+
+@main.app.get("/benchmark/me", response_model=UserModel)
+async def current_user(data: SessionData = fastapi.Depends(must_be_logged_in)):
+    return data.user.to_model()
+
+
+async def setup():
+    """
+    Register the app's routes and connect the in-process client, must be
+    called on the event loop the benchmarks run on
+    """
+    global client
+    environment.install_stub_pool()
+    await main.init_modules()
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://testserver"
+    )
+
+
+async def teardown():
+    await client.aclose()
+
+
+@benchmark("decoding")
+def user_from_row():
+    User.from_row(environment.USER_ROW)
+
+
+@benchmark("decoding")
+def session_from_row():
+    Session.from_row(environment.SESSION_ROW)
+
+
+@benchmark("decoding")
+def code_from_row():
+    Code.from_row(environment.CODE_ROW)
+
+
+@benchmark("models")
+def user_to_model():
+    USER.to_model()
+
+
+@benchmark("models")
+def users_trusted_response_100():
+    trusted_response(
+        validate_trusted([user.model_data() for user in USERS], typing.List[UserModel]),
+        typing.List[UserModel],
+    )
+
+
+@benchmark("models")
+def assets_validate_trusted_100():
+    validate_trusted(
+        [asset.model_data(ASSET_URL) for asset in ASSETS], typing.List[AssetModel]
+    )
+
+
+@benchmark("models")
+def assets_model_construct_100():
+    # the previous way of building trusted models, kept as the baseline of
+    # assets_validate_trusted_100
+    [AssetModel.model_construct(**asset.model_data(ASSET_URL)) for asset in ASSETS]
+
+
+@benchmark("models")
+def error_model_dump_json():
+    ErrorModel(
+        code=401, message="You must be logged in", fields={"field": "authorization"}
+    ).model_dump_json()
+
+
+@benchmark("models")
+def error_model_as_http_exception():
+    ErrorModel(code=401, message="You must be logged in").as_http_exception()
+
+
+@benchmark("models")
+def precomputed_error_as_http_exception():
+    NOT_LOGGED_IN.as_http_exception()
+
+
+@benchmark("middleware")
+def check_auth_valid():
+    check_auth(DOCS_AUTH)
+
+
+@benchmark("middleware")
+def check_auth_invalid():
+    check_auth(WRONG_DOCS_AUTH)
+
+
+@benchmark("http")
+async def logged_in_cached():
+    response = await client.get("/benchmark/me", headers=SESSION_COOKIE)
+    assert response.status_code == 200, response.text
+
+
+@benchmark("http")
+async def logged_in_uncached():
+    AuthCache().clear()
+    response = await client.get("/benchmark/me", headers=SESSION_COOKIE)
+    assert response.status_code == 200, response.text
+
+
+@benchmark("http")
+async def not_logged_in():
+    response = await client.get("/benchmark/me")
+    assert response.status_code == 401, response.text
@@ -0,0 +1,152 @@
+import base64
+import contextlib
+import datetime
+import json
+import os
+import tempfile
+import typing
+
+NOW = datetime.datetime(2024, 10, 1, 12, 0, 0)
+FAR_FUTURE = datetime.datetime(2099, 1, 1)
+
+SESSION_TOKEN = "benchmark-session-token"
+
+USER_ROW = (1, "user@example.com", "$2b$12$" + "a" * 53, NOW, True, False, 0, NOW)
+SESSION_ROW = (1, 1, SESSION_TOKEN, NOW, NOW, FAR_FUTURE)
+CODE_ROW = (1, 1, "email_verification", "123456", NOW, None, FAR_FUTURE)
+ASSET_ROW = (1, "hairstyle/long.png", NOW, NOW, "hairstyle", True, None)
+
+
+def write_config(directory: str, **overrides) -> str:
+    """
+    Write a throwaway config.json, shared with the tests
+
+    :param directory: where to write it
+    :param overrides: top level keys to replace
+    :return: path of the file
+    """
+    config = {
+        "db": {
+            "host": "localhost",
+            "port": 5432,
+            "login": "test",
+            "password": "test",
+            "name": "test",
+        },
+        # the cheapest cost, no case measures hashing
+        "bcrypt_salt": base64.b64encode(b"$2b$04$" + b"a" * 22).decode("utf-8"),
+        "jwt": {
+            "secret": base64.b64encode(os.urandom(32)).decode("utf-8"),
+            "algorithm": "HS256",
+            "expiration": 7 * 24 * 60 * 60,
+        },
+        "mail_send_api": "http://localhost:1",
+        "mail_send_token": "KEY",
+        "outbox": {"enabled": False},
+    }
+    config.update(overrides)
+    path = os.path.join(directory, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+@contextlib.contextmanager
+def temporary_config():
+    """
+    Run with a throwaway config.json in the working directory, the app reads
+    its config from there on import
+    """
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        write_config(
+            directory,
+            logging={"levels": {"": "ERROR", "cc": "ERROR"}},
+            # keep the timing, never log
+            query_log={"slow_threshold": 3600},
+        )
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous)
+
+
+class StubTransaction:
+    async def start(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class StubConnection:
+    """
+    Answers the statements used on the request path with canned rows
+    """
+
+    def __init__(self):
+        from charcreator_backend.database.functions.sessions import sessions
+        from charcreator_backend.database.functions.users import users
+
+        self.rows: typing.Dict[str, typing.Any] = {
+            sessions.GET_SESSION.name: SESSION_ROW,
+            sessions.GET_SESSION_WITH_USER.name: SESSION_ROW + USER_ROW,
+            users.GET_USER.name: USER_ROW,
+        }
+
+    def transaction(self):
+        return StubTransaction()
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return self.rows.get(getattr(query, "name", None))
+
+    async def fetch(self, query, *args, **kwargs):
+        row = await self.fetchrow(query)
+        return [] if row is None else [row]
+
+    async def fetchval(self, query, *args, **kwargs):
+        row = await self.fetchrow(query)
+        return None if row is None else row[0]
+
+    async def execute(self, query, *args, **kwargs):
+        return "UPDATE 1"
+
+    async def executemany(self, query, args, **kwargs):
+        return None
+
+
+class StubPool:
+    """
+    Stands in for the asyncpg pool so requests never leave the process
+    """
+
+    def __init__(self):
+        self.conn = StubConnection()
+
+    async def acquire(self):
+        return self.conn
+
+    async def release(self, conn):
+        pass
+
+    async def close(self):
+        pass
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return 1
+
+    def get_min_size(self):
+        return 1
+
+
+def install_stub_pool():
+    from charcreator_backend.database.transaction_manager import DBPool
+
+    DBPool._instance = StubPool()
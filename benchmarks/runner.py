@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+import typing
+
+# a round is repeated until it takes at least this many seconds
+MIN_ROUND_TIME = 0.02
+
+
+class Benchmark:
+    def __init__(self, name: str, func: typing.Callable, group: str):
+        self.name = name
+        self.func = func
+        self.group = group
+        self.is_async = asyncio.iscoroutinefunction(func)
+
+
+_benchmarks: typing.List[Benchmark] = []
+
+
+def benchmark(group: str):
+    """
+    Register a function as a benchmark. Coroutine functions are awaited on
+    the runner's event loop
+
+    :param group: group shown in the results, e.g. "decoding" or "http"
+    :return: decorator
+    """
+
+    def decorator(func: typing.Callable):
+        _benchmarks.append(Benchmark(func.__name__, func, group))
+        return func
+
+    return decorator
+
+
+def registered() -> typing.List[Benchmark]:
+    return list(_benchmarks)
+
+
+async def _time(bench: Benchmark, iterations: int) -> float:
+    func = bench.func
+    if bench.is_async:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return time.perf_counter() - started
+
+
+async def measure(bench: Benchmark, rounds: int) -> dict:
+    """
+    Run a benchmark and collect per-call timings
+
+    :param bench: benchmark to run
+    :param rounds: number of measured rounds
+    :return: statistics in seconds per call
+    """
+    # warm up caches and find how many calls fill one round
+    iterations = 1
+    while True:
+        elapsed = await _time(bench, iterations)
+        if elapsed >= MIN_ROUND_TIME:
+            break
+        estimate = int(iterations * 1.2 * MIN_ROUND_TIME / max(elapsed, 1e-9))
+        iterations = max(iterations * 2, estimate)
+
+    timings = [await _time(bench, iterations) / iterations for _ in range(rounds)]
+    median = statistics.median(timings)
+    return {
+        "group": bench.group,
+        "iterations": iterations,
+        "rounds": rounds,
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.mean(timings),
+        "stddev": statistics.stdev(timings) if rounds > 1 else 0.0,
+        "ops": 1 / median if median else 0.0,
+    }
+
+
+async def run(benchmarks: typing.List[Benchmark], rounds: int) -> dict:
+    results = {}
+    for bench in benchmarks:
+        results[bench.name] = await measure(bench, rounds)
+        print(
+            f"{bench.group:<10} {bench.name:<40} "
+            f"{results[bench.name]['median'] * 1e6:>10.2f} us"
+        )
+    return results
+
+
+def commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path: str, results: dict, commit_id: typing.Optional[str]):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "commit": commit_id,
+                "created_at": datetime.datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "benchmarks": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+def compare(baseline_path: str, results: dict, threshold: float) -> typing.List[str]:
+    """
+    Compare medians with a previously saved run
+
+    :param baseline_path: results file of the run to compare with
+    :param results: results of this run
+    :param threshold: relative slowdown that counts as a regression, 0.1 is 10%
+    :return: names of regressed benchmarks
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    regressions = []
+    for name, result in results.items():
+        old = baseline["benchmarks"].get(name)
+        if old is None:
+            print(f"  {name:<40} new")
+            continue
+        change = result["median"] / old["median"] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<40} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
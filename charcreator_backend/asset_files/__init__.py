@@ -0,0 +1,18 @@
+from .asset_files import (
+    URL_PREFIX,
+    AssetFiles,
+    FileInfo,
+    FileRangeResponse,
+    file_response,
+    parse_range,
+)
+
+
+__all__ = [
+    "URL_PREFIX",
+    "AssetFiles",
+    "FileInfo",
+    "FileRangeResponse",
+    "file_response",
+    "parse_range",
+]
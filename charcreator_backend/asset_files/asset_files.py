@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import typing
+
+import fastapi
+from starlette.types import Receive, Scope, Send
+
+from ..config import Config
+
+logger = logging.getLogger("cc.asset_files")
+
+URL_PREFIX = "/asset-files"
+
+
+class FileInfo:
+    __slots__ = ("path", "size", "mtime_ns", "digest", "media_type")
+
+    def __init__(self, path: str, size: int, mtime_ns: int, digest: str):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def _hash_file(path: str) -> typing.Optional[FileInfo]:
+    """
+    Blocking, run in a thread
+
+    :return: FileInfo or None if the file doesn't exist
+    """
+    try:
+        stat = os.stat(path)
+        digest = hashlib.blake2b(digest_size=8)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+    return FileInfo(path, stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+
+class AssetFiles:
+    """
+    Content hashes of the asset image files, used for fingerprinted URLs and
+    strong ETags.
+
+    All files are hashed once on startup. A file served by its URL is checked
+    with ``os.stat`` and hashed again when its size or mtime has changed, so
+    files replaced on disk get a new URL without a restart.
+    """
+
+    _instance: typing.Optional["AssetFiles"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config().asset_files
+        self.directory: str = os.path.realpath(config.directory)
+        self.max_age: int = config.max_age
+        self.chunk_size: int = config.chunk_size
+        self._files: typing.Dict[str, FileInfo] = {}
+        # changes whenever any URL changes, part of the catalog ETag
+        self.version = 0
+        self.initialized = True
+
+    def resolve(self, file_name: str) -> typing.Optional[str]:
+        """
+        Path of an asset file, None if the name points outside the directory
+        """
+        path = os.path.realpath(os.path.join(self.directory, file_name))
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            return None
+        return path
+
+    async def scan(self):
+        """
+        Hash every file in the directory
+
+        :return: None
+        """
+        files = await asyncio.to_thread(self._scan)
+        self._files = files
+        self.version += 1
+        logger.info("Hashed %d asset files", len(files))
+
+    def _scan(self) -> typing.Dict[str, FileInfo]:
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                info = _hash_file(path)
+                if info is not None:
+                    files[os.path.relpath(path, self.directory)] = info
+        return files
+
+    async def refresh(self, file_name: str) -> typing.Optional[FileInfo]:
+        """
+        Hash a file again, e.g. after it has been written
+
+        :param file_name: name relative to the directory
+        :return: FileInfo or None if the file doesn't exist
+        """
+        path = self.resolve(file_name)
+        info = await asyncio.to_thread(_hash_file, path) if path else None
+        previous = self._files.pop(file_name, None)
+        if info is not None:
+            self._files[file_name] = info
+        previous_digest = previous.digest if previous is not None else None
+        if previous_digest != (info.digest if info is not None else None):
+            self.version += 1
+        return info
+
+    async def get(self, file_name: str) -> typing.Optional[FileInfo]:
+        """
+        Up-to-date information about a file
+
+        :param file_name: name relative to the directory
+        :return: FileInfo or None if the file doesn't exist
+        """
+        info = self._files.get(file_name)
+        if info is not None:
+            try:
+                stat = os.stat(info.path)
+            except FileNotFoundError:
+                return await self.refresh(file_name)
+            if stat.st_size == info.size and stat.st_mtime_ns == info.mtime_ns:
+                return info
+        return await self.refresh(file_name)
+
+    def url(self, file_name: str) -> typing.Optional[str]:
+        """
+        Fingerprinted URL of a file, it changes whenever the content does
+
+        :param file_name: name relative to the directory
+        :return: URL path or None if the file is unknown
+        """
+        info = self._files.get(file_name)
+        if info is None:
+            return None
+        return f"{URL_PREFIX}/{info.digest}/{file_name}"
+
+
+def parse_range(
+        header: typing.Optional[str], size: int
+) -> typing.Union[None, typing.Tuple[int, int], bool]:
+    """
+    Parse a Range header with a single byte range
+
+    :param header: value of the Range header
+    :param size: size of the file
+    :return: None to send the whole file, (start, end) inclusive,
+        False if the range can't be satisfied
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        # no range, other units or multiple ranges: the whole file is a valid answer
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start:
+            # last N bytes
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        first = int(start)
+        last = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if first >= size or last < first:
+        return False
+    return first, min(last, size - 1)
+
+
+class FileRangeResponse(fastapi.Response):
+    """
+    Sends a file or a byte range of it without reading it into memory.
+
+    When the server supports the ASGI ``http.response.pathsend`` or
+    ``http.response.zerocopysend`` extension the file is handed to the
+    server, which can use sendfile. Otherwise it is read in chunks in a
+    thread and streamed.
+    """
+
+    def __init__(
+        self,
+        info: FileInfo,
+        start: int,
+        end: int,
+        status_code: int,
+        headers: typing.Dict[str, str],
+        send_body: bool = True,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.info = info
+        self.start = start
+        self.length = end - start + 1 if end >= start else 0
+        self.send_body = send_body
+        self.chunk_size = chunk_size
+        super().__init__(
+            content=b"",
+            status_code=status_code,
+            headers={**headers, "content-length": str(self.length)},
+            media_type=info.media_type,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        whole_file = self.start == 0 and self.length == self.info.size
+        if whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": self.info.path})
+            return
+
+        with open(self.info.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": self.start,
+                        "count": self.length,
+                    }
+                )
+                return
+
+            await asyncio.to_thread(f.seek, self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    # the file was truncated while being sent
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def file_response(
+        info: FileInfo,
+        method: str,
+        max_age: int,
+        if_none_match: typing.Optional[str] = None,
+        if_range: typing.Optional[str] = None,
+        range_header: typing.Optional[str] = None,
+        chunk_size: int = 64 * 1024,
+) -> fastapi.Response:
+    """
+    Response for an immutable file: strong ETag, conditional and range
+    requests
+
+    :param info: file to send, its digest is the ETag
+    :param method: request method, nothing is sent for HEAD
+    :param max_age: Cache-Control max-age in seconds
+    :param if_none_match: value of the If-None-Match header
+    :param if_range: value of the If-Range header
+    :param range_header: value of the Range header
+    :param chunk_size: read size when the server can't send files by itself
+    :return: 200, 206, 304 or 416 response
+    """
+    headers = {
+        "ETag": info.etag,
+        "Cache-Control": f"public, max-age={max_age}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or info.etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return fastapi.Response(status_code=fastapi.status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # a range of an outdated representation is useless, send the whole file
+    byte_range = parse_range(range_header, info.size) if if_range in (None, info.etag) else None
+    if byte_range is False:
+        return fastapi.Response(
+            status_code=fastapi.status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{info.size}"},
+        )
+    if byte_range is None:
+        start, end, status_code = 0, info.size - 1, fastapi.status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = fastapi.status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+
+    return FileRangeResponse(
+        info,
+        start,
+        end,
+        status_code,
+        headers,
+        send_body=method != "HEAD",
+        chunk_size=chunk_size,
+    )
@@ -0,0 +1,14 @@
+from .asset_upload import AssetUploads, UploadJob, UploadOutcome
+from .multipart_stream import StagedFile, stream_files
+from .variants import make_variants, variant_names
+
+
+__all__ = [
+    "AssetUploads",
+    "UploadJob",
+    "UploadOutcome",
+    "StagedFile",
+    "stream_files",
+    "make_variants",
+    "variant_names",
+]
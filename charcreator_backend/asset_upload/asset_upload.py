@@ -0,0 +1,241 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import re
+import typing
+
+from ..asset_files import AssetFiles
+from ..config import Config
+from ..database import TransactionManager
+from ..database.functions.assets import Asset, AssetType
+from .multipart_stream import StagedFile
+from .variants import make_variants
+
+logger = logging.getLogger("cc.asset_upload")
+
+SAFE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+IMAGE_EXTENSIONS = (".png", ".webp", ".jpg", ".jpeg")
+
+
+class UploadOutcome(typing.NamedTuple):
+    # name sent by the client
+    filename: str
+    file_name: typing.Optional[str] = None
+    asset: typing.Optional[Asset] = None
+    # file names of the variants relative to the asset files directory
+    variants: typing.Tuple[str, ...] = ()
+    error: typing.Optional[str] = None
+
+
+class UploadJob:
+    """
+    Queued staged file, ``future`` gets its UploadOutcome
+    """
+
+    __slots__ = ("staged", "colorable", "future", "started")
+
+    def __init__(self, staged: StagedFile, colorable: bool, future: asyncio.Future):
+        self.staged = staged
+        self.colorable = colorable
+        self.future = future
+        self.started = False
+
+    def cancel(self) -> bool:
+        """
+        Drop the job if no worker has taken it yet
+
+        :return: whether the job was dropped
+        """
+        if self.started:
+            return False
+        return self.future.cancel()
+
+
+def _discard(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class AssetUploads:
+    """
+    Turns staged uploads into assets: checks the image, writes the WebP
+    variants on a process pool, moves the file into the asset files
+    directory and inserts or updates the assets row.
+
+    Files wait in a bounded queue for one of ``workers`` tasks. ``submit``
+    waits while the queue is full, so an upload handler stops reading the
+    body instead of staging a whole art drop at once.
+    """
+
+    _instance: typing.Optional["AssetUploads"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        self.config = Config().asset_upload
+        self._queue: typing.Optional[asyncio.Queue] = None
+        self._tasks: typing.List[asyncio.Task] = []
+        self._executor: typing.Optional[concurrent.futures.Executor] = None
+        # files with the same name are processed one at a time,
+        # file name -> [lock, number of jobs using it]
+        self._locks: typing.Dict[str, list] = {}
+        self._unique_file_name = True
+        self.initialized = True
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.config.workers
+            )
+        return self._executor
+
+    async def start(self):
+        if self._tasks:
+            return
+        async with TransactionManager(readonly=True) as transaction_manager:
+            self._unique_file_name = (
+                await transaction_manager.functions.assets.has_unique_file_name()
+            )
+        if not self._unique_file_name:
+            logger.error(
+                "assets.file_name has no unique index, uploads of one file from "
+                "several processes may create duplicates. "
+                "Run python -m charcreator_backend.database"
+            )
+        self._queue = asyncio.Queue(maxsize=self.config.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._run()) for _ in range(self.config.workers)
+        ]
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # nobody will process the files left in the queue
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            _discard(job.staged.path)
+            if not job.future.done():
+                job.future.set_result(
+                    UploadOutcome(job.staged.filename, error="Server is shutting down")
+                )
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, staged: StagedFile, colorable: bool) -> UploadJob:
+        """
+        Queue a staged file, waits while the queue is full
+
+        :param staged: uploaded file, the form field name is the asset type
+        :param colorable: whether the asset can be recolored
+        :return: queued job, its future gets the UploadOutcome
+        """
+        job = UploadJob(staged, colorable, asyncio.get_running_loop().create_future())
+        await self._queue.put(job)
+        return job
+
+    async def _run(self):
+        while True:
+            job: UploadJob = await self._queue.get()
+            staged, future = job.staged, job.future
+            if future.cancelled():
+                await asyncio.to_thread(_discard, staged.path)
+                self._queue.task_done()
+                continue
+            job.started = True
+            try:
+                outcome = await self.process(staged, job.colorable)
+            except asyncio.CancelledError:
+                _discard(staged.path)
+                if not future.done():
+                    future.set_result(UploadOutcome(staged.filename, error="Server is shutting down"))
+                raise
+            except Exception as e:
+                logger.error("Asset upload %s failed", staged.filename)
+                logger.exception(e)
+                outcome = UploadOutcome(staged.filename, error="Internal error")
+            finally:
+                self._queue.task_done()
+            if not future.done():
+                future.set_result(outcome)
+
+    async def process(self, staged: StagedFile, colorable: bool) -> UploadOutcome:
+        """
+        Make an asset out of a staged file, the staged file is removed
+
+        :param staged: uploaded file, the form field name is the asset type
+        :param colorable: whether the asset can be recolored
+        :return: UploadOutcome with the asset or an error
+        """
+        try:
+            return await self._process(staged, colorable)
+        finally:
+            await asyncio.to_thread(_discard, staged.path)
+
+    async def _process(self, staged: StagedFile, colorable: bool) -> UploadOutcome:
+        try:
+            asset_type = AssetType(staged.field_name)
+        except ValueError:
+            return UploadOutcome(staged.filename, error="Unknown asset type")
+
+        name = os.path.basename(staged.filename.replace("\\", "/"))
+        if not SAFE_NAME.match(name) or not name.lower().endswith(IMAGE_EXTENSIONS):
+            return UploadOutcome(staged.filename, error="Unsupported file name")
+
+        file_name = f"{asset_type.value}/{name}"
+        entry = self._locks.setdefault(file_name, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._store(staged, file_name, asset_type, colorable)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[file_name]
+
+    async def _store(
+            self,
+            staged: StagedFile,
+            file_name: str,
+            asset_type: AssetType,
+            colorable: bool,
+    ) -> UploadOutcome:
+        files = AssetFiles()
+        destination = files.resolve(file_name)
+        try:
+            paths = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                make_variants,
+                staged.path,
+                destination,
+                self.config.variant_sizes,
+                self.config.webp_quality,
+            )
+        except Exception as e:
+            logger.info("Rejected upload %s: %s", staged.filename, e)
+            return UploadOutcome(staged.filename, file_name, error="Not a valid image")
+
+        async with TransactionManager() as transaction_manager:
+            asset = await transaction_manager.functions.assets.upsert(
+                file_name, asset_type, colorable, self._unique_file_name
+            )
+
+        variants = tuple(os.path.relpath(path, files.directory) for path in paths)
+        for uploaded in (file_name, *variants):
+            await files.refresh(uploaded)
+        logger.info("Uploaded asset %d from %s", asset.id, file_name)
+        return UploadOutcome(staged.filename, file_name, asset, variants)
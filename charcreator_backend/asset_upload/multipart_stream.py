@@ -0,0 +1,152 @@
+import asyncio
+import os
+import tempfile
+import typing
+
+import fastapi
+from multipart.multipart import MultipartParser, parse_options_header
+
+from ..shared_models import ErrorModel
+
+
+class StagedFile(typing.NamedTuple):
+    # name of the form field
+    field_name: str
+    # file name sent by the client, not sanitized
+    filename: str
+    path: str
+    size: int
+
+
+class _Part:
+    def __init__(self, field_name: str, filename: str, directory: str):
+        self.field_name = field_name
+        self.filename = filename
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        self.file = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _too_large(message: str, **fields) -> fastapi.HTTPException:
+    return ErrorModel(
+        code=fastapi.status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        message=message,
+        fields=fields,
+    ).as_http_exception()
+
+
+async def stream_files(
+        request: fastapi.Request,
+        directory: str,
+        max_file_size: int,
+        max_files: int,
+) -> typing.AsyncIterator[StagedFile]:
+    """
+    Read a multipart/form-data body and write its files to disk chunk by
+    chunk as they arrive.
+
+    A file is yielded as soon as its part ends. The body is not read while
+    the caller handles it, so a slow consumer slows the upload down instead
+    of buffering it. The caller owns the yielded files and must move or
+    delete them. Fields without a file name are skipped.
+
+    :param request: request with a multipart body, the body must not have
+        been read yet
+    :param directory: directory for the staged files
+    :param max_file_size: maximum size of one file in bytes
+    :param max_files: maximum number of files in the body
+    :return: staged files in the order of the body
+    :raise: ErrorModel(code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE) if the body is not multipart,
+        ErrorModel(code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE) if a limit is exceeded
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ErrorModel(
+            code=fastapi.status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            message="Expected a multipart/form-data body",
+        ).as_http_exception()
+
+    # the parser calls back synchronously, the events are handled after each write
+    events: typing.List[typing.Tuple[str, bytes]] = []
+
+    def on_data(kind: str):
+        def callback(data: bytes, start: int, end: int):
+            # the buffer is reused by the parser
+            events.append((kind, data[start:end]))
+
+        return callback
+
+    def on_event(kind: str):
+        return lambda: events.append((kind, b""))
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_event("part_begin"),
+            "on_part_data": on_data("part_data"),
+            "on_part_end": on_event("part_end"),
+            "on_header_field": on_data("header_field"),
+            "on_header_value": on_data("header_value"),
+            "on_header_end": on_event("header_end"),
+            "on_headers_finished": on_event("headers_finished"),
+        },
+    )
+
+    os.makedirs(directory, exist_ok=True)
+    headers: typing.Dict[bytes, bytes] = {}
+    header_field = header_value = b""
+    part: typing.Optional[_Part] = None
+    files = 0
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            batch = events[:]
+            events.clear()
+            for kind, data in batch:
+                if kind == "part_begin":
+                    headers = {}
+                elif kind == "header_field":
+                    header_field += data
+                elif kind == "header_value":
+                    header_value += data
+                elif kind == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field = header_value = b""
+                elif kind == "headers_finished":
+                    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                    if b"filename" not in options:
+                        continue
+                    files += 1
+                    if files > max_files:
+                        raise _too_large("Too many files", max_files=max_files)
+                    part = await asyncio.to_thread(
+                        _Part,
+                        options.get(b"name", b"").decode("utf-8", "replace"),
+                        options[b"filename"].decode("utf-8", "replace"),
+                        directory,
+                    )
+                elif kind == "part_data" and part is not None:
+                    part.size += len(data)
+                    if part.size > max_file_size:
+                        raise _too_large(
+                            "File is too large",
+                            filename=part.filename,
+                            max_file_size=max_file_size,
+                        )
+                    await asyncio.to_thread(part.file.write, data)
+                elif kind == "part_end" and part is not None:
+                    await asyncio.to_thread(part.file.close)
+                    staged = StagedFile(part.field_name, part.filename, part.path, part.size)
+                    part = None
+                    yield staged
+        parser.finalize()
+    finally:
+        if part is not None:
+            part.discard()
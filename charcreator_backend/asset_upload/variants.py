@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import typing
+
+from PIL import Image
+
+
+def variant_names(
+        file_name: str, sizes: typing.Iterable[int]
+) -> typing.Dict[typing.Optional[int], str]:
+    """
+    Names of the variants of an asset file: a full size WebP, unless the file
+    is a WebP itself, and a WebP per size, e.g. hairstyle/long@full.webp and
+    hairstyle/long@128.webp. Uploaded file names can't contain "@", so a
+    variant never takes the name of another asset
+
+    :param file_name: Asset.file_name
+    :param sizes: longest sides of the resized variants
+    :return: names relative to the asset files directory by size, None is
+        the full size
+    """
+    stem, extension = os.path.splitext(file_name)
+    names: typing.Dict[typing.Optional[int], str] = {}
+    if extension.lower() != ".webp":
+        names[None] = f"{stem}@full.webp"
+    for size in sizes:
+        names[size] = f"{stem}@{size}.webp"
+    return names
+
+
+def _save(image: Image.Image, path: str, quality: int):
+    # a half written variant is never served
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, "WEBP", quality=quality)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _move(source: str, destination: str):
+    try:
+        os.replace(source, destination)
+        return
+    except OSError:
+        # the staging directory is on another file system
+        pass
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(destination), prefix=".")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, temporary)
+        os.replace(temporary, destination)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    os.unlink(source)
+
+
+def make_variants(
+        staged_path: str,
+        destination: str,
+        sizes: typing.List[int],
+        quality: int,
+) -> typing.List[str]:
+    """
+    Check that an uploaded file is an image, write its variants next to the
+    destination and move the file there.
+
+    Module-level so that it can be sent to a process pool.
+
+    :param staged_path: uploaded file
+    :param destination: path of the asset file
+    :param sizes: longest sides of the resized variants
+    :param quality: WebP quality
+    :return: paths of the variants
+    :raise: PIL.UnidentifiedImageError if the file is not an image
+    """
+    with Image.open(staged_path) as image:
+        # decodes the whole file, truncated uploads fail here
+        image.load()
+        image = image.convert("RGBA")
+
+    directory = os.path.dirname(destination)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size, name in variant_names(os.path.basename(destination), sizes).items():
+        variant = image
+        if size is not None:
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+        path = os.path.join(directory, name)
+        _save(variant, path, quality)
+        paths.append(path)
+
+    _move(staged_path, destination)
+    return paths
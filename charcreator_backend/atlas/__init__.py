@@ -0,0 +1,18 @@
+from .atlas import (
+    MANIFEST_NAME,
+    Placement,
+    build_atlases,
+    manifest_name,
+    pack,
+    read_manifest,
+)
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "Placement",
+    "build_atlases",
+    "manifest_name",
+    "pack",
+    "read_manifest",
+]
@@ -0,0 +1,41 @@
+"""
+Build sprite atlases and the manifest of the asset catalog
+
+    python -m charcreator_backend.atlas
+    python -m charcreator_backend.atlas --force
+
+Reads config.json from the working directory, like main.py. Only the asset
+types whose assets were added, removed or modified since the previous build
+are packed again. Atlases and the gzipped manifest are written into the
+asset files directory, a running app picks them up by themselves.
+"""
+import argparse
+import asyncio
+import logging
+
+from ..database.transaction_manager import TransactionManager
+from .atlas import build_atlases, manifest_name
+
+
+async def run(force: bool) -> dict:
+    async with TransactionManager(no_save=True, readonly=True) as transaction_manager:
+        assets = await transaction_manager.functions.assets.list_all()
+    return await build_atlases(assets, force=force)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m charcreator_backend.atlas")
+    parser.add_argument("--force", action="store_true", help="rebuild every asset type")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)-8s %(name)s - %(message)s")
+    logging.getLogger("cc").setLevel(logging.INFO)
+
+    manifest = asyncio.run(run(args.force))
+    pages = sum(len(entry["pages"]) for entry in manifest["types"].values())
+    assets = sum(len(entry["assets"]) for entry in manifest["types"].values())
+    print(f"{assets} assets in {pages} atlas pages, manifest: {manifest_name()}")
+
+
+if __name__ == "__main__":
+    main()
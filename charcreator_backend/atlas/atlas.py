@@ -0,0 +1,275 @@
+import asyncio
+import copy
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import typing
+
+from PIL import Image
+
+from ..asset_files import AssetFiles
+from ..config import Config
+from ..config.config import AtlasConfig
+from ..database.functions.assets import Asset, AssetType
+from ..responses import dumps
+
+logger = logging.getLogger("cc.atlas")
+
+MANIFEST_NAME = "manifest.json.gz"
+MANIFEST_VERSION = 1
+
+
+class Placement(typing.NamedTuple):
+    page: int
+    x: int
+    y: int
+
+
+def pack(
+        sizes: typing.Sequence[typing.Tuple[int, int]], max_size: int, padding: int
+) -> typing.Tuple[typing.List[Placement], typing.List[typing.Tuple[int, int]]]:
+    """
+    Shelf packing: images sorted by height are put in rows, a row that
+    doesn't fit starts a new page
+
+    :param sizes: (width, height) of the images
+    :param max_size: maximum width and height of a page
+    :param padding: space between images
+    :return: placement of every image in the input order and the (width,
+        height) of every page
+    :raise: ValueError if an image is larger than a page
+    """
+    placements: typing.List[typing.Optional[Placement]] = [None] * len(sizes)
+    pages: typing.List[typing.List[int]] = []
+    x = y = shelf_height = 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        width, height = sizes[i]
+        if width > max_size or height > max_size:
+            raise ValueError(f"Image of {width}x{height} doesn't fit into {max_size}x{max_size}")
+        if pages and x + width > max_size:
+            y += shelf_height + padding
+            x = shelf_height = 0
+        if not pages or y + height > max_size:
+            pages.append([0, 0])
+            x = y = shelf_height = 0
+        placements[i] = Placement(len(pages) - 1, x, y)
+        page = pages[-1]
+        page[0] = max(page[0], x + width)
+        page[1] = max(page[1], y + height)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+    return placements, [(width, height) for width, height in pages]
+
+
+def signature(assets: typing.Iterable[Asset], config: AtlasConfig) -> str:
+    """
+    Changes whenever an asset of the type is added, removed or modified, or
+    the atlas settings change
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{config.max_size}:{config.padding}:{config.format}".encode("utf-8"))
+    for asset in sorted(assets, key=lambda asset: asset.id):
+        digest.update(
+            f"|{asset.id}:{asset.file_name}:{asset.modified_at.isoformat()}".encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _build_pages(
+        asset_type: AssetType,
+        images: typing.List[typing.Tuple[Asset, str]],
+        directory: str,
+        config: AtlasConfig,
+) -> typing.Tuple[typing.List[dict], typing.List[dict]]:
+    """
+    Blocking, run in a thread
+
+    :param images: assets with the paths of their files
+    :param directory: directory of the atlases in the asset files directory
+    :return: pages and asset entries of the manifest, page file names are
+        relative to the asset files directory and contain the hash of the
+        content, so a page is never overwritten with other pixels
+    """
+    sizes = []
+    for _, path in images:
+        with Image.open(path) as image:
+            sizes.append(image.size)
+    placements, page_sizes = pack(sizes, config.max_size, config.padding)
+
+    canvases = [Image.new("RGBA", size, (0, 0, 0, 0)) for size in page_sizes]
+    entries = []
+    for (asset, path), placement, (width, height) in zip(images, placements, sizes):
+        with Image.open(path) as image:
+            canvases[placement.page].paste(image.convert("RGBA"), (placement.x, placement.y))
+        entries.append(
+            {
+                "id": asset.id,
+                "page": placement.page,
+                "x": placement.x,
+                "y": placement.y,
+                "width": width,
+                "height": height,
+                "colorable": asset.colorable,
+                "default_properties": asset.default_properties,
+            }
+        )
+
+    pages = []
+    for number, canvas in enumerate(canvases):
+        output = io.BytesIO()
+        if config.format == "webp":
+            canvas.save(output, "WEBP", lossless=True)
+        else:
+            canvas.save(output, "PNG", optimize=True)
+        data = output.getvalue()
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        file_name = f"{asset_type.value}-{number}-{digest}.{config.format}"
+        path = os.path.join(directory, file_name)
+        if not os.path.exists(path):
+            _write_atomic(path, data)
+        pages.append(
+            {
+                "file": os.path.join(config.directory, file_name),
+                "width": canvas.width,
+                "height": canvas.height,
+            }
+        )
+    return pages, entries
+
+
+def _pages_exist(files: AssetFiles, pages: typing.List[dict]) -> bool:
+    for page in pages:
+        path = files.resolve(page["file"])
+        if path is None or not os.path.isfile(path):
+            return False
+    return True
+
+
+def manifest_name() -> str:
+    """
+    :return: name of the manifest relative to the asset files directory
+    """
+    return os.path.join(Config().atlas.directory, MANIFEST_NAME)
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with gzip.open(path, "rb") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+async def build_atlases(
+        assets: typing.Iterable[Asset], force: bool = False
+) -> typing.Dict[str, typing.Any]:
+    """
+    Pack the images of every asset type into atlases and write the manifest.
+
+    Types whose assets didn't change since the previous build keep their
+    atlases, and the manifest is not rewritten if nothing changed. Pages of
+    the previous build are kept until the next one, so clients holding the
+    previous manifest can still load them.
+
+    :param assets: the whole catalog
+    :param force: rebuild every type
+    :return: the manifest
+    """
+    config = Config().atlas
+    files = AssetFiles()
+    directory = os.path.join(files.directory, config.directory)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(files.directory, manifest_name())
+    previous_manifest = read_manifest(manifest_path)
+    previous = previous_manifest.get("types", {})
+    # the entries of unchanged types are reused and get their URLs refreshed
+    unchanged = copy.deepcopy(previous)
+
+    by_type: typing.Dict[AssetType, typing.List[Asset]] = {
+        asset_type: [] for asset_type in AssetType
+    }
+    for asset in assets:
+        by_type[asset.asset_type].append(asset)
+
+    types = {}
+    for asset_type, assets_of_type in by_type.items():
+        key = signature(assets_of_type, config)
+        entry = previous.get(asset_type.value)
+        if not force and entry is not None and entry["signature"] == key and _pages_exist(
+            files, entry["pages"]
+        ):
+            types[asset_type.value] = entry
+            continue
+
+        images = []
+        for asset in sorted(assets_of_type, key=lambda asset: asset.id):
+            path = files.resolve(asset.file_name)
+            if path is None or not os.path.isfile(path):
+                logger.warning("File %s of asset %d not found, skipped", asset.file_name, asset.id)
+                continue
+            images.append((asset, path))
+        pages, entries = await asyncio.to_thread(
+            _build_pages, asset_type, images, directory, config
+        )
+        current = {page["file"] for page in pages}
+        replaced = [
+            page["file"] for page in (entry or {}).get("pages", []) if page["file"] not in current
+        ]
+        types[asset_type.value] = {
+            "signature": key,
+            "pages": pages,
+            "assets": entries,
+            # pages of the previous build, removed by the next one
+            "retired": replaced,
+        }
+        logger.info(
+            "Built %d atlas pages for %s, %d assets",
+            len(pages),
+            asset_type.value,
+            len(entries),
+        )
+
+        for file_name in (entry or {}).get("retired", []):
+            if file_name in current or file_name in replaced:
+                continue
+            stale = files.resolve(file_name)
+            if stale is not None and os.path.exists(stale):
+                os.remove(stale)
+
+    # fingerprinted URLs, unchanged pages keep theirs
+    for entry in types.values():
+        for page in entry["pages"]:
+            await files.refresh(page["file"])
+            page["url"] = files.url(page["file"])
+
+    if types == unchanged and await files.get(manifest_name()) is not None:
+        # same bytes, same ETag, clients don't download it again
+        return previous_manifest
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.datetime.now(datetime.timezone.utc),
+        "types": types,
+    }
+    _write_atomic(manifest_path, gzip.compress(dumps(manifest), compresslevel=9))
+    await files.refresh(manifest_name())
+    return manifest
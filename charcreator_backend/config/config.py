@@ -13,6 +13,25 @@ class DbConfig:
         self.user: str = data["login"]
         self.password: str = data["password"]
         self.database: str = data["name"]
+        self.min_pool_size: int = data.get("min_pool_size", 10)
+        self.max_pool_size: int = data.get("max_pool_size", 10)
+        self.max_inactive_connection_lifetime: float = data.get(
+            "max_inactive_connection_lifetime", 300.0
+        )
+        self.max_queries: int = data.get("max_queries", 50000)
+        self.command_timeout: typing.Optional[float] = data.get("command_timeout", 30.0)
+        self.statement_cache_size: int = data.get("statement_cache_size", 100)
+        # prepare hot statements on every new connection, disable when running
+        # behind a pooler that doesn't support prepared statements
+        self.prepare_statements: bool = data.get("prepare_statements", True)
+        self.server_settings: typing.Dict[str, str] = data.get(
+            "server_settings",
+            {
+                "application_name": "cc-backend",
+                "jit": "off",
+                "statement_timeout": "30000",
+            },
+        )
 
     def to_save(self):
         return {
@@ -21,6 +40,14 @@ class DbConfig:
             "login": self.user,
             "password": self.password,
             "name": self.database,
+            "min_pool_size": self.min_pool_size,
+            "max_pool_size": self.max_pool_size,
+            "max_inactive_connection_lifetime": self.max_inactive_connection_lifetime,
+            "max_queries": self.max_queries,
+            "command_timeout": self.command_timeout,
+            "statement_cache_size": self.statement_cache_size,
+            "prepare_statements": self.prepare_statements,
+            "server_settings": self.server_settings,
         }
 
 
@@ -37,6 +64,244 @@ class JwtConfig:
             "expiration": self.expiration,
         }
 
+    def decode(self, token: str) -> typing.Optional[dict]:
+        """
+        Verify token's signature and expiration locally
+
+        :param token: JWT token
+        :return: token claims or None if the token is invalid or expired
+        """
+        try:
+            return jwt.decode(
+                token,
+                self.secret,
+                algorithms=[self.algorithm],
+                options={"require": ["exp"]},
+            )
+        except jwt.InvalidTokenError:
+            return None
+
+
+class AuthConfig:
+    def __init__(self, data: dict):
+        self.cache_ttl: float = data.get("cache_ttl", 30)
+        self.cache_size: int = data.get("cache_size", 10000)
+        self.last_used_flush_interval: float = data.get("last_used_flush_interval", 10)
+        self.last_used_max_pending: int = data.get("last_used_max_pending", 10000)
+        # "session" looks every uncached token up in the database,
+        # "jwt" verifies tokens locally and relies on pushed revocations
+        self.mode: str = data.get("mode", "session")
+        self.revocation_filter_bits: int = data.get("revocation_filter_bits", 1 << 20)
+        self.revocation_filter_hashes: int = data.get("revocation_filter_hashes", 4)
+
+    def to_save(self):
+        return {
+            "cache_ttl": self.cache_ttl,
+            "cache_size": self.cache_size,
+            "last_used_flush_interval": self.last_used_flush_interval,
+            "last_used_max_pending": self.last_used_max_pending,
+            "mode": self.mode,
+            "revocation_filter_bits": self.revocation_filter_bits,
+            "revocation_filter_hashes": self.revocation_filter_hashes,
+        }
+
+
+class HashingConfig:
+    def __init__(self, data: dict):
+        # "thread" or "process"
+        self.executor: str = data.get("executor", "thread")
+        self.workers: int = data.get("workers", 4)
+        self.max_queue: int = data.get("max_queue", 64)
+
+    def to_save(self):
+        return {
+            "executor": self.executor,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+        }
+
+
+class MailClientConfig:
+    def __init__(self, data: dict):
+        self.limit: int = data.get("limit", 20)
+        self.limit_per_host: int = data.get("limit_per_host", 10)
+        self.keepalive_timeout: float = data.get("keepalive_timeout", 60)
+        self.dns_cache_ttl: int = data.get("dns_cache_ttl", 300)
+        self.connect_timeout: float = data.get("connect_timeout", 5)
+        self.total_timeout: float = data.get("total_timeout", 15)
+
+    def to_save(self):
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "dns_cache_ttl": self.dns_cache_ttl,
+            "connect_timeout": self.connect_timeout,
+            "total_timeout": self.total_timeout,
+        }
+
+
+class OutboxConfig:
+    def __init__(self, data: dict):
+        self.enabled: bool = data.get("enabled", True)
+        self.poll_interval: float = data.get("poll_interval", 1)
+        self.batch_size: int = data.get("batch_size", 50)
+        self.concurrency: int = data.get("concurrency", 8)
+        self.lease: float = data.get("lease", 60)
+        self.max_attempts: int = data.get("max_attempts", 10)
+        self.backoff_base: float = data.get("backoff_base", 5)
+        self.backoff_max: float = data.get("backoff_max", 3600)
+        self.breaker_threshold: int = data.get("breaker_threshold", 5)
+        self.breaker_reset_timeout: float = data.get("breaker_reset_timeout", 30)
+        self.keep_sent_for: float = data.get("keep_sent_for", 7 * 24 * 60 * 60)
+
+    def to_save(self):
+        return {
+            "enabled": self.enabled,
+            "poll_interval": self.poll_interval,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "lease": self.lease,
+            "max_attempts": self.max_attempts,
+            "backoff_base": self.backoff_base,
+            "backoff_max": self.backoff_max,
+            "breaker_threshold": self.breaker_threshold,
+            "breaker_reset_timeout": self.breaker_reset_timeout,
+            "keep_sent_for": self.keep_sent_for,
+        }
+
+
+class LoggingConfig:
+    def __init__(self, data: dict):
+        # "dev" prints colored text synchronously, "json" is for production
+        self.mode: str = data.get("mode", "dev")
+        # logger name -> level, "" is the root logger
+        self.levels: typing.Dict[str, str] = data.get(
+            "levels", {"": "WARNING", "cc": "DEBUG"}
+        )
+        # logger name -> share of records below WARNING to keep
+        self.sampling: typing.Dict[str, float] = data.get("sampling", {})
+        self.queue_size: int = data.get("queue_size", 10000)
+
+    def to_save(self):
+        return {
+            "mode": self.mode,
+            "levels": self.levels,
+            "sampling": self.sampling,
+            "queue_size": self.queue_size,
+        }
+
+
+class QueryLogConfig:
+    def __init__(self, data: dict):
+        self.enabled: bool = data.get("enabled", True)
+        # statements slower than this many seconds are logged
+        self.slow_threshold: float = data.get("slow_threshold", 0.1)
+        # capture EXPLAIN (ANALYZE, BUFFERS) of the slowest SELECTs, ignored in production
+        self.explain_slow: bool = data.get("explain_slow", False)
+
+    def to_save(self):
+        return {
+            "enabled": self.enabled,
+            "slow_threshold": self.slow_threshold,
+            "explain_slow": self.explain_slow,
+        }
+
+
+class AssetCatalogConfig:
+    def __init__(self, data: dict):
+        # serve the asset catalog from memory instead of querying it per request
+        self.enabled: bool = data.get("enabled", True)
+        self.refresh_interval: float = data.get("refresh_interval", 30)
+
+    def to_save(self):
+        return {
+            "enabled": self.enabled,
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+class AssetFilesConfig:
+    def __init__(self, data: dict):
+        # directory with the image files that Asset.file_name refers to
+        self.directory: str = data.get("directory", "asset_files")
+        # fingerprinted URLs never change their content
+        self.max_age: int = data.get("max_age", 365 * 24 * 60 * 60)
+        # read size when the server can't send files by itself
+        self.chunk_size: int = data.get("chunk_size", 64 * 1024)
+
+    def to_save(self):
+        return {
+            "directory": self.directory,
+            "max_age": self.max_age,
+            "chunk_size": self.chunk_size,
+        }
+
+
+class RenderConfig:
+    def __init__(self, data: dict):
+        self.workers: int = data.get("workers", 2)
+        self.max_queue: int = data.get("max_queue", 16)
+        # allowed thumbnail sizes in pixels, thumbnails are square
+        self.sizes: typing.List[int] = data.get("sizes", [128, 256, 512])
+        self.cache_directory: str = data.get("cache_directory", "render_cache")
+        self.cache_max_bytes: int = data.get("cache_max_bytes", 512 * 1024 * 1024)
+
+    def to_save(self):
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "sizes": self.sizes,
+            "cache_directory": self.cache_directory,
+            "cache_max_bytes": self.cache_max_bytes,
+        }
+
+
+class AtlasConfig:
+    def __init__(self, data: dict):
+        # inside the asset files directory, so atlases get fingerprinted URLs
+        self.directory: str = data.get("directory", "atlases")
+        # maximum width and height of one atlas page in pixels
+        self.max_size: int = data.get("max_size", 2048)
+        # transparent pixels between images, avoids bleeding when scaled
+        self.padding: int = data.get("padding", 2)
+        # "png" or "webp"
+        self.format: str = data.get("format", "png")
+
+    def to_save(self):
+        return {
+            "directory": self.directory,
+            "max_size": self.max_size,
+            "padding": self.padding,
+            "format": self.format,
+        }
+
+
+class AssetUploadConfig:
+    def __init__(self, data: dict):
+        # uploads are streamed here first, then moved into the asset files directory
+        self.staging_directory: str = data.get("staging_directory", "asset_uploads")
+        self.max_file_size: int = data.get("max_file_size", 20 * 1024 * 1024)
+        self.max_files: int = data.get("max_files", 500)
+        # processes making the variants, also the number of files handled at once
+        self.workers: int = data.get("workers", 2)
+        # staged files waiting for a worker, reading the body pauses when full
+        self.max_queue: int = data.get("max_queue", 8)
+        # longest side of the resized WebP variants in pixels
+        self.variant_sizes: typing.List[int] = data.get("variant_sizes", [128, 512])
+        self.webp_quality: int = data.get("webp_quality", 90)
+
+    def to_save(self):
+        return {
+            "staging_directory": self.staging_directory,
+            "max_file_size": self.max_file_size,
+            "max_files": self.max_files,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "variant_sizes": self.variant_sizes,
+            "webp_quality": self.webp_quality,
+        }
+
 
 class Config:
     _instance: typing.Optional["Config"] = None
@@ -45,8 +310,19 @@ class Config:
     db: DbConfig
     bcrypt_salt: bytes
     jwt: JwtConfig
+    auth: AuthConfig
+    hashing: HashingConfig
     mail_send_api: str
     mail_send_token: str
+    mail_client: MailClientConfig
+    outbox: OutboxConfig
+    logging: LoggingConfig
+    query_log: QueryLogConfig
+    asset_catalog: AssetCatalogConfig
+    asset_files: AssetFilesConfig
+    render: RenderConfig
+    atlas: AtlasConfig
+    asset_upload: AssetUploadConfig
     frontend_url: str
     is_production: bool = False
 
@@ -73,8 +349,19 @@ class Config:
         self.db = DbConfig(data["db"])
         self.bcrypt_salt: bytes = base64.b64decode(data["bcrypt_salt"])
         self.jwt = JwtConfig(data["jwt"])
+        self.auth = AuthConfig(data.get("auth", {}))
+        self.hashing = HashingConfig(data.get("hashing", {}))
         self.mail_send_api: str = data["mail_send_api"].rstrip("/")
         self.mail_send_token: str = data["mail_send_token"]
+        self.mail_client = MailClientConfig(data.get("mail_client", {}))
+        self.outbox = OutboxConfig(data.get("outbox", {}))
+        self.logging = LoggingConfig(data.get("logging", {}))
+        self.query_log = QueryLogConfig(data.get("query_log", {}))
+        self.asset_catalog = AssetCatalogConfig(data.get("asset_catalog", {}))
+        self.asset_files = AssetFilesConfig(data.get("asset_files", {}))
+        self.render = RenderConfig(data.get("render", {}))
+        self.atlas = AtlasConfig(data.get("atlas", {}))
+        self.asset_upload = AssetUploadConfig(data.get("asset_upload", {}))
         self.frontend_url: str = data.get(
             "frontend_url", "http://localhost:3000"
         ).rstrip("/")
@@ -102,8 +389,19 @@ class Config:
                 "expiration": 7 * 24 * 60 * 60,
             }
         )
+        self.auth = AuthConfig({})
+        self.hashing = HashingConfig({})
         self.mail_send_api: str = "https://mailapi.charcreator.ru/"
         self.mail_send_token: str = "KEY"
+        self.mail_client = MailClientConfig({})
+        self.outbox = OutboxConfig({})
+        self.logging = LoggingConfig({})
+        self.query_log = QueryLogConfig({})
+        self.asset_catalog = AssetCatalogConfig({})
+        self.asset_files = AssetFilesConfig({})
+        self.render = RenderConfig({})
+        self.atlas = AtlasConfig({})
+        self.asset_upload = AssetUploadConfig({})
         self.frontend_url: str = "https://charcreator.ru/"
         self.is_production = False
 
@@ -114,8 +412,19 @@ class Config:
                     "db": self.db.to_save(),
                     "bcrypt_salt": base64.b64encode(self.bcrypt_salt).decode("utf-8"),
                     "jwt": self.jwt.to_save(),
+                    "auth": self.auth.to_save(),
+                    "hashing": self.hashing.to_save(),
                     "mail_send_api": self.mail_send_api,
                     "mail_send_token": self.mail_send_token,
+                    "mail_client": self.mail_client.to_save(),
+                    "outbox": self.outbox.to_save(),
+                    "logging": self.logging.to_save(),
+                    "query_log": self.query_log.to_save(),
+                    "asset_catalog": self.asset_catalog.to_save(),
+                    "asset_files": self.asset_files.to_save(),
+                    "render": self.render.to_save(),
+                    "atlas": self.atlas.to_save(),
+                    "asset_upload": self.asset_upload.to_save(),
                     "frontend_url": self.frontend_url,
                     "is_production": self.is_production,
                 },
@@ -123,4 +432,5 @@ class Config:
             )
 
     def bcrypt_password(self, password: str) -> str:
+        # blocks the event loop, use charcreator_backend.hashing in handlers
         return bcrypt.hashpw(password.encode("utf-8"), self.bcrypt_salt).decode("utf-8")
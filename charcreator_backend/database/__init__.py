@@ -1,4 +1,21 @@
-from . import db_exceptions, functions
+from . import db_exceptions, functions, statements
+from .asset_catalog import AssetCatalog
+from .auth_cache import AuthCache
+from .last_used_buffer import LastUsedBuffer
+from .query_stats import QueryStats
+from .revocation import RevocationFilter
+from .session_events import SessionEventsListener
 from .transaction_manager import TransactionManager
 
-__all__ = ["TransactionManager", "db_exceptions", "functions"]
+__all__ = [
+    "AssetCatalog",
+    "AuthCache",
+    "LastUsedBuffer",
+    "QueryStats",
+    "RevocationFilter",
+    "SessionEventsListener",
+    "TransactionManager",
+    "db_exceptions",
+    "functions",
+    "statements",
+]
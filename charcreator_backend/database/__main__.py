@@ -0,0 +1,48 @@
+"""
+Apply the schema changes the app needs on top of the cc-database scripts
+
+    python -m charcreator_backend.database
+    python -m charcreator_backend.database --check
+
+Reads config.json from the working directory, like main.py, and needs a role
+with DDL rights. Run it once per database after updating the app; with
+--check only the missing changes are listed and the exit code is 1 if any.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from .schema import SchemaError, apply, missing
+from .transaction_manager import TransactionManager
+
+
+async def run(check: bool) -> list:
+    # readonly: every statement in autocommit mode
+    async with TransactionManager(no_save=True, readonly=True) as transaction_manager:
+        if check:
+            return await missing(transaction_manager)
+        return await apply(transaction_manager)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m charcreator_backend.database")
+    parser.add_argument("--check", action="store_true", help="only list the missing changes")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)-8s %(name)s - %(message)s")
+    logging.getLogger("cc").setLevel(logging.INFO)
+
+    try:
+        names = asyncio.run(run(args.check))
+    except SchemaError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if args.check:
+        print("Missing: " + ", ".join(names) if names else "Schema is up to date")
+        sys.exit(1 if names else 0)
+    print("Applied: " + ", ".join(names) if names else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
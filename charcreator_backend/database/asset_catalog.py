@@ -0,0 +1,201 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+from ..config import Config
+from .functions.assets import Asset, AssetType
+
+logger = logging.getLogger("cc.database.asset_catalog")
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the whole asset catalog. A refresh builds a new
+    snapshot and swaps it in, so readers never see a half-applied update
+    """
+
+    def __init__(
+        self,
+        version: int,
+        assets: typing.Dict[int, Asset],
+        last_seen: typing.Optional[datetime.datetime],
+    ):
+        self.version = version
+        self.by_id = assets
+        self.all: typing.Tuple[Asset, ...] = tuple(
+            assets[asset_id] for asset_id in sorted(assets)
+        )
+        by_type: typing.Dict[AssetType, typing.List[Asset]] = {
+            asset_type: [] for asset_type in AssetType
+        }
+        for asset in self.all:
+            by_type[asset.asset_type].append(asset)
+        self.by_type: typing.Dict[AssetType, typing.Tuple[Asset, ...]] = {
+            asset_type: tuple(assets_of_type)
+            for asset_type, assets_of_type in by_type.items()
+        }
+        # max modified_at seen so far
+        self.last_seen = last_seen
+        self._memo: typing.Dict[typing.Any, typing.Any] = {}
+
+    def memo(self, key: typing.Any, build: typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        Value derived from this snapshot, e.g. a serialized response, built
+        once per snapshot version
+
+        :param key: key of the value
+        :param build: function building the value
+        :return: value
+        """
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+
+class AssetCatalog:
+    """
+    Process-wide in-memory copy of the assets table.
+
+    It is loaded once on startup and then refreshed in the background with
+    only the rows whose ``modified_at`` moved past the last seen value. Rows
+    committed late with an older ``modified_at`` are caught by re-reading a
+    small overlap window, deleted rows by comparing the row count, which
+    falls back to a full reload.
+    """
+
+    _instance: typing.Optional["AssetCatalog"] = None
+    initialized = False
+
+    REFRESH_OVERLAP = datetime.timedelta(seconds=5)
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.enabled: bool = config.asset_catalog.enabled
+        self.refresh_interval: float = config.asset_catalog.refresh_interval
+        self.snapshot: typing.Optional[CatalogSnapshot] = None
+        self._task: typing.Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.initialized = True
+
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot is not None
+
+    def get(self, asset_id: int) -> typing.Optional[Asset]:
+        return self.snapshot.by_id.get(asset_id)
+
+    def get_many(self, asset_ids: typing.Iterable[int]) -> typing.List[Asset]:
+        """
+        :param asset_ids: ids of the assets, unknown ids are skipped
+        :return: assets ordered by id, like AssetsFunctions.get_many
+        """
+        by_id = self.snapshot.by_id
+        return [by_id[asset_id] for asset_id in sorted(set(asset_ids)) if asset_id in by_id]
+
+    def list_by_type(self, asset_type: AssetType) -> typing.Tuple[Asset, ...]:
+        return self.snapshot.by_type[asset_type]
+
+    def list_all(self) -> typing.Tuple[Asset, ...]:
+        return self.snapshot.all
+
+    async def load(self):
+        """
+        Replace the snapshot with the whole table
+
+        :return: None
+        """
+        from .transaction_manager import TransactionManager
+
+        async with self._lock:
+            async with TransactionManager(readonly=True) as transaction_manager:
+                assets = await transaction_manager.functions.assets.list_all()
+            self._swap({asset.id: asset for asset in assets}, _last_modified(assets, None))
+            logger.info("Asset catalog loaded, %d assets", len(assets))
+
+    async def refresh(self) -> bool:
+        """
+        Apply rows changed since the last refresh
+
+        :return: whether a new snapshot was made
+        """
+        if self.snapshot is None or self.snapshot.last_seen is None:
+            await self.load()
+            return True
+
+        from .transaction_manager import TransactionManager
+
+        async with self._lock:
+            snapshot = self.snapshot
+            async with TransactionManager() as transaction_manager:
+                changed = await transaction_manager.functions.assets.list_modified_since(
+                    snapshot.last_seen - self.REFRESH_OVERLAP
+                )
+                count = await transaction_manager.functions.assets.count()
+
+            changed = [asset for asset in changed if snapshot.by_id.get(asset.id) != asset]
+            if not changed and count == len(snapshot.by_id):
+                return False
+
+            assets = dict(snapshot.by_id)
+            assets.update((asset.id, asset) for asset in changed)
+            if count == len(assets):
+                self._swap(assets, _last_modified(changed, snapshot.last_seen))
+                logger.debug("Asset catalog refreshed, %d assets changed", len(changed))
+                return True
+
+        # rows were deleted, only a full read can tell which
+        await self.load()
+        return True
+
+    def _swap(
+        self,
+        assets: typing.Dict[int, Asset],
+        last_seen: typing.Optional[datetime.datetime],
+    ):
+        version = self.snapshot.version + 1 if self.snapshot is not None else 1
+        self.snapshot = CatalogSnapshot(version, assets, last_seen)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        await self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Asset catalog refresh failed")
+                logger.exception(e)
+
+
+def _last_modified(
+    assets: typing.Iterable[Asset], previous: typing.Optional[datetime.datetime]
+) -> typing.Optional[datetime.datetime]:
+    last = previous
+    for asset in assets:
+        if last is None or asset.modified_at > last:
+            last = asset.modified_at
+    return last
@@ -0,0 +1,145 @@
+import collections
+import time
+import typing
+
+from ..config import Config
+
+
+class _Entry:
+    __slots__ = ("value", "user_id", "session_id", "deadline")
+
+    def __init__(self, value: typing.Any, user_id: int, session_id: int, deadline: float):
+        self.value = value
+        self.user_id = user_id
+        self.session_id = session_id
+        self.deadline = deadline
+
+
+class AuthCache:
+    """
+    Process-wide TTL-bounded LRU cache of resolved authentication data,
+    keyed by session token.
+
+    Every invalidation bumps ``epoch``. A caller that resolved a token from the
+    database passes the epoch it observed before the lookup to ``put``, so data
+    read before a concurrent invalidation never makes it into the cache.
+    """
+
+    _instance: typing.Optional["AuthCache"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.ttl: float = config.auth.cache_ttl
+        self.max_size: int = config.auth.cache_size
+        self.epoch = 0
+        self._entries: collections.OrderedDict[str, _Entry] = collections.OrderedDict()
+        self._by_user: typing.Dict[int, typing.Set[str]] = {}
+        self._by_session: typing.Dict[int, str] = {}
+        self.initialized = True
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, token: str) -> typing.Optional[typing.Any]:
+        """
+        Get cached data for a token
+
+        :param token: JWT token
+        :return: cached value or None if missing or stale
+        """
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry.deadline < time.monotonic():
+            self._remove(token)
+            return None
+        self._entries.move_to_end(token)
+        return entry.value
+
+    def put(
+        self, token: str, value: typing.Any, user_id: int, session_id: int, epoch: int
+    ):
+        """
+        Store resolved data for a token
+
+        :param token: JWT token
+        :param value: data to cache
+        :param user_id: id of the user the token belongs to
+        :param session_id: id of the session the token belongs to
+        :param epoch: value of ``epoch`` observed before the data was read
+        :return: None
+        """
+        if not self.enabled or epoch != self.epoch:
+            return
+
+        self._remove(token)
+        self._entries[token] = _Entry(
+            value, user_id, session_id, time.monotonic() + self.ttl
+        )
+        self._by_user.setdefault(user_id, set()).add(token)
+        self._by_session[session_id] = token
+
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_token(self, token: str):
+        """
+        Drop the entry of a single token
+
+        :param token: JWT token
+        :return: None
+        """
+        self.epoch += 1
+        self._remove(token)
+
+    def invalidate_session(self, session_id: int):
+        """
+        Drop the entry of a session
+
+        :param session_id: session id
+        :return: None
+        """
+        self.epoch += 1
+        token = self._by_session.get(session_id)
+        if token is not None:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: int, except_session_id: typing.Optional[int] = None):
+        """
+        Drop all entries of a user
+
+        :param user_id: user id
+        :param except_session_id: session whose entry should be kept
+        :return: None
+        """
+        self.epoch += 1
+        for token in list(self._by_user.get(user_id, ())):
+            if self._entries[token].session_id != except_session_id:
+                self._remove(token)
+
+    def clear(self):
+        self.epoch += 1
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_session.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry.user_id]
+        if self._by_session.get(entry.session_id) == token:
+            del self._by_session[entry.session_id]
@@ -8,6 +8,7 @@ from . import (
     saved_character_assets,
     saved_characters,
     sessions,
+    outbox,
 )
 
 __all__ = [
@@ -20,4 +21,5 @@ __all__ = [
     "saved_character_assets",
     "saved_characters",
     "sessions",
+    "outbox",
 ]
@@ -1,9 +1,3 @@
-import asyncio
-import dataclasses
-import time
-import typing
-from enum import Enum
+from .assets import Asset, AssetType, AssetsFunctions
 
-from asyncpg import Connection, PostgresError, Record
-
-from ...db_exceptions import DbException
+__all__ = ["Asset", "AssetType", "AssetsFunctions"]
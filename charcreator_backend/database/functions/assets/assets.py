@@ -1,11 +1,70 @@
 import dataclasses
 import enum
-import string
 import datetime
 import json
+import typing
 
 from asyncpg import Connection
 
+from ... import statements
+from ....shared_models import AssetModel
+
+
+LIST_ASSETS = statements.register(
+    "assets.list_all",
+    "SELECT * FROM assets ORDER BY id",
+)
+LIST_ASSETS_BY_TYPE = statements.register(
+    "assets.list_by_type",
+    "SELECT * FROM assets WHERE asset_type = $1 ORDER BY id",
+)
+GET_ASSET = statements.register(
+    "assets.get",
+    "SELECT * FROM assets WHERE id = $1",
+)
+GET_MANY_ASSETS = statements.register(
+    "assets.get_many",
+    "SELECT * FROM assets WHERE id = ANY($1::bigint[]) ORDER BY id",
+)
+LIST_MODIFIED_ASSETS = statements.register(
+    "assets.list_modified_since",
+    "SELECT * FROM assets WHERE modified_at > $1 ORDER BY modified_at",
+)
+COUNT_ASSETS = statements.register(
+    "assets.count",
+    "SELECT count(*) FROM assets",
+)
+# file_name identifies an uploaded asset, uploading it again replaces it.
+# The unique index is added by charcreator_backend.database.schema
+HAS_UNIQUE_FILE_NAME = statements.register(
+    "assets.has_unique_file_name",
+    "SELECT EXISTS ("
+    "SELECT 1 FROM pg_index i "
+    "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] "
+    "WHERE i.indrelid = 'assets'::regclass AND i.indisunique AND i.indisvalid "
+    "AND i.indnatts = 1 AND a.attname = 'file_name')",
+)
+UPSERT_ASSET = statements.register(
+    "assets.upsert",
+    "INSERT INTO assets (file_name, created_at, modified_at, asset_type, colorable) "
+    "VALUES ($1, NOW(), NOW(), $2, $3) "
+    "ON CONFLICT (file_name) DO UPDATE SET "
+    "asset_type = EXCLUDED.asset_type, colorable = EXCLUDED.colorable, modified_at = NOW() "
+    "RETURNING *",
+)
+# without the unique index, races between processes can insert a file name twice
+UPDATE_OR_INSERT_ASSET = statements.register(
+    "assets.update_or_insert",
+    "WITH updated AS ("
+    "UPDATE assets SET asset_type = $2, colorable = $3, modified_at = NOW() "
+    "WHERE file_name = $1 RETURNING *"
+    "), inserted AS ("
+    "INSERT INTO assets (file_name, created_at, modified_at, asset_type, colorable) "
+    "SELECT $1, NOW(), NOW(), $2, $3 WHERE NOT EXISTS (SELECT 1 FROM updated) "
+    "RETURNING *"
+    ") SELECT * FROM updated UNION ALL SELECT * FROM inserted",
+)
+
 
 class AssetType(enum.Enum):
     FACE_SHAPE = 'face_shape'
@@ -31,12 +90,12 @@ class AssetType(enum.Enum):
 @dataclasses.dataclass
 class Asset:
     id: int
-    file_name: string
+    file_name: str
     created_at: datetime.datetime
     modified_at: datetime.datetime
     asset_type: AssetType
     colorable: bool
-    default_properties: json
+    default_properties: typing.Optional[dict]
 
     @classmethod
     def from_row(cls, row):
@@ -47,13 +106,123 @@ class Asset:
             file_name=file_name,
             created_at=created_at,
             modified_at=modified_at,
-            asset_type=asset_type,
+            asset_type=AssetType(asset_type),
             colorable=colorable,
-            default_properties=default_properties,
+            # json columns come as text unless a codec is set on the connection
+            default_properties=(
+                json.loads(default_properties)
+                if isinstance(default_properties, str)
+                else default_properties
+            ),
         )
 
+    def model_data(self, url: typing.Optional[str] = None) -> dict:
+        """
+        Fields of AssetModel, lists are validated in bulk with
+        responses.validate_trusted
+
+        :param url: fingerprinted URL of the file, see charcreator_backend.asset_files
+        """
+        return {
+            "id": self.id,
+            "file_name": self.file_name,
+            "asset_type": self.asset_type.value,
+            "colorable": self.colorable,
+            "default_properties": self.default_properties,
+            "created_at": self.created_at,
+            "modified_at": self.modified_at,
+            "url": url,
+        }
+
+    def to_model(self, url: typing.Optional[str] = None) -> AssetModel:
+        """
+        :param url: fingerprinted URL of the file, see charcreator_backend.asset_files
+        """
+        return AssetModel(**self.model_data(url))
+
+
 class AssetsFunctions:
     def __init__(self, conn):
         self.conn: Connection = conn
 
+    async def list_all(self) -> typing.List[Asset]:
+        """
+        Fetches the whole asset catalog
+
+        :return: assets ordered by id
+        """
+        records = await self.conn.fetch(LIST_ASSETS)
+        return [Asset.from_row(record) for record in records]
+
+    async def list_by_type(self, asset_type: AssetType) -> typing.List[Asset]:
+        """
+        Fetches assets of one type
+
+        :param asset_type: type of the assets
+        :return: assets ordered by id
+        """
+        records = await self.conn.fetch(LIST_ASSETS_BY_TYPE, asset_type.value)
+        return [Asset.from_row(record) for record in records]
+
+    async def get(self, asset_id: int) -> typing.Optional[Asset]:
+        """
+        Fetches an asset by id
+
+        :param asset_id: id of the asset
+        :return: Asset or None
+        """
+        record = await self.conn.fetchrow(GET_ASSET, asset_id)
+        if record is None:
+            return None
+        return Asset.from_row(record)
+
+    async def get_many(self, asset_ids: typing.List[int]) -> typing.List[Asset]:
+        """
+        Fetches assets by ids, unknown ids are skipped
+
+        :param asset_ids: ids of the assets
+        :return: assets ordered by id
+        """
+        records = await self.conn.fetch(GET_MANY_ASSETS, asset_ids)
+        return [Asset.from_row(record) for record in records]
+
+    async def list_modified_since(self, since: datetime.datetime) -> typing.List[Asset]:
+        """
+        Fetches assets created or changed after a moment
+
+        :param since: value of modified_at to start after
+        :return: assets ordered by modified_at
+        """
+        records = await self.conn.fetch(LIST_MODIFIED_ASSETS, since)
+        return [Asset.from_row(record) for record in records]
+
+    async def count(self) -> int:
+        return await self.conn.fetchval(COUNT_ASSETS)
+
+    async def has_unique_file_name(self) -> bool:
+        """
+        Whether file_name has the unique index upsert relies on
+        """
+        return await self.conn.fetchval(HAS_UNIQUE_FILE_NAME)
+
+    async def upsert(
+            self,
+            file_name: str,
+            asset_type: AssetType,
+            colorable: bool,
+            unique_file_name: bool = True,
+    ) -> Asset:
+        """
+        Creates an asset or updates the one with the same file name,
+        default_properties of an existing asset are kept
 
+        :param file_name: name of the file in the asset files directory
+        :param asset_type: type of the asset
+        :param colorable: whether the asset can be recolored
+        :param unique_file_name: result of has_unique_file_name, without the
+            index concurrent calls for one file name must be serialized
+        :return: created or updated Asset
+        """
+        statement = UPSERT_ASSET if unique_file_name else UPDATE_OR_INSERT_ASSET
+        record = await self.conn.fetchrow(statement, file_name, asset_type.value, colorable)
+        return Asset.from_row(record)
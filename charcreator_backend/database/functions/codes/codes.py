@@ -8,7 +8,36 @@ import asyncpg
 from asyncpg import Connection
 
 from ...db_exceptions import DbException
-from ....shared_models import UserModel
+from ... import statements
+from ....shared_models import CodeModel, UserModel
+
+
+CREATE_CODE = statements.register(
+    "codes.create_code",
+    "INSERT INTO codes (user_id, purpose, code, expires_at) "
+    "VALUES ($1, $2, $3, $4) RETURNING *",
+)
+GET_CODE = statements.register(
+    "codes.get_code",
+    "SELECT * FROM codes WHERE code = $1",
+    hot=True,
+)
+LAST_CODE_OF_USER = statements.register(
+    "codes.last_code_of_user",
+    "SELECT * FROM codes WHERE user_id = $1 ORDER BY created_at DESC LIMIT 1",
+)
+LAST_CODE_OF_USER_BY_PURPOSE = statements.register(
+    "codes.last_code_of_user_by_purpose",
+    "SELECT * FROM codes WHERE user_id = $1 AND purpose = $2 ORDER BY created_at DESC LIMIT 1",
+)
+GET_AND_MARK_CODE_AS_USED = statements.register(
+    "codes.get_and_mark_code_as_used",
+    "UPDATE codes SET used_at = NOW() WHERE code = $1 RETURNING *",
+)
+MARK_CODE_AS_USED = statements.register(
+    "codes.mark_code_as_used",
+    "UPDATE codes SET used_at = NOW() WHERE id = $1",
+)
 
 
 class CodePurpose(str, enum.Enum):
@@ -40,6 +69,19 @@ class Code:
             expires_at=expires_at,
         )
 
+    def model_data(self) -> dict:
+        # fields of CodeModel, the code itself is never exposed
+        return {
+            "id": self.id,
+            "purpose": self.purpose.value,
+            "created_at": self.created_at,
+            "used_at": self.used_at,
+            "expires_at": self.expires_at,
+        }
+
+    def to_model(self) -> CodeModel:
+        return CodeModel(**self.model_data())
+
 
 class CodeFunctions:
     def __init__(self, conn):
@@ -65,8 +107,7 @@ class CodeFunctions:
             code = str(uuid.uuid4())
 
         res = await self.conn.fetchrow(
-            "INSERT INTO codes (user_id, purpose, code, expires_at) "
-            "VALUES ($1, $2, $3, $4) RETURNING *",
+            CREATE_CODE,
             user_id,
             purpose.value,
             code,
@@ -83,7 +124,7 @@ class CodeFunctions:
         :return: Code or None
         """
         res = await self.conn.fetchrow(
-            "SELECT * FROM codes WHERE code = $1",
+            GET_CODE,
             code,
         )
 
@@ -104,12 +145,12 @@ class CodeFunctions:
         """
         if purpose is None:
             res = await self.conn.fetchrow(
-                "SELECT * FROM codes WHERE user_id = $1 ORDER BY created_at DESC LIMIT 1",
+                LAST_CODE_OF_USER,
                 user_id,
             )
         else:
             res = await self.conn.fetchrow(
-                "SELECT * FROM codes WHERE user_id = $1 AND purpose = $2 ORDER BY created_at DESC LIMIT 1",
+                LAST_CODE_OF_USER_BY_PURPOSE,
                 user_id,
                 purpose.value,
             )
@@ -127,8 +168,8 @@ class CodeFunctions:
         :return: Code or None
         """
 
-        res = await self.conn.execute(
-            "UPDATE codes SET used_at = NOW() WHERE id = $1 RETURNING *",
+        res = await self.conn.fetchrow(
+            GET_AND_MARK_CODE_AS_USED,
             code,
         )
 
@@ -145,6 +186,6 @@ class CodeFunctions:
         """
         code_id = code_id.id if isinstance(code_id, Code) else code_id
         await self.conn.execute(
-            "UPDATE codes SET used_at = NOW() WHERE id = $1",
+            MARK_CODE_AS_USED,
             code_id,
         )
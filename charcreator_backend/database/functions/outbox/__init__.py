@@ -0,0 +1,3 @@
+from .outbox import OutboxMessage, OutboxFunctions
+
+__all__ = ["OutboxMessage", "OutboxFunctions"]
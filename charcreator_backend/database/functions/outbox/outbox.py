@@ -0,0 +1,177 @@
+import dataclasses
+import datetime
+import json
+import typing
+
+from asyncpg import Connection
+
+from ... import statements
+
+
+# the table is added by charcreator_backend.database.schema
+TABLE_EXISTS = statements.register(
+    "outbox.table_exists",
+    "SELECT to_regclass('outbox') IS NOT NULL",
+)
+ENQUEUE = statements.register(
+    "outbox.enqueue",
+    "INSERT INTO outbox (path, payload) VALUES ($1, $2) RETURNING *",
+)
+CLAIM = statements.register(
+    "outbox.claim",
+    "UPDATE outbox SET next_attempt_at = NOW() + $3 * INTERVAL '1 second' "
+    "WHERE id IN ("
+    "SELECT id FROM outbox "
+    "WHERE sent_at IS NULL AND next_attempt_at <= NOW() AND attempts < $2 "
+    "ORDER BY next_attempt_at LIMIT $1 FOR UPDATE SKIP LOCKED"
+    ") RETURNING *",
+)
+MARK_SENT = statements.register(
+    "outbox.mark_sent",
+    "UPDATE outbox SET sent_at = NOW(), last_error = NULL WHERE id = ANY($1::bigint[])",
+)
+MARK_FAILED = statements.register(
+    "outbox.mark_failed",
+    "UPDATE outbox SET attempts = attempts + 1, last_error = $2, "
+    "next_attempt_at = NOW() + $3 * INTERVAL '1 second' WHERE id = $1",
+)
+MARK_REJECTED = statements.register(
+    "outbox.mark_rejected",
+    "UPDATE outbox SET attempts = GREATEST(attempts + 1, $3), last_error = $2 "
+    "WHERE id = $1",
+)
+RELEASE = statements.register(
+    "outbox.release",
+    "UPDATE outbox SET next_attempt_at = NOW() + $2 * INTERVAL '1 second' "
+    "WHERE id = ANY($1::bigint[])",
+)
+DELETE_SENT_BEFORE = statements.register(
+    "outbox.delete_sent_before",
+    "DELETE FROM outbox WHERE sent_at < NOW() - $1 * INTERVAL '1 second'",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class OutboxMessage:
+    id: int
+    path: str
+    payload: typing.Dict[str, typing.Any]
+    created_at: datetime.datetime
+    attempts: int
+    next_attempt_at: datetime.datetime
+    sent_at: typing.Optional[datetime.datetime]
+    last_error: typing.Optional[str]
+
+    @classmethod
+    def from_row(cls, row):
+        (
+            id_,
+            path,
+            payload,
+            created_at,
+            attempts,
+            next_attempt_at,
+            sent_at,
+            last_error,
+        ) = tuple(row)
+
+        return cls(
+            id=id_,
+            path=path,
+            payload=json.loads(payload) if isinstance(payload, str) else payload,
+            created_at=created_at,
+            attempts=attempts,
+            next_attempt_at=next_attempt_at,
+            sent_at=sent_at,
+            last_error=last_error,
+        )
+
+
+class OutboxFunctions:
+    def __init__(self, conn):
+        self.conn: Connection = conn
+
+    async def table_exists(self) -> bool:
+        """
+        Whether the outbox table has been created
+        """
+        return await self.conn.fetchval(TABLE_EXISTS)
+
+    async def enqueue(self, path: str, payload: typing.Dict[str, typing.Any]) -> OutboxMessage:
+        """
+        Adds a message to the outbox. It is only picked up by the dispatcher
+        once the current transaction commits
+
+        :param path: mail API method
+        :param payload: JSON body of the request
+        :return: a new message
+        """
+        record = await self.conn.fetchrow(ENQUEUE, path, json.dumps(payload))
+        return OutboxMessage.from_row(record)
+
+    async def claim(
+        self, limit: int, max_attempts: int, lease: float
+    ) -> typing.List[OutboxMessage]:
+        """
+        Claims due messages for sending. Claimed messages are hidden from
+        other dispatchers for ``lease`` seconds, so a message whose dispatcher
+        died is retried after the lease expires
+
+        :param limit: maximum number of messages
+        :param max_attempts: skip messages that have failed this many times
+        :param lease: seconds to hide the messages for
+        :return: claimed messages
+        """
+        records = await self.conn.fetch(CLAIM, limit, max_attempts, lease)
+        return [OutboxMessage.from_row(record) for record in records]
+
+    async def mark_sent(self, message_ids: typing.List[int]):
+        """
+        Marks messages as sent
+
+        :param message_ids: ids of the messages
+        :return: None
+        """
+        await self.conn.execute(MARK_SENT, message_ids)
+
+    async def mark_failed(self, message_id: int, error: str, retry_in: float):
+        """
+        Records a failed attempt and schedules the next one
+
+        :param message_id: id of the message
+        :param error: error description
+        :param retry_in: seconds until the next attempt
+        :return: None
+        """
+        await self.conn.execute(MARK_FAILED, message_id, error, retry_in)
+
+    async def mark_rejected(self, message_id: int, error: str, max_attempts: int):
+        """
+        Records a failed attempt that will never succeed, the message is not
+        claimed again
+
+        :param message_id: id of the message
+        :param error: error description
+        :param max_attempts: OutboxConfig.max_attempts
+        :return: None
+        """
+        await self.conn.execute(MARK_REJECTED, message_id, error, max_attempts)
+
+    async def release(self, message_ids: typing.List[int], retry_in: float):
+        """
+        Returns claimed messages without counting an attempt
+
+        :param message_ids: ids of the messages
+        :param retry_in: seconds until the messages can be claimed again
+        :return: None
+        """
+        await self.conn.execute(RELEASE, message_ids, retry_in)
+
+    async def delete_sent_before(self, age: float):
+        """
+        Deletes messages sent more than ``age`` seconds ago
+
+        :param age: seconds
+        :return: None
+        """
+        await self.conn.execute(DELETE_SENT_BEFORE, age)
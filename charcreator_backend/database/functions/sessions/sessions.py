@@ -1,12 +1,60 @@
 import asyncio
 import dataclasses
+import functools
 import time
 import typing
 import datetime
 
-from asyncpg import Connection, PostgresError, Record
+from asyncpg import PostgresError, Record
 
+from ...auth_cache import AuthCache
 from ...db_exceptions import DbException
+from ...last_used_buffer import LastUsedBuffer
+from ...session_events import SESSION_REVOKED_CHANNEL
+from ....shared_models import SessionModel
+from ... import statements
+from ..users import User
+
+if typing.TYPE_CHECKING:
+    from ...transaction_manager import LazyConnection
+
+
+CREATE_SESSION = statements.register(
+    "sessions.create",
+    "INSERT INTO sessions(user_id, token, expires_at) VALUES ($1, $2, $3) RETURNING *",
+)
+GET_SESSION = statements.register(
+    "sessions.get",
+    "SELECT * FROM sessions WHERE token = $1",
+    hot=True,
+)
+GET_SESSION_WITH_USER = statements.register(
+    "sessions.get_with_user",
+    "SELECT s.*, u.* FROM sessions s JOIN users u ON u.id = s.user_id "
+    "WHERE s.token = $1",
+    hot=True,
+)
+SET_LAST_USED = statements.register(
+    "sessions.set_last_used",
+    "UPDATE sessions SET last_used = NOW() - v.age * INTERVAL '1 second' "
+    "FROM unnest($1::bigint[], $2::float8[]) AS v(id, age) "
+    "WHERE sessions.id = v.id",
+)
+DELETE_SESSION = statements.register(
+    "sessions.delete",
+    "WITH d AS (DELETE FROM sessions WHERE token = $1 RETURNING token) "
+    f"SELECT pg_notify('{SESSION_REVOKED_CHANNEL}', token) FROM d",
+)
+DELETE_SESSION_BY_ID = statements.register(
+    "sessions.delete_by_id",
+    "WITH d AS (DELETE FROM sessions WHERE id = $1 RETURNING token) "
+    f"SELECT pg_notify('{SESSION_REVOKED_CHANNEL}', token) FROM d",
+)
+DELETE_ALL_SESSIONS_EXCEPT = statements.register(
+    "sessions.delete_all_sessions_except",
+    "WITH d AS (DELETE FROM sessions WHERE user_id = $1 AND id != $2 RETURNING token) "
+    f"SELECT pg_notify('{SESSION_REVOKED_CHANNEL}', token) FROM d",
+)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -42,10 +90,26 @@ class Session:
     def expired(self):
         return self.expires_at < datetime.datetime.now()
 
+    def model_data(self) -> dict:
+        # fields of SessionModel, the token is never exposed
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "expires_at": self.expires_at,
+        }
+
+    def to_model(self) -> SessionModel:
+        return SessionModel(**self.model_data())
+
+
+_SESSION_COLUMNS = len(dataclasses.fields(Session))
+
 
 class SessionsFunctions:
-    def __init__(self, conn):
-        self.conn: Connection = conn
+    def __init__(self, conn: "LazyConnection"):
+        # invalidations are deferred with on_commit, a raw connection won't do
+        self.conn = conn
 
     async def create(
         self, user_id: int, token: str, expires_at: datetime.datetime
@@ -60,7 +124,7 @@ class SessionsFunctions:
         """
 
         record = await self.conn.fetchrow(
-            "INSERT INTO sessions(user_id, token, expires_at) VALUES ($1, $2, $3) RETURNING *",
+            CREATE_SESSION,
             user_id,
             token,
             expires_at,
@@ -72,30 +136,75 @@ class SessionsFunctions:
         Retrieves a session by token
 
         :param token: JWT token
-        :param update: whether to update the last_used field
+        :param update: whether to update the last_used field. The update is
+            buffered and written in the background, so the returned session
+            still holds the previously stored value
         :return: a session
         """
+        record = await self.conn.fetchrow(
+            GET_SESSION,
+            token,
+        )
+        if record is None:
+            return None
+
+        session = Session.from_row(record)
         if update:
-            record = await self.conn.fetchrow(
-                "UPDATE sessions SET last_used = NOW() WHERE token = $1 RETURNING *",
-                token,
-            )
-        else:
-            record = await self.conn.fetchrow(
-                "SELECT * FROM sessions WHERE token = $1",
-                token,
-            )
+            LastUsedBuffer().touch(session.id)
+        return session
+
+    async def get_with_user(
+        self, token: str, update=True
+    ) -> typing.Optional[typing.Tuple[Session, User]]:
+        """
+        Retrieves a session by token together with its user in one query
 
-        return Session.from_row(record) if record else None
+        :param token: JWT token
+        :param update: whether to update the last_used field, see ``get``
+        :return: a session and its user
+        """
+        record = await self.conn.fetchrow(
+            GET_SESSION_WITH_USER,
+            token,
+        )
+        if record is None:
+            return None
+
+        values = tuple(record)
+        session = Session.from_row(values[:_SESSION_COLUMNS])
+        user = User.from_row(values[_SESSION_COLUMNS:])
+        if update:
+            LastUsedBuffer().touch(session.id)
+        return session, user
+
+    async def set_last_used(self, session_ids: typing.List[int], ages: typing.List[float]):
+        """
+        Bulk-updates last_used of several sessions
+
+        :param session_ids: ids of the sessions
+        :param ages: for every session, how many seconds ago it was last used
+        :return: None
+        """
+        await self.conn.execute(
+            SET_LAST_USED,
+            session_ids,
+            ages,
+        )
 
     async def delete(self, token: str):
         """
-        Deletes a session by token
+        Deletes a session by token and notifies listeners of
+        SESSION_REVOKED_CHANNEL once the transaction commits
 
         :param token: JWT token
         :return: None
         """
-        await self.conn.execute("DELETE FROM sessions WHERE token = $1", token)
+        await self.conn.execute(
+            DELETE_SESSION,
+            token,
+        )
+        # a lookup before the commit would cache the session again
+        self.conn.on_commit(functools.partial(AuthCache().invalidate_token, token))
 
     async def delete_by_id(self, session_id: int | Session):
         """
@@ -106,7 +215,11 @@ class SessionsFunctions:
         """
         session_id = session_id.id if isinstance(session_id, Session) else session_id
 
-        await self.conn.execute("DELETE FROM sessions WHERE id = $1", session_id)
+        await self.conn.execute(
+            DELETE_SESSION_BY_ID,
+            session_id,
+        )
+        self.conn.on_commit(functools.partial(AuthCache().invalidate_session, session_id))
 
     async def delete_all_sessions_except(
         self,
@@ -119,7 +232,12 @@ class SessionsFunctions:
         :return: None
         """
         await self.conn.execute(
-            "DELETE FROM sessions WHERE user_id = $1 AND id != $2",
+            DELETE_ALL_SESSIONS_EXCEPT,
             session.user_id,
             session.id,
         )
+        self.conn.on_commit(
+            functools.partial(
+                AuthCache().invalidate_user, session.user_id, except_session_id=session.id
+            )
+        )
@@ -1,13 +1,53 @@
 import dataclasses
+import functools
 import datetime
 import typing
 
 import asyncpg
-from asyncpg import Connection
 
+from ...auth_cache import AuthCache
 from ...db_exceptions import DbException
+from ...session_events import USER_CHANGED_CHANNEL
+from ... import statements
 from ....shared_models import UserModel
 
+if typing.TYPE_CHECKING:
+    from ...transaction_manager import LazyConnection
+
+
+CREATE_USER = statements.register(
+    "users.signup_create_user",
+    "INSERT INTO users (email, password_hash) VALUES ($1, $2) RETURNING *",
+)
+MARK_VERIFIED_EMAIL = statements.register(
+    "users.mark_verified_email",
+    "WITH u AS (UPDATE users SET email_verified = TRUE WHERE id = $1 RETURNING *) "
+    f"SELECT u.* FROM u, LATERAL (SELECT pg_notify('{USER_CHANGED_CHANNEL}', u.id::text)) n",
+)
+VERIFY_PASSWORD = statements.register(
+    "users.verify_password",
+    "SELECT * FROM users WHERE email = $1 AND password_hash = $2",
+    hot=True,
+)
+GET_USER_BY_EMAIL = statements.register(
+    "users.get_user_by_email",
+    "SELECT * FROM users WHERE email = $1",
+)
+GET_USER = statements.register(
+    "users.get",
+    "SELECT * FROM users WHERE id = $1",
+    hot=True,
+)
+UPDATE_LAST_LOGIN = statements.register(
+    "users.update_last_login",
+    "UPDATE users SET last_login = NOW() WHERE id = $1 RETURNING *",
+)
+SET_PASSWORD = statements.register(
+    "users.set_password",
+    "WITH u AS (UPDATE users SET password_hash = $2 WHERE id = $1 RETURNING *) "
+    f"SELECT u.* FROM u, LATERAL (SELECT pg_notify('{USER_CHANGED_CHANNEL}', u.id::text)) n",
+)
+
 
 @dataclasses.dataclass(frozen=True)
 class User:
@@ -44,13 +84,17 @@ class User:
             last_login=last_login,
         )
 
-    def to_model(self):
-        return UserModel(
-            id=self.id,
-            email=self.email,
-            email_verified=self.email_verified,
-            admin_level=self.admin_level,
-        )
+    def model_data(self) -> dict:
+        # fields of UserModel, the password hash is never exposed
+        return {
+            "id": self.id,
+            "email": self.email,
+            "email_verified": self.email_verified,
+            "admin_level": self.admin_level,
+        }
+
+    def to_model(self) -> UserModel:
+        return UserModel(**self.model_data())
 
 
 class EmailTaken(DbException):
@@ -66,8 +110,9 @@ class UserNotFoundOrCredentialsInvalid(DbException):
 
 
 class UserFunctions:
-    def __init__(self, conn):
-        self.conn: Connection = conn
+    def __init__(self, conn: "LazyConnection"):
+        # invalidations are deferred with on_commit, a raw connection won't do
+        self.conn = conn
 
     async def signup_create_user(
         self,
@@ -85,7 +130,7 @@ class UserFunctions:
 
         try:
             res = await self.conn.fetchrow(
-                "INSERT INTO users (email, password_hash) VALUES ($1, $2) RETURNING *",
+                CREATE_USER,
                 email,
                 password_hash,
             )
@@ -106,8 +151,10 @@ class UserFunctions:
         user = user.id if isinstance(user, User) else user
 
         res = await self.conn.fetchrow(
-            "UPDATE users SET email_verified = TRUE WHERE id = $1 RETURNING *", user
+            MARK_VERIFIED_EMAIL,
+            user,
         )
+        self.conn.on_commit(functools.partial(AuthCache().invalidate_user, user))
 
         if res is None:
             raise UserNotFound()
@@ -124,7 +171,7 @@ class UserFunctions:
         """
 
         res = await self.conn.fetchrow(
-            "SELECT * FROM users WHERE email = $1 AND password_hash = $2",
+            VERIFY_PASSWORD,
             email,
             password_hash,
         )
@@ -142,10 +189,13 @@ class UserFunctions:
         """
 
         res = await self.conn.fetchrow(
-            "SELECT * FROM users WHERE email = $1",
+            GET_USER_BY_EMAIL,
             email,
         )
 
+        if res is None:
+            return None
+
         return User.from_row(res)
 
     async def get(self, user: int | User) -> typing.Optional[User]:
@@ -158,7 +208,7 @@ class UserFunctions:
         user = user.id if isinstance(user, User) else user
 
         res = await self.conn.fetchrow(
-            "SELECT * FROM users WHERE id = $1",
+            GET_USER,
             user,
         )
 
@@ -176,7 +226,7 @@ class UserFunctions:
         """
         user = user.id if isinstance(user, User) else user
         res = await self.conn.fetchrow(
-            "UPDATE users SET last_login = NOW() WHERE id = $1 RETURNING *", user
+            UPDATE_LAST_LOGIN, user
         )
 
         if res is None:
@@ -194,10 +244,11 @@ class UserFunctions:
         """
         user = user.id if isinstance(user, User) else user
         res = await self.conn.fetchrow(
-            "UPDATE users SET password_hash = $2 WHERE id = $1 RETURNING *",
+            SET_PASSWORD,
             user,
             password_hash,
         )
+        self.conn.on_commit(functools.partial(AuthCache().invalidate_user, user))
 
         if res is None:
             raise UserNotFound()
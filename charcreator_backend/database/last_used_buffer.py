@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+import typing
+
+from ..config import Config
+
+logger = logging.getLogger("cc.database.last_used_buffer")
+
+
+class LastUsedBuffer:
+    """
+    Write-behind buffer for ``sessions.last_used``.
+
+    Sessions touched by requests are remembered in memory together with the
+    monotonic time of the last touch, and a background task periodically
+    writes them all with a single statement. The age of every touch is sent
+    instead of a timestamp, so the stored value is computed from the database
+    clock just like ``NOW()`` used to be.
+    """
+
+    _instance: typing.Optional["LastUsedBuffer"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.flush_interval: float = config.auth.last_used_flush_interval
+        self.max_pending: int = config.auth.last_used_max_pending
+        self._pending: typing.Dict[int, float] = {}
+        self._task: typing.Optional[asyncio.Task] = None
+        self._wakeup: typing.Optional[asyncio.Event] = None
+        self.initialized = True
+
+    def touch(self, session_id: int):
+        """
+        Remember that a session has just been used
+
+        :param session_id: session id
+        :return: None
+        """
+        self._pending[session_id] = time.monotonic()
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self):
+        """
+        Write all pending touches to the database
+
+        :return: None
+        """
+        if not self._pending:
+            return
+
+        from .transaction_manager import TransactionManager
+
+        pending, self._pending = self._pending, {}
+        now = time.monotonic()
+        try:
+            async with TransactionManager() as transaction_manager:
+                await transaction_manager.functions.sessions.set_last_used(
+                    list(pending.keys()),
+                    [now - used_at for used_at in pending.values()],
+                )
+        except BaseException:
+            # keep the touches for the next attempt unless newer ones arrived
+            for session_id, used_at in pending.items():
+                self._pending.setdefault(session_id, used_at)
+            raise
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task and flush whatever is still pending
+
+        :return: None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush sessions last_used")
+                logger.exception(e)
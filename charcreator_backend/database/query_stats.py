@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import re
+import typing
+
+from ..config import Config
+from .statements import Statement
+
+logger = logging.getLogger("cc.database.queries")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class StatementStats:
+    __slots__ = ("key", "sql", "calls", "total_time", "max_time", "rows", "plan", "plan_time")
+
+    def __init__(self, key: str, sql: str):
+        self.key = key
+        self.sql = sql
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.plan: typing.Optional[str] = None
+        self.plan_time = 0.0
+
+
+def redact(args: typing.Sequence[typing.Any]) -> typing.List[str]:
+    """
+    Describe query parameters without revealing their values
+
+    :param args: query parameters
+    :return: descriptions like "$1=<str len=36>"
+    """
+    described = []
+    for i, arg in enumerate(args, start=1):
+        if arg is None:
+            description = "NULL"
+        elif isinstance(arg, (str, bytes, list, tuple)):
+            description = f"<{type(arg).__name__} len={len(arg)}>"
+        else:
+            description = f"<{type(arg).__name__}>"
+        described.append(f"${i}={description}")
+    return described
+
+
+class QueryStats:
+    """
+    Per-statement call count, total and max time and returned rows, collected
+    by LazyConnection for every query of the function classes.
+
+    Statements slower than the configured threshold are logged with redacted
+    parameters. Outside production the plan of the slowest run of every
+    SELECT can be captured with EXPLAIN (ANALYZE, BUFFERS).
+    """
+
+    _instance: typing.Optional["QueryStats"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.enabled: bool = config.query_log.enabled
+        self.slow_threshold: float = config.query_log.slow_threshold
+        self.explain_slow: bool = config.query_log.explain_slow and not config.is_production
+        self.statements: typing.Dict[str, StatementStats] = {}
+        self._explaining: typing.Set[str] = set()
+        self.initialized = True
+
+    def record(self, query: str, args: typing.Sequence[typing.Any], elapsed: float, rows: int):
+        """
+        Account one execution of a statement
+
+        :param query: query text or Statement
+        :param args: query parameters
+        :param elapsed: execution time in seconds
+        :param rows: number of returned or affected rows
+        :return: None
+        """
+        if isinstance(query, Statement):
+            key = query.name
+        else:
+            key = _WHITESPACE.sub(" ", query).strip()[:200]
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats(
+                key, _WHITESPACE.sub(" ", query).strip()
+            )
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.rows += rows
+        slowest = elapsed > stats.max_time
+        if slowest:
+            stats.max_time = elapsed
+
+        if elapsed >= self.slow_threshold:
+            logger.warning(
+                "Slow query %s took %.1f ms",
+                stats.key,
+                elapsed * 1000,
+                extra={
+                    "statement": stats.sql,
+                    "duration_ms": elapsed * 1000,
+                    "parameters": redact(args),
+                },
+            )
+            if slowest and self.explain_slow and _is_read_only(stats.sql):
+                self._schedule_explain(stats, query, args, elapsed)
+
+    def reset(self):
+        self.statements.clear()
+
+    def _schedule_explain(self, stats: StatementStats, query: str, args, elapsed: float):
+        if stats.key in self._explaining:
+            return
+        self._explaining.add(stats.key)
+        asyncio.get_running_loop().create_task(self._explain(stats, query, args, elapsed))
+
+    async def _explain(self, stats: StatementStats, query: str, args, elapsed: float):
+        from .transaction_manager import DBPool
+
+        try:
+            pool = await DBPool.get_instance()
+            async with pool.acquire() as conn:
+                # ANALYZE executes the statement, never let it commit anything
+                transaction = conn.transaction()
+                await transaction.start()
+                try:
+                    rows = await conn.fetch(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args
+                    )
+                finally:
+                    await transaction.rollback()
+            stats.plan = "\n".join(row[0] for row in rows)
+            stats.plan_time = elapsed
+        except Exception as e:
+            logger.warning("Failed to explain %s: %s", stats.key, e)
+        finally:
+            self._explaining.discard(stats.key)
+
+
+def _is_read_only(sql: str) -> bool:
+    upper = sql.upper()
+    return upper.startswith("SELECT") and " FOR UPDATE" not in upper
+
+
+def count_rows(method: str, result: typing.Any) -> int:
+    """
+    Number of rows returned or affected by a LazyConnection call
+    """
+    if result is None:
+        return 0
+    if method == "fetch":
+        return len(result)
+    if method == "execute":
+        # status like "UPDATE 3" or "INSERT 0 1"
+        last = result.rpartition(" ")[2]
+        return int(last) if last.isdigit() else 0
+    return 1
@@ -0,0 +1,99 @@
+import hashlib
+import time
+import typing
+
+from ..config import Config
+
+
+class RevocationFilter:
+    """
+    In-memory set of revoked tokens that are not expired yet.
+
+    Lookups go through a Bloom filter first, so the common case of a token
+    that was never revoked is answered without touching the exact set. Only
+    16-byte digests of the tokens are kept, and entries are dropped once the
+    token expires on its own.
+    """
+
+    _instance: typing.Optional["RevocationFilter"] = None
+    initialized = False
+
+    PRUNE_INTERVAL = 60
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.bits: int = config.auth.revocation_filter_bits
+        self.hashes: int = config.auth.revocation_filter_hashes
+        self._filter = bytearray((self.bits + 7) // 8)
+        self._revoked: typing.Dict[bytes, float] = {}
+        self._next_prune = time.time() + self.PRUNE_INTERVAL
+        self.initialized = True
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def revoke(self, token: str, expires_at: float):
+        """
+        Mark a token as revoked
+
+        :param token: JWT token
+        :param expires_at: unix time after which the token is rejected anyway
+        :return: None
+        """
+        if expires_at <= time.time():
+            return
+        digest = self._digest(token)
+        self._revoked[digest] = expires_at
+        self._set_bits(digest)
+        if time.time() >= self._next_prune:
+            self.prune()
+
+    def is_revoked(self, token: str) -> bool:
+        digest = self._digest(token)
+        for position in self._positions(digest):
+            if not self._filter[position >> 3] & (1 << (position & 7)):
+                return False
+        return digest in self._revoked
+
+    def prune(self):
+        """
+        Forget tokens that have expired and rebuild the Bloom filter
+
+        :return: None
+        """
+        now = time.time()
+        self._revoked = {
+            digest: expires_at
+            for digest, expires_at in self._revoked.items()
+            if expires_at > now
+        }
+        self._filter = bytearray(len(self._filter))
+        for digest in self._revoked:
+            self._set_bits(digest)
+        self._next_prune = now + self.PRUNE_INTERVAL
+
+    def clear(self):
+        self._revoked.clear()
+        self._filter = bytearray(len(self._filter))
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def _positions(self, digest: bytes) -> typing.Iterator[int]:
+        # double hashing: h1 + i * h2 gives as many positions as needed
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def _set_bits(self, digest: bytes):
+        for position in self._positions(digest):
+            self._filter[position >> 3] |= 1 << (position & 7)
@@ -0,0 +1,101 @@
+import logging
+import typing
+
+from .transaction_manager import TransactionManager
+
+logger = logging.getLogger("cc.database.schema")
+
+
+class SchemaError(Exception):
+    pass
+
+
+class Change(typing.NamedTuple):
+    name: str
+    # whether the change is in place, an async function of a TransactionManager
+    applied: typing.Callable[[TransactionManager], typing.Awaitable[bool]]
+    # run in autocommit mode one by one, CREATE INDEX CONCURRENTLY can't run
+    # in a transaction
+    statements: typing.Tuple[str, ...]
+    # rows that make the change fail, e.g. duplicates for a unique index
+    conflicts: typing.Optional[str] = None
+
+
+async def _has_unique_file_name(transaction_manager: TransactionManager) -> bool:
+    return await transaction_manager.functions.assets.has_unique_file_name()
+
+
+async def _has_outbox(transaction_manager: TransactionManager) -> bool:
+    return await transaction_manager.functions.outbox.table_exists()
+
+
+# Changes on top of the cc-database scripts. They are applied by
+# ``python -m charcreator_backend.database``, never on app startup: the app
+# role may lack DDL rights, and building an index blocks writes to the table
+CHANGES: typing.List[Change] = [
+    Change(
+        "assets.file_name_key",
+        _has_unique_file_name,
+        (
+            # a failed concurrent build leaves an invalid index behind
+            "DROP INDEX CONCURRENTLY IF EXISTS assets_file_name_key",
+            "CREATE UNIQUE INDEX CONCURRENTLY assets_file_name_key ON assets (file_name)",
+        ),
+        "SELECT file_name, count(*) FROM assets GROUP BY file_name HAVING count(*) > 1",
+    ),
+    Change(
+        "outbox",
+        _has_outbox,
+        (
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id BIGSERIAL PRIMARY KEY, "
+            "path TEXT NOT NULL, "
+            "payload JSONB NOT NULL, "
+            "created_at TIMESTAMP NOT NULL DEFAULT NOW(), "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(), "
+            "sent_at TIMESTAMP, "
+            "last_error TEXT)",
+            "CREATE INDEX IF NOT EXISTS outbox_pending_idx "
+            "ON outbox (next_attempt_at) WHERE sent_at IS NULL",
+        ),
+    ),
+]
+
+
+async def missing(transaction_manager: TransactionManager) -> typing.List[str]:
+    """
+    :param transaction_manager: readonly transaction manager
+    :return: names of the changes that are not applied
+    """
+    return [
+        change.name for change in CHANGES if not await change.applied(transaction_manager)
+    ]
+
+
+async def apply(transaction_manager: TransactionManager) -> typing.List[str]:
+    """
+    Apply the missing changes
+
+    :param transaction_manager: readonly transaction manager, the statements
+        must run in autocommit mode
+    :return: names of the applied changes
+    :raise: SchemaError if existing rows conflict with a change
+    """
+    applied = []
+    connection = transaction_manager.functions.connection
+    for change in CHANGES:
+        if await change.applied(transaction_manager):
+            continue
+        if change.conflicts is not None:
+            rows = await connection.fetch(change.conflicts)
+            if rows:
+                raise SchemaError(
+                    f"{change.name}: fix these rows first: "
+                    + ", ".join(str(tuple(row)) for row in rows)
+                )
+        for statement in change.statements:
+            await connection.execute(statement)
+        logger.info("Applied %s", change.name)
+        applied.append(change.name)
+    return applied
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+import typing
+
+import asyncpg
+import jwt
+
+from ..config import Config
+from .auth_cache import AuthCache
+from .revocation import RevocationFilter
+
+logger = logging.getLogger("cc.database.session_events")
+
+# payload: token of a deleted session
+SESSION_REVOKED_CHANNEL = "cc_session_revoked"
+# payload: id of a user whose data has changed
+USER_CHANGED_CHANNEL = "cc_user_changed"
+
+
+class SessionEventsListener:
+    """
+    Keeps ``AuthCache`` and ``RevocationFilter`` of this process in sync with
+    session and user changes made by any process, using Postgres LISTEN/NOTIFY
+    on a dedicated connection.
+
+    Notifications sent while the listener is disconnected are lost, so the
+    cache is cleared on every (re)connect and ``connected`` can be used to
+    avoid trusting the cache in the meantime. The revocation filter is not
+    restored: the rows of deleted sessions are gone, and a token it misses is
+    rejected by the database lookup that follows the cleared cache.
+    """
+
+    _instance: typing.Optional["SessionEventsListener"] = None
+    initialized = False
+
+    RECONNECT_DELAY = 5
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        self.connected = False
+        self._task: typing.Optional[asyncio.Task] = None
+        self._conn: typing.Optional[asyncpg.Connection] = None
+        self.initialized = True
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Session events listener failed")
+                logger.exception(e)
+            finally:
+                self.connected = False
+                if self._conn is not None and not self._conn.is_closed():
+                    await self._conn.close()
+                self._conn = None
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _listen(self):
+        config = Config()
+        self._conn = await asyncpg.connect(
+            user=config.db.user,
+            password=config.db.password,
+            database=config.db.database,
+            host=config.db.host,
+            port=config.db.port,
+            server_settings=config.db.server_settings,
+        )
+        closed = asyncio.Event()
+        self._conn.add_termination_listener(lambda _: closed.set())
+        await self._conn.add_listener(SESSION_REVOKED_CHANNEL, self._on_session_revoked)
+        await self._conn.add_listener(USER_CHANGED_CHANNEL, self._on_user_changed)
+
+        AuthCache().clear()
+        self.connected = True
+        logger.info("Listening for session events")
+        await closed.wait()
+        logger.warning("Session events connection lost")
+
+    @staticmethod
+    def _on_session_revoked(connection, pid, channel, payload: str):
+        RevocationFilter().revoke(payload, _token_expiration(payload))
+        AuthCache().invalidate_token(payload)
+
+    @staticmethod
+    def _on_user_changed(connection, pid, channel, payload: str):
+        AuthCache().invalidate_user(int(payload))
+
+
+def _token_expiration(token: str) -> float:
+    """
+    Unix time when the token stops passing signature and expiration checks
+    """
+    try:
+        return float(jwt.decode(token, options={"verify_signature": False})["exp"])
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        return time.time() + Config().jwt.expiration
@@ -0,0 +1,97 @@
+import logging
+import typing
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+logger = logging.getLogger("cc.database.statements")
+
+
+class Statement(str):
+    """
+    Named SQL statement from the registry.
+
+    It is a ``str``, so it can be passed to any asyncpg method as is. When it
+    goes through ``LazyConnection`` and the connection has it prepared, the
+    prepared statement is used instead of parsing and planning the query again.
+    """
+
+    name: str
+    hot: bool
+
+    def __new__(cls, name: str, sql: str, hot: bool = False):
+        statement = super().__new__(cls, sql)
+        statement.name = name
+        statement.hot = hot
+        return statement
+
+
+_registry: typing.Dict[str, Statement] = {}
+
+
+def register(name: str, sql: str, hot: bool = False) -> Statement:
+    """
+    Add a statement to the registry
+
+    :param name: unique name, "<module>.<function>" by convention
+    :param sql: statement text
+    :param hot: prepare the statement on every new connection
+    :return: the registered statement
+    """
+    if name in _registry:
+        raise ValueError(f"Statement {name} is already registered")
+    statement = Statement(name, sql, hot)
+    _registry[name] = statement
+    return statement
+
+
+def registered() -> typing.List[Statement]:
+    return list(_registry.values())
+
+
+class PreparingConnection(asyncpg.Connection):
+    """
+    Connection class of the pool, remembers the statements prepared by
+    ``prepare_hot_statements``
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: typing.Dict[str, PreparedStatement] = {}
+
+
+async def prepare_hot_statements(conn: PreparingConnection):
+    """
+    Pool ``init`` hook, prepares every hot statement once per connection
+
+    :param conn: newly created connection
+    :return: None
+    """
+    for statement in _registry.values():
+        if statement.hot:
+            conn.prepared[statement.name] = await conn.prepare(statement)
+
+
+def get_prepared(conn, query: str) -> typing.Optional[PreparedStatement]:
+    """
+    Find the prepared version of a query on a connection
+
+    :param conn: connection or pool connection proxy
+    :param query: query text or Statement
+    :return: prepared statement or None
+    """
+    if not isinstance(query, Statement):
+        return None
+    prepared = getattr(conn, "prepared", None)
+    if not prepared:
+        return None
+    return prepared.get(query.name)
+
+
+def forget_prepared(conn, query: Statement):
+    """
+    Drop a prepared statement that can't be used anymore, e.g. because the
+    schema has changed. Following calls go through asyncpg's statement cache
+    """
+    logger.warning("Dropping invalidated prepared statement %s", query.name)
+    conn.prepared.pop(query.name, None)
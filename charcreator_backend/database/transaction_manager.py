@@ -1,6 +1,13 @@
+import asyncio
+import time
+import typing
+
 import asyncpg
 from asyncpg import transaction
+from .. import metrics
 from ..config import Config
+from . import statements
+from .query_stats import QueryStats, count_rows
 from .functions import (
     codes,
     users,
@@ -11,70 +18,320 @@ from .functions import (
     # races,
     # sexes,
     sessions,
+    outbox,
 )
 
 
+class LazyConnection:
+    """
+    Connection handle passed to the function classes.
+
+    The underlying connection (and transaction) is only acquired from the
+    TransactionManager when the first query is executed. Registered
+    statements are executed through their prepared versions when the
+    connection has them.
+
+    A handle with ``begin=False`` doesn't start the transaction: its
+    statements run in autocommit mode until another handle of the manager
+    starts it, and inside the transaction after that.
+    """
+
+    def __init__(self, manager: "TransactionManager", begin: bool = True):
+        self._manager = manager
+        self._begin = begin
+        self._stats = QueryStats()
+
+    async def execute(self, query: str, *args, **kwargs):
+        return await self._timed("execute", query, args, kwargs)
+
+    async def executemany(self, query: str, args, **kwargs):
+        conn = await self._manager.acquire(self._begin)
+        if not self._stats.enabled:
+            return await conn.executemany(query, args, **kwargs)
+        started = time.perf_counter()
+        result = await conn.executemany(query, args, **kwargs)
+        self._stats.record(query, (), time.perf_counter() - started, 0)
+        return result
+
+    async def fetch(self, query: str, *args, **kwargs):
+        return await self._timed("fetch", query, args, kwargs)
+
+    def on_commit(self, callback: typing.Callable[[], typing.Any]):
+        """
+        See TransactionManager.on_commit
+        """
+        if not self._begin and self._manager.tran is None:
+            # the statements of this handle are committed already
+            callback()
+            return
+        self._manager.on_commit(callback)
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        return await self._timed("fetchrow", query, args, kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        return await self._timed("fetchval", query, args, kwargs)
+
+    async def _timed(self, method: str, query: str, args, kwargs):
+        # the pool wait and BEGIN of the first statement are not its duration
+        conn = await self._manager.acquire(self._begin)
+        if not self._stats.enabled:
+            return await self._run(conn, method, query, args, kwargs)
+        started = time.perf_counter()
+        result = await self._run(conn, method, query, args, kwargs)
+        self._stats.record(
+            query, args, time.perf_counter() - started, count_rows(method, result)
+        )
+        return result
+
+    async def _run(
+            self,
+            conn: asyncpg.connection.Connection,
+            method: str,
+            query: str,
+            args,
+            kwargs,
+    ):
+        prepared = statements.get_prepared(conn, query)
+        if prepared is None or method == "execute":
+            return await getattr(conn, method)(query, *args, **kwargs)
+
+        try:
+            return await getattr(prepared, method)(*args, **kwargs)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            statements.forget_prepared(conn, query)
+            if self._manager.tran is not None:
+                # the transaction is aborted already, let the caller retry
+                raise
+            return await getattr(conn, method)(query, *args, **kwargs)
+
+
 class FunctionsNamespace:
-    def __init__(self, connection: asyncpg.connection.Connection):
+    def __init__(self, connection: LazyConnection):
         self.connection = connection
         self.users: users.UserFunctions = users.UserFunctions(connection)
         self.codes: codes.CodeFunctions = codes.CodeFunctions(connection)
         self.sessions: sessions.SessionsFunctions = sessions.SessionsFunctions(
             connection
         )
+        self.outbox: outbox.OutboxFunctions = outbox.OutboxFunctions(connection)
+        self.assets: assets.AssetsFunctions = assets.AssetsFunctions(connection)
 
 
 class DBPool:
-    _instance = None
+    _instance: asyncpg.pool.Pool = None
+    _lock = asyncio.Lock()
 
     @staticmethod
-    async def get_instance(no_save=False):
+    async def create() -> asyncpg.pool.Pool:
+        """
+        Create a new pool with settings from the config
+
+        :return: a new pool, the caller is responsible for closing it
+        """
         config = Config()
+        return await asyncpg.create_pool(
+            user=config.db.user,
+            password=config.db.password,
+            database=config.db.database,
+            host=config.db.host,
+            port=config.db.port,
+            min_size=config.db.min_pool_size,
+            max_size=config.db.max_pool_size,
+            max_inactive_connection_lifetime=config.db.max_inactive_connection_lifetime,
+            max_queries=config.db.max_queries,
+            command_timeout=config.db.command_timeout,
+            statement_cache_size=config.db.statement_cache_size,
+            server_settings=config.db.server_settings,
+            connection_class=statements.PreparingConnection,
+            init=(
+                statements.prepare_hot_statements
+                if config.db.prepare_statements
+                else None
+            ),
+        )
+
+    @staticmethod
+    async def get_instance(no_save=False) -> asyncpg.pool.Pool:
+        """
+        Get the process-wide pool, creating it on first use
+
+        :param no_save: create a separate pool instead, the caller is
+            responsible for closing it
+        :return: pool
+        """
         if no_save:
-            return await asyncpg.create_pool(
-                user=config.db.user,
-                password=config.db.password,
-                database=config.db.database,
-                host=config.db.host,
-            )
+            return await DBPool.create()
         if DBPool._instance is None:
-            DBPool._instance = await asyncpg.create_pool(
-                user=config.db.user,
-                password=config.db.password,
-                database=config.db.database,
-                host=config.db.host,
-            )
+            async with DBPool._lock:
+                if DBPool._instance is None:
+                    DBPool._instance = await DBPool.create()
         return DBPool._instance
 
+    @staticmethod
+    async def warm_up():
+        """
+        Create the pool and make sure min_size connections are open and have
+        their statements prepared before the first request comes in
+
+        :return: None
+        """
+        pool = await DBPool.get_instance()
+        connections = await asyncio.gather(
+            *(pool.acquire() for _ in range(pool.get_min_size()))
+        )
+        await asyncio.gather(*(pool.release(conn) for conn in connections))
+
+    @staticmethod
+    async def close():
+        async with DBPool._lock:
+            if DBPool._instance is not None:
+                await DBPool._instance.close()
+                DBPool._instance = None
+
+
+metrics.DB_POOL_SIZE.set_function(
+    lambda: DBPool._instance.get_size() if DBPool._instance is not None else 0
+)
+metrics.DB_POOL_IDLE.set_function(
+    lambda: DBPool._instance.get_idle_size() if DBPool._instance is not None else 0
+)
+
 
 class TransactionManager:
-    pool: asyncpg.pool.Pool
-    conn: asyncpg.connection.Connection
-    tran: asyncpg.transaction.Transaction
+    pool: typing.Optional[asyncpg.pool.Pool]
+    conn: typing.Optional[asyncpg.connection.Connection]
+    tran: typing.Optional[asyncpg.transaction.Transaction]
     functions: FunctionsNamespace
+    # statements that don't need the transaction, e.g. the auth lookup, see
+    # LazyConnection
+    autocommit_functions: FunctionsNamespace
 
-    def __init__(self, no_save=False):
+    def __init__(self, no_save=False, readonly=False, lazy=True):
+        """
+        :param no_save: use a separate pool that is closed on exit
+        :param readonly: run every statement in autocommit mode instead of
+            wrapping them into a transaction. Saves the BEGIN and COMMIT round
+            trips, but statements don't share a snapshot
+        :param lazy: acquire the connection on the first query instead of on
+            enter, so handlers that never query don't take a connection
+        """
         self.explicit_rollback = False
         self.no_save = no_save
+        self.readonly = readonly
+        self.lazy = lazy
+        self.pool = None
+        self.conn = None
+        self.tran = None
+        self._acquire_lock = asyncio.Lock()
+        self._on_commit: typing.List[typing.Callable[[], typing.Any]] = []
 
     async def __aenter__(self):
-        self.pool = await DBPool.get_instance(self.no_save)
-        self.conn = await self.pool.acquire()
-        self.tran = self.conn.transaction()
-        await self.tran.start()
-        self.functions = FunctionsNamespace(self.conn)
+        self.functions = FunctionsNamespace(LazyConnection(self))
+        self.autocommit_functions = FunctionsNamespace(LazyConnection(self, begin=False))
+        if not self.lazy:
+            await self.acquire()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._finish(exc_type)
+
+    async def release(self):
+        """
+        Commit and return the connection to the pool before the manager is
+        exited, e.g. before a handler reads a long upload. Later statements
+        acquire a connection again
+
+        :return: None
+        """
+        await self._finish(None)
+
+    async def _finish(self, exc_type):
+        callbacks, self._on_commit = self._on_commit, []
+        if self.conn is None:
+            if not exc_type:
+                self._run_callbacks(callbacks)
+            return
         try:
-            if exc_type or self.explicit_rollback:
-                await self.tran.rollback()
-            else:
-                await self.tran.commit()
+            if self.tran is not None and not self.explicit_rollback:
+                if exc_type:
+                    await self.tran.rollback()
+                    metrics.DB_TRANSACTIONS.labels("rollback").inc()
+                else:
+                    try:
+                        await self.tran.commit()
+                        metrics.DB_TRANSACTIONS.labels("commit").inc()
+                    finally:
+                        # a failed COMMIT may still have gone through
+                        self._run_callbacks(callbacks)
+            elif not exc_type:
+                self._run_callbacks(callbacks)
         finally:
             await self.pool.release(self.conn)
+            if self.no_save:
+                await self.pool.close()
+            self.conn = None
+            self.tran = None
+
+    async def acquire(self, begin: bool = True) -> asyncpg.connection.Connection:
+        """
+        Get the connection of this manager, acquiring it and starting the
+        transaction if it hasn't been done yet
+
+        :param begin: start the transaction, otherwise the connection is left
+            in autocommit mode until a statement that needs it
+        :return: connection
+        """
+        if self.conn is not None and (not begin or not self._needs_begin):
+            return self.conn
+
+        async with self._acquire_lock:
+            if self.conn is None:
+                pool = await DBPool.get_instance(self.no_save)
+                started = time.perf_counter()
+                conn = await pool.acquire()
+                metrics.DB_POOL_ACQUIRE_DURATION.observe(time.perf_counter() - started)
+                self.pool = pool
+                self.conn = conn
+            if begin and self._needs_begin:
+                try:
+                    tran = self.conn.transaction()
+                    await tran.start()
+                    self.tran = tran
+                except BaseException:
+                    await self.pool.release(self.conn)
+                    if self.no_save:
+                        await self.pool.close()
+                    self.conn = None
+                    raise
+        return self.conn
+
+    @property
+    def _needs_begin(self) -> bool:
+        return self.tran is None and not self.readonly and not self.explicit_rollback
+
+    def on_commit(self, callback: typing.Callable[[], typing.Any]):
+        """
+        Call a function once the changes made so far are visible to other
+        connections: after COMMIT, or right away if statements run in
+        autocommit mode. Dropped if the transaction is rolled back
+
+        :param callback: function without arguments, e.g. a cache invalidation
+        :return: None
+        """
+        if self.readonly or self.explicit_rollback:
+            callback()
+            return
+        self._on_commit.append(callback)
+
+    @staticmethod
+    def _run_callbacks(callbacks: typing.List[typing.Callable[[], typing.Any]]):
+        for callback in callbacks:
+            callback()
 
     async def rollback(self):
-        if self.tran:
+        if self.tran and not self.explicit_rollback:
             await self.tran.rollback()
-            self.explicit_rollback = True
+            metrics.DB_TRANSACTIONS.labels("rollback").inc()
+        self.explicit_rollback = True
+        self._on_commit = []
@@ -1,3 +1,17 @@
-from .dependencies import may_be_logged_in, must_be_logged_in, SessionData
+from .dependencies import (
+    local_request,
+    may_be_logged_in,
+    must_be_admin,
+    must_be_logged_in,
+    request_transaction,
+    SessionData,
+)
 
-__all__ = ["may_be_logged_in", "must_be_logged_in", "SessionData"]
+__all__ = [
+    "local_request",
+    "may_be_logged_in",
+    "must_be_admin",
+    "must_be_logged_in",
+    "request_transaction",
+    "SessionData",
+]
@@ -1,4 +1,4 @@
-from . import example
+from . import admin, asset_files, assets, debug, example, monitoring, render
 
 
-__all__ = ["example"]
+__all__ = ["admin", "asset_files", "assets", "debug", "example", "monitoring", "render"]
@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import logging
+import typing
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+)
+
+from . import models as admin_module_models
+from ...asset_files import AssetFiles
+from ...asset_upload import AssetUploads, UploadJob, UploadOutcome, stream_files
+from ...database import AssetCatalog, TransactionManager
+from ...dependencies import SessionData, must_be_admin, request_transaction
+from ...responses import trusted_response
+from ...shared_models import ErrorModel
+
+router = APIRouter()
+
+logger = logging.getLogger("cc.endpoints.admin")
+app: FastAPI = None
+
+fastapi_tags = ["Admin"]
+
+UploadResults = typing.List[admin_module_models.AssetUploadResult]
+
+
+def to_result(outcome: UploadOutcome) -> admin_module_models.AssetUploadResult:
+    files = AssetFiles()
+    return admin_module_models.AssetUploadResult(
+        filename=outcome.filename,
+        file_name=outcome.file_name,
+        asset=(
+            outcome.asset.to_model(files.url(outcome.asset.file_name))
+            if outcome.asset is not None
+            else None
+        ),
+        variants=[files.url(variant) for variant in outcome.variants],
+        error=outcome.error,
+    )
+
+
+async def finish(
+        jobs: typing.List[UploadJob], session: SessionData
+) -> typing.List[UploadOutcome]:
+    """
+    Wait for the jobs that weren't dropped and refresh the catalog
+
+    :return: outcomes of those jobs
+    """
+    outcomes: typing.List[UploadOutcome] = await asyncio.gather(
+        *(job.future for job in jobs if not job.future.cancelled())
+    )
+    uploaded = sum(outcome.asset is not None for outcome in outcomes)
+    logger.info(
+        "User %d uploaded %d of %d assets", session.user.id, uploaded, len(jobs)
+    )
+    catalog = AssetCatalog()
+    if uploaded and catalog.loaded:
+        await catalog.refresh()
+    return outcomes
+
+
+@router.post(
+    "/assets",
+    tags=fastapi_tags,
+    name="Upload assets",
+    description="Upload asset images as multipart/form-data, the field name of a file is its asset type",
+    response_model=UploadResults,
+)
+async def upload_assets(
+        request: Request,
+        colorable: bool = Query(
+            False,
+            title="Colorable",
+            description="Whether the uploaded assets can be recolored",
+        ),
+        session: SessionData = Depends(must_be_admin),
+        transaction: TransactionManager = Depends(request_transaction),
+):
+    """
+    Upload asset images, every file gets a result. A file with the name of an
+    existing asset replaces it. If the body is rejected halfway, the files
+    already being processed are reported in the fields of the error
+    """
+    # the body can take minutes to arrive, the uploads use their own connections
+    await transaction.release()
+    uploads = AssetUploads()
+    config = uploads.config
+    jobs: typing.List[UploadJob] = []
+    try:
+        # files are queued while the body is still being read
+        async with contextlib.aclosing(
+            stream_files(request, config.staging_directory, config.max_file_size, config.max_files)
+        ) as staged_files:
+            async for staged in staged_files:
+                jobs.append(await uploads.submit(staged, colorable))
+    except HTTPException as e:
+        # files still in the queue are dropped, the ones being processed
+        # finish and are reported along with the error
+        for job in jobs:
+            job.cancel()
+        outcomes = await finish(jobs, session)
+        error: ErrorModel = e.custom_data
+        raise ErrorModel(
+            code=error.code,
+            message=error.message,
+            fields={
+                **(error.fields or {}),
+                "results": [to_result(outcome).model_dump() for outcome in outcomes],
+            },
+        ).as_http_exception()
+    except Exception:
+        # e.g. the client went away, nobody will see the results
+        for job in jobs:
+            job.cancel()
+        raise
+
+    outcomes = await finish(jobs, session)
+    return trusted_response([to_result(outcome) for outcome in outcomes], UploadResults)
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
@@ -0,0 +1,3 @@
+from .models import AssetUploadResult
+
+__all__ = ["AssetUploadResult"]
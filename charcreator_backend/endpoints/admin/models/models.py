@@ -0,0 +1,27 @@
+import typing
+
+import pydantic
+
+from ....shared_models import AssetModel
+
+
+class AssetUploadResult(pydantic.BaseModel):
+    """
+    Результат загрузки одного файла
+    """
+
+    filename: str = pydantic.Field(
+        ..., description="Имя файла в запросе", title="Имя файла"
+    )
+    file_name: typing.Optional[str] = pydantic.Field(
+        None, description="Имя файла ассета", title="Файл ассета"
+    )
+    asset: typing.Optional[AssetModel] = pydantic.Field(
+        None, description="Созданный или обновлённый ассет", title="Ассет"
+    )
+    variants: typing.List[str] = pydantic.Field(
+        ..., description="Адреса уменьшенных и WebP вариантов", title="Варианты"
+    )
+    error: typing.Optional[str] = pydantic.Field(
+        None, description="Ошибка, если файл не принят", title="Ошибка"
+    )
@@ -0,0 +1,3 @@
+from .asset_files_endpoints import init_submodule
+
+__all__ = ["init_submodule"]
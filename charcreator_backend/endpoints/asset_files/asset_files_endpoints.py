@@ -0,0 +1,81 @@
+import logging
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Header,
+    Path,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import RedirectResponse
+
+from ...asset_files import AssetFiles, file_response
+from ...shared_models import ErrorModel
+
+router = APIRouter()
+
+logger = logging.getLogger("cc.endpoints.asset_files")
+app: FastAPI = None
+
+fastapi_tags = ["Asset files"]
+
+
+@router.api_route(
+    "/{digest}/{file_name:path}",
+    methods=["GET", "HEAD"],
+    tags=fastapi_tags,
+    name="Asset file",
+    description="Get an asset image by its fingerprinted URL, supports conditional and range requests",
+    response_class=Response,
+)
+async def get_asset_file(
+        request: Request,
+        digest: str = Path(..., title="Digest", description="Content hash of the file"),
+        file_name: str = Path(..., title="File name", description="Asset.file_name"),
+        if_none_match: str = Header(None),
+        if_range: str = Header(None),
+        range_header: str = Header(None, alias="Range"),
+):
+    """
+    Get an asset image by its fingerprinted URL
+    """
+    files = AssetFiles()
+    info = await files.get(file_name)
+    if info is None:
+        raise ErrorModel(
+            code=status.HTTP_404_NOT_FOUND,
+            message="Asset file not found",
+            fields={"file_name": file_name},
+        ).as_http_exception()
+
+    if digest != info.digest:
+        # an old or made up fingerprint, point to the current content
+        return RedirectResponse(
+            files.url(file_name),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    return file_response(
+        info,
+        request.method,
+        files.max_age,
+        if_none_match,
+        if_range,
+        range_header,
+        files.chunk_size,
+    )
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
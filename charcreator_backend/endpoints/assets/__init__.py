@@ -0,0 +1,3 @@
+from .assets_endpoints import init_submodule
+
+__all__ = ["init_submodule"]
@@ -0,0 +1,225 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import typing
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Depends,
+    Header,
+    Path,
+    Query,
+    Response,
+    status,
+)
+
+from ...asset_files import AssetFiles, FileRangeResponse
+from ...atlas import manifest_name
+from ...database import AssetCatalog, TransactionManager
+from ...database.functions.assets import Asset, AssetType
+from ...dependencies import request_transaction
+from ...responses import JsonResponse, dump_trusted, trusted_response, validate_trusted
+from ...shared_models import AssetModel, ErrorModel
+
+router = APIRouter()
+
+logger = logging.getLogger("cc.endpoints.assets")
+app: FastAPI = None
+
+fastapi_tags = ["Assets"]
+
+MAX_BATCH_SIZE = 500
+
+AssetList = typing.List[AssetModel]
+
+
+def to_models(assets: typing.Iterable[Asset]) -> AssetList:
+    files = AssetFiles()
+    return validate_trusted(
+        [asset.model_data(files.url(asset.file_name)) for asset in assets], AssetList
+    )
+
+
+def list_body(assets: typing.Iterable[Asset]) -> bytes:
+    return dump_trusted(to_models(assets), AssetList)
+
+
+def catalog_response(
+        key: typing.Any,
+        build: typing.Callable[[], bytes],
+        if_none_match: typing.Optional[str],
+) -> Response:
+    """
+    Response served from the in-memory catalog. The body and its ETag are
+    built once per catalog and file URLs version. The ETag is a hash of the
+    body, so it stays valid across restarts and app processes
+    """
+    snapshot = AssetCatalog().snapshot
+    memo_key = (key, AssetFiles().version)
+    body = snapshot.memo(memo_key, build)
+    etag = snapshot.memo(
+        ("etag", memo_key),
+        lambda: f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+    )
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(
+        content=body,
+        media_type=JsonResponse.media_type,
+        headers={"ETag": etag},
+    )
+
+
+def asset_not_found(asset_id: int):
+    return ErrorModel(
+        code=status.HTTP_404_NOT_FOUND,
+        message="Asset not found",
+        fields={"id": asset_id},
+    ).as_http_exception()
+
+
+@router.get(
+    "",
+    tags=fastapi_tags,
+    name="List assets",
+    description="Get all assets or assets of one type",
+    response_model=AssetList,
+)
+async def list_assets(
+        asset_type: typing.Optional[AssetType] = Query(
+            None, title="Asset type", description="Only return assets of this type"
+        ),
+        if_none_match: typing.Optional[str] = Header(None),
+        transaction: TransactionManager = Depends(request_transaction),
+):
+    """
+    Get all assets or assets of one type
+    """
+    catalog = AssetCatalog()
+    if catalog.loaded:
+        if asset_type is None:
+            return catalog_response(
+                "all", lambda: list_body(catalog.list_all()), if_none_match
+            )
+        return catalog_response(
+            asset_type,
+            lambda: list_body(catalog.list_by_type(asset_type)),
+            if_none_match,
+        )
+
+    if asset_type is None:
+        assets = await transaction.functions.assets.list_all()
+    else:
+        assets = await transaction.functions.assets.list_by_type(asset_type)
+    return trusted_response(to_models(assets), AssetList)
+
+
+@router.get(
+    "/batch",
+    tags=fastapi_tags,
+    name="Get assets",
+    description=f"Get up to {MAX_BATCH_SIZE} assets by ids, unknown ids are skipped",
+    response_model=AssetList,
+)
+async def get_assets(
+        ids: typing.List[int] = Query(
+            ..., title="IDs", description="IDs of the assets", max_length=MAX_BATCH_SIZE
+        ),
+        transaction: TransactionManager = Depends(request_transaction),
+):
+    """
+    Get assets by ids
+    """
+    catalog = AssetCatalog()
+    if catalog.loaded:
+        assets = catalog.get_many(ids)
+    else:
+        assets = await transaction.functions.assets.get_many(ids)
+    return trusted_response(to_models(assets), AssetList)
+
+
+@router.get(
+    "/manifest",
+    tags=fastapi_tags,
+    name="Atlas manifest",
+    description="Get the manifest of the sprite atlases, gzipped if the client accepts it",
+    response_class=Response,
+)
+async def get_manifest(
+        if_none_match: typing.Optional[str] = Header(None),
+        accept_encoding: typing.Optional[str] = Header(None),
+):
+    """
+    Get the manifest written by ``python -m charcreator_backend.atlas``
+    """
+    info = await AssetFiles().get(manifest_name())
+    if info is None:
+        raise ErrorModel(
+            code=status.HTTP_404_NOT_FOUND,
+            message="Atlases are not built",
+        ).as_http_exception()
+
+    # the representations differ byte for byte, so each has its own tag
+    gzipped = bool(accept_encoding) and "gzip" in accept_encoding
+    etag = f'"{info.digest}-gz"' if gzipped else info.etag
+    # rebuilt in place, clients revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if gzipped:
+        return FileRangeResponse(
+            info,
+            0,
+            info.size - 1,
+            status.HTTP_200_OK,
+            {**headers, "Content-Encoding": "gzip"},
+            chunk_size=AssetFiles().chunk_size,
+        )
+    body = await asyncio.to_thread(_read_gzip, info.path)
+    return Response(content=body, media_type=JsonResponse.media_type, headers=headers)
+
+
+def _read_gzip(path: str) -> bytes:
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+
+@router.get(
+    "/{asset_id}",
+    tags=fastapi_tags,
+    name="Get asset",
+    description="Get an asset by id",
+    response_model=AssetModel,
+)
+async def get_asset(
+        asset_id: int = Path(..., title="ID", description="ID of the asset"),
+        transaction: TransactionManager = Depends(request_transaction),
+):
+    """
+    Get an asset by id
+    """
+    catalog = AssetCatalog()
+    if catalog.loaded:
+        asset = catalog.get(asset_id)
+    else:
+        asset = await transaction.functions.assets.get(asset_id)
+    if asset is None:
+        raise asset_not_found(asset_id)
+    return trusted_response(asset.to_model(AssetFiles().url(asset.file_name)))
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
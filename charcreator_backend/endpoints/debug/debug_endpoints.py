@@ -0,0 +1,262 @@
+import collections
+import datetime
+import logging
+import tracemalloc
+import typing
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Depends,
+    Path,
+    Query,
+    Response,
+    status,
+)
+
+from . import models as debug_module_models
+from ...database import QueryStats
+from ...dependencies import local_request
+from ...shared_models import ErrorModel
+
+router = APIRouter(dependencies=[Depends(local_request)])
+
+logger = logging.getLogger("cc.endpoints.debug")
+app: FastAPI = None
+
+fastapi_tags = ["Debug"]
+
+MAX_SNAPSHOTS = 10
+
+# snapshot id -> (time taken, snapshot), oldest first
+snapshots: typing.OrderedDict[
+    int, typing.Tuple[datetime.datetime, tracemalloc.Snapshot]
+] = collections.OrderedDict()
+next_snapshot_id = 1
+
+# allocations made by tracemalloc itself are noise in the diffs
+snapshot_filters = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def tracemalloc_status() -> debug_module_models.TracemallocStatus:
+    current, peak = tracemalloc.get_traced_memory()
+    return debug_module_models.TracemallocStatus(
+        tracing=tracemalloc.is_tracing(),
+        frames=tracemalloc.get_traceback_limit(),
+        current=current,
+        peak=peak,
+        snapshots=list(snapshots.keys()),
+    )
+
+
+def get_snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    if snapshot_id not in snapshots:
+        raise ErrorModel(
+            code=status.HTTP_404_NOT_FOUND,
+            message="Snapshot not found",
+            fields={"id": snapshot_id},
+        ).as_http_exception()
+    return snapshots[snapshot_id][1]
+
+
+@router.get(
+    "/tracemalloc",
+    tags=fastapi_tags,
+    name="Tracemalloc status",
+    description="Get tracemalloc state and saved snapshots",
+    response_model=debug_module_models.TracemallocStatus,
+)
+async def get_tracemalloc_status():
+    """
+    Get tracemalloc state and saved snapshots
+    """
+    return tracemalloc_status()
+
+
+@router.post(
+    "/tracemalloc/start",
+    tags=fastapi_tags,
+    name="Start tracemalloc",
+    description="Start tracing memory allocations",
+    response_model=debug_module_models.TracemallocStatus,
+)
+async def start_tracemalloc(
+        frames: int = Query(
+            1,
+            title="Frames",
+            description="Number of stack frames to store for every allocation",
+            ge=1,
+            le=100,
+        ),
+):
+    """
+    Start tracing memory allocations
+    """
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+    logger.warning("tracemalloc started with %d frames", frames)
+    return tracemalloc_status()
+
+
+@router.post(
+    "/tracemalloc/stop",
+    tags=fastapi_tags,
+    name="Stop tracemalloc",
+    description="Stop tracing memory allocations, saved snapshots are kept",
+    response_model=debug_module_models.TracemallocStatus,
+)
+async def stop_tracemalloc():
+    """
+    Stop tracing memory allocations
+    """
+    tracemalloc.stop()
+    logger.warning("tracemalloc stopped")
+    return tracemalloc_status()
+
+
+@router.post(
+    "/tracemalloc/snapshots",
+    tags=fastapi_tags,
+    name="Take snapshot",
+    description=f"Take a snapshot of traced allocations, only the last {MAX_SNAPSHOTS} are kept",
+    response_model=debug_module_models.SnapshotInfo,
+    status_code=status.HTTP_201_CREATED,
+)
+async def take_snapshot():
+    """
+    Take a snapshot of traced allocations
+    """
+    global next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise ErrorModel(
+            code=status.HTTP_409_CONFLICT,
+            message="tracemalloc is not running",
+        ).as_http_exception()
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+    taken_at = datetime.datetime.now()
+    snapshot_id = next_snapshot_id
+    next_snapshot_id += 1
+
+    snapshots[snapshot_id] = (taken_at, snapshot)
+    while len(snapshots) > MAX_SNAPSHOTS:
+        snapshots.popitem(last=False)
+
+    return debug_module_models.SnapshotInfo(
+        id=snapshot_id,
+        taken_at=taken_at,
+        size=sum(stat.size for stat in snapshot.statistics("filename")),
+    )
+
+
+@router.delete(
+    "/tracemalloc/snapshots",
+    tags=fastapi_tags,
+    name="Delete snapshots",
+    description="Delete all saved snapshots",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_snapshots():
+    """
+    Delete all saved snapshots
+    """
+    snapshots.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/tracemalloc/diff/{first}/{second}",
+    tags=fastapi_tags,
+    name="Snapshot diff",
+    description="Get top allocation differences between two snapshots",
+    response_model=typing.List[debug_module_models.AllocationDiff],
+)
+async def snapshot_diff(
+        first: int = Path(..., title="First", description="ID of the older snapshot"),
+        second: int = Path(..., title="Second", description="ID of the newer snapshot"),
+        limit: int = Query(
+            20, title="Limit", description="Number of entries to return", ge=1, le=1000
+        ),
+        group_by: typing.Literal["lineno", "filename", "traceback"] = Query(
+            "lineno", title="Group by", description="How to group allocations"
+        ),
+):
+    """
+    Get top allocation differences between two snapshots
+    """
+    stats = get_snapshot(second).compare_to(get_snapshot(first), group_by)
+    return [
+        debug_module_models.AllocationDiff(
+            location=str(stat.traceback),
+            size=stat.size,
+            size_diff=stat.size_diff,
+            count=stat.count,
+            count_diff=stat.count_diff,
+        )
+        for stat in stats[:limit]
+    ]
+
+
+@router.get(
+    "/queries",
+    tags=fastapi_tags,
+    name="Query statistics",
+    description="Get per-statement execution statistics, slowest in total first",
+    response_model=typing.List[debug_module_models.QueryStatistics],
+)
+async def get_query_statistics(
+        limit: int = Query(
+            50, title="Limit", description="Number of entries to return", ge=1, le=1000
+        ),
+):
+    """
+    Get per-statement execution statistics
+    """
+    statements = sorted(
+        QueryStats().statements.values(), key=lambda stats: stats.total_time, reverse=True
+    )
+    return [
+        debug_module_models.QueryStatistics(
+            statement=stats.key,
+            sql=stats.sql,
+            calls=stats.calls,
+            total_time=stats.total_time,
+            mean_time=stats.total_time / stats.calls,
+            max_time=stats.max_time,
+            rows=stats.rows,
+            plan=stats.plan,
+        )
+        for stats in statements[:limit]
+    ]
+
+
+@router.post(
+    "/queries/reset",
+    tags=fastapi_tags,
+    name="Reset query statistics",
+    description="Forget collected query statistics",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def reset_query_statistics():
+    """
+    Forget collected query statistics
+    """
+    QueryStats().reset()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
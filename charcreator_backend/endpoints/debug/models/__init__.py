@@ -0,0 +1,3 @@
+from .models import TracemallocStatus, SnapshotInfo, AllocationDiff, QueryStatistics
+
+__all__ = ["TracemallocStatus", "SnapshotInfo", "AllocationDiff", "QueryStatistics"]
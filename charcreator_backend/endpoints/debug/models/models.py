@@ -0,0 +1,87 @@
+import datetime
+import typing
+
+import pydantic
+
+
+class TracemallocStatus(pydantic.BaseModel):
+    """
+    Модель состояния tracemalloc
+    """
+
+    tracing: bool = pydantic.Field(
+        ..., description="Включено ли отслеживание аллокаций", title="Отслеживание"
+    )
+    frames: int = pydantic.Field(
+        ..., description="Глубина сохраняемого стека", title="Глубина стека"
+    )
+    current: int = pydantic.Field(
+        ..., description="Текущий объем отслеживаемой памяти в байтах", title="Текущий объем"
+    )
+    peak: int = pydantic.Field(
+        ..., description="Пиковый объем отслеживаемой памяти в байтах", title="Пиковый объем"
+    )
+    snapshots: typing.List[int] = pydantic.Field(
+        ..., description="Идентификаторы сохраненных снимков", title="Снимки"
+    )
+
+
+class SnapshotInfo(pydantic.BaseModel):
+    """
+    Модель снимка памяти
+    """
+
+    id: int = pydantic.Field(..., description="Идентификатор снимка", title="ID")
+    taken_at: datetime.datetime = pydantic.Field(
+        ..., description="Время создания снимка", title="Время создания"
+    )
+    size: int = pydantic.Field(
+        ..., description="Суммарный объем аллокаций в снимке в байтах", title="Объем"
+    )
+
+
+class AllocationDiff(pydantic.BaseModel):
+    """
+    Модель разницы аллокаций между двумя снимками
+    """
+
+    location: str = pydantic.Field(
+        ..., description="Место аллокации", title="Место"
+    )
+    size: int = pydantic.Field(..., description="Объем в байтах", title="Объем")
+    size_diff: int = pydantic.Field(
+        ..., description="Изменение объема в байтах", title="Изменение объема"
+    )
+    count: int = pydantic.Field(..., description="Число блоков", title="Блоки")
+    count_diff: int = pydantic.Field(
+        ..., description="Изменение числа блоков", title="Изменение блоков"
+    )
+
+
+class QueryStatistics(pydantic.BaseModel):
+    """
+    Модель статистики выполнения запроса
+    """
+
+    statement: str = pydantic.Field(
+        ..., description="Имя зарегистрированного запроса или его текст", title="Запрос"
+    )
+    sql: str = pydantic.Field(..., description="Текст запроса", title="SQL")
+    calls: int = pydantic.Field(..., description="Число выполнений", title="Выполнения")
+    total_time: float = pydantic.Field(
+        ..., description="Суммарное время выполнения в секундах", title="Суммарное время"
+    )
+    mean_time: float = pydantic.Field(
+        ..., description="Среднее время выполнения в секундах", title="Среднее время"
+    )
+    max_time: float = pydantic.Field(
+        ..., description="Максимальное время выполнения в секундах", title="Максимальное время"
+    )
+    rows: int = pydantic.Field(
+        ..., description="Суммарное число возвращенных или измененных строк", title="Строки"
+    )
+    plan: typing.Optional[str] = pydantic.Field(
+        None,
+        description="План самого медленного выполнения (EXPLAIN ANALYZE), если был получен",
+        title="План",
+    )
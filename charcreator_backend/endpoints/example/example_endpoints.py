@@ -6,6 +6,7 @@ from fastapi import (
     FastAPI,
     APIRouter,
     Body,
+    Depends,
     Path,
     Response,
     status,
@@ -14,6 +15,8 @@ from fastapi import (
 from . import models as example_module_models
 from ...config import Config
 from ...database import TransactionManager
+from ...dependencies import SessionData, must_be_logged_in, request_transaction
+from ...shared_models import UserModel
 
 router = APIRouter()
 config = Config()
@@ -38,13 +41,13 @@ async def submit_example(
             title="Request",
             description="Request body",
         ),
+        transaction: TransactionManager = Depends(request_transaction),
 ):
     """
     An example of a POST request
     """
-    async with TransactionManager() as transaction:
-        # you'd put database calls here
-        ...
+    # you'd put database calls here, e.g. transaction.functions.users.get(...)
+    ...
 
     return example_module_models.ExampleResponse(
         **request.model_dump(),
@@ -66,17 +69,33 @@ async def delete_example(
             title="ID",
             description="ID of the object to delete",
         ),
+        transaction: TransactionManager = Depends(request_transaction),
 ):
     """
     An example of a DELETE request
     """
-    async with TransactionManager() as transaction:
-        # you'd put database calls here
-        ...
+    # you'd put database calls here, e.g. transaction.functions.users.get(...)
+    ...
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+@router.get(
+    "/me",
+    tags=fastapi_tags,
+    name="Example authenticated request",
+    description="An example of a request that requires a logged in user",
+    response_model=UserModel,
+)
+async def current_user(
+        data: SessionData = Depends(must_be_logged_in),
+):
+    """
+    An example of a request that requires a logged in user
+    """
+    return data.user.to_model()
+
+
 @router.get(
     "/random_number",
     tags=fastapi_tags,
@@ -0,0 +1,3 @@
+from .monitoring_endpoints import init_submodule
+
+__all__ = ["init_submodule"]
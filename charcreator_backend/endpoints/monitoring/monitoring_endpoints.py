@@ -0,0 +1,47 @@
+import logging
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Depends,
+    Response,
+)
+
+from ... import metrics
+from ...dependencies import local_request
+
+router = APIRouter(dependencies=[Depends(local_request)])
+
+logger = logging.getLogger("cc.endpoints.monitoring")
+app: FastAPI = None
+
+fastapi_tags = ["Monitoring"]
+
+
+@router.get(
+    "/metrics",
+    tags=fastapi_tags,
+    name="Metrics",
+    description="Metrics of this process in the Prometheus text exposition format",
+    response_class=Response,
+)
+async def get_metrics():
+    """
+    Metrics of this process in the Prometheus text exposition format
+    """
+    return Response(
+        content=metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
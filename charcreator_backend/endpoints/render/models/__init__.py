@@ -0,0 +1,3 @@
+from .models import LayerProperties, RenderLayerModel, RenderRequest, RenderResult
+
+__all__ = ["LayerProperties", "RenderLayerModel", "RenderRequest", "RenderResult"]
@@ -0,0 +1,65 @@
+import typing
+
+import pydantic
+
+
+class LayerProperties(pydantic.BaseModel):
+    """
+    Свойства слоя, переопределяют свойства ассета по умолчанию
+    """
+
+    color: typing.Optional[str] = pydantic.Field(
+        None,
+        description="Цвет в формате #rrggbb, только для перекрашиваемых ассетов",
+        title="Цвет",
+        pattern=r"^#[0-9a-fA-F]{6}$",
+    )
+    opacity: typing.Optional[float] = pydantic.Field(
+        None, description="Непрозрачность", title="Непрозрачность", ge=0, le=1
+    )
+    offset_x: typing.Optional[int] = pydantic.Field(
+        None, description="Сдвиг по горизонтали в пикселях", title="Сдвиг X", ge=-4096, le=4096
+    )
+    offset_y: typing.Optional[int] = pydantic.Field(
+        None, description="Сдвиг по вертикали в пикселях", title="Сдвиг Y", ge=-4096, le=4096
+    )
+
+
+class RenderLayerModel(pydantic.BaseModel):
+    """
+    Слой персонажа
+    """
+
+    asset_id: int = pydantic.Field(..., description="Идентификатор ассета", title="ID ассета")
+    properties: LayerProperties = pydantic.Field(
+        default_factory=LayerProperties, description="Свойства слоя", title="Свойства"
+    )
+
+
+class RenderRequest(pydantic.BaseModel):
+    """
+    Модель запроса на отрисовку персонажа
+    """
+
+    layers: typing.List[RenderLayerModel] = pydantic.Field(
+        ...,
+        description="Слои снизу вверх",
+        title="Слои",
+        min_length=1,
+        max_length=64,
+    )
+    size: int = pydantic.Field(
+        ..., description="Ширина и высота изображения в пикселях", title="Размер"
+    )
+    format: typing.Literal["png", "webp"] = pydantic.Field(
+        "webp", description="Формат изображения", title="Формат"
+    )
+
+
+class RenderResult(pydantic.BaseModel):
+    """
+    Модель ответа с отрисованным персонажем
+    """
+
+    key: str = pydantic.Field(..., description="Ключ изображения в кеше", title="Ключ")
+    url: str = pydantic.Field(..., description="Адрес изображения", title="Адрес")
@@ -0,0 +1,186 @@
+import logging
+import os
+import typing
+
+from fastapi import (
+    FastAPI,
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    Path,
+    Request,
+    Response,
+    status,
+)
+
+from . import models as render_module_models
+from ...asset_files import AssetFiles, FileInfo, file_response
+from ...database import AssetCatalog, TransactionManager
+from ...database.functions.assets import Asset
+from ...dependencies import SessionData, must_be_logged_in, request_transaction
+from ...rendering import URL_PREFIX, Renderer, RenderLayer
+from ...shared_models import ErrorModel
+
+router = APIRouter()
+
+logger = logging.getLogger("cc.endpoints.render")
+app: FastAPI = None
+
+fastapi_tags = ["Render"]
+
+# a render never changes, its name is the hash of everything it's made of
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def layer_properties(asset: Asset, layer: render_module_models.RenderLayerModel) -> dict:
+    """
+    Asset defaults overridden by the layer, only the properties the
+    compositor understands so that they don't change the cache key
+    """
+    known = render_module_models.LayerProperties.model_fields
+    properties = {
+        key: value
+        for key, value in (asset.default_properties or {}).items()
+        if key in known and value is not None
+    }
+    properties.update(layer.properties.model_dump(exclude_none=True))
+    if not asset.colorable:
+        properties.pop("color", None)
+    return properties
+
+
+async def resolve_layers(
+        layers: typing.List[render_module_models.RenderLayerModel],
+        transaction: TransactionManager,
+) -> typing.List[RenderLayer]:
+    """
+    :raise: ErrorModel(code=status.HTTP_404_NOT_FOUND) if an asset or its file doesn't exist
+    """
+    ids = [layer.asset_id for layer in layers]
+    catalog = AssetCatalog()
+    if catalog.loaded:
+        assets = catalog.get_many(ids)
+    else:
+        assets = await transaction.functions.assets.get_many(ids)
+    by_id = {asset.id: asset for asset in assets}
+    missing = sorted(set(ids) - by_id.keys())
+    if missing:
+        raise ErrorModel(
+            code=status.HTTP_404_NOT_FOUND,
+            message="Asset not found",
+            fields={"ids": missing},
+        ).as_http_exception()
+
+    files = AssetFiles()
+    resolved = []
+    for layer in layers:
+        asset = by_id[layer.asset_id]
+        info = await files.get(asset.file_name)
+        if info is None:
+            raise ErrorModel(
+                code=status.HTTP_404_NOT_FOUND,
+                message="Asset file not found",
+                fields={"id": asset.id, "file_name": asset.file_name},
+            ).as_http_exception()
+        resolved.append(
+            RenderLayer(asset.id, info.path, info.digest, layer_properties(asset, layer))
+        )
+    return resolved
+
+
+@router.post(
+    "",
+    tags=fastapi_tags,
+    name="Render character",
+    description="Composite a character from asset layers into a square thumbnail",
+    response_model=render_module_models.RenderResult,
+)
+async def render_character(
+        request: render_module_models.RenderRequest = Body(
+            ...,
+            title="Request",
+            description="Layers and thumbnail settings",
+        ),
+        session: SessionData = Depends(must_be_logged_in),
+        transaction: TransactionManager = Depends(request_transaction),
+):
+    """
+    Composite a character into a thumbnail, the result is cached by its content
+    """
+    renderer = Renderer()
+    if request.size not in renderer.sizes:
+        raise ErrorModel(
+            code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            message="Unsupported size",
+            fields={"size": request.size, "sizes": renderer.sizes},
+        ).as_http_exception()
+
+    layers = await resolve_layers(request.layers, transaction)
+    # the render can take a while, don't hold the connection
+    await transaction.release()
+    name = await renderer.render(layers, request.size, request.format)
+    return render_module_models.RenderResult(
+        key=name.partition(".")[0], url=f"{URL_PREFIX}/{name}"
+    )
+
+
+@router.api_route(
+    "/{name}",
+    methods=["GET", "HEAD"],
+    tags=fastapi_tags,
+    name="Rendered character",
+    description="Get a rendered thumbnail, supports conditional and range requests",
+    response_class=Response,
+)
+async def get_render(
+        request: Request,
+        name: str = Path(
+            ...,
+            title="Name",
+            description="Key and format, e.g. <key>.webp",
+            pattern=r"^[0-9a-f]{32}\.(png|webp)$",
+        ),
+        if_none_match: str = Header(None),
+        if_range: str = Header(None),
+        range_header: str = Header(None, alias="Range"),
+):
+    """
+    Get a rendered thumbnail from the cache
+    """
+    path = Renderer().cache.get(name)
+    stat = None
+    if path is not None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            pass
+    if stat is None:
+        raise ErrorModel(
+            code=status.HTTP_404_NOT_FOUND,
+            message="Render not found",
+            fields={"name": name},
+        ).as_http_exception()
+
+    info = FileInfo(path, stat.st_size, stat.st_mtime_ns, name.partition(".")[0])
+    return file_response(
+        info,
+        request.method,
+        MAX_AGE,
+        if_none_match,
+        if_range,
+        range_header,
+        AssetFiles().chunk_size,
+    )
+
+
+async def init_submodule(
+        parent_app: FastAPI,
+        submodule_path_prefix: str,
+        module_name: str = __name__,
+):
+    global app
+    app = parent_app
+    logger.info(f"Инициализация модуля {module_name}")
+    app.include_router(router, prefix=submodule_path_prefix)
+    logger.info(f"Модуль {module_name} инициализирован")
@@ -0,0 +1,4 @@
+from .hashing import PasswordHasher, hash_password
+
+
+__all__ = ["PasswordHasher", "hash_password"]
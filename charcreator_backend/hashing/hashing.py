@@ -0,0 +1,94 @@
+import asyncio
+import concurrent.futures
+import typing
+
+import bcrypt
+import fastapi
+
+from ..config import Config
+from ..shared_models import ErrorModel
+
+
+def _hashpw(password: bytes, salt: bytes) -> bytes:
+    # module-level so that it can be sent to a process pool
+    return bcrypt.hashpw(password, salt)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded worker pool instead of the event loop.
+
+    At most ``workers + max_queue`` hashes are accepted at once; requests above
+    that are rejected right away with 503 instead of piling up latency.
+    """
+
+    _instance: typing.Optional["PasswordHasher"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config()
+        self.salt: bytes = config.bcrypt_salt
+        self.workers: int = config.hashing.workers
+        self.max_queue: int = config.hashing.max_queue
+        self.executor_type: str = config.hashing.executor
+        self._executor: typing.Optional[concurrent.futures.Executor] = None
+        self._in_flight = 0
+        self.initialized = True
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers
+                )
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def hash_password(self, password: str) -> str:
+        """
+        Hash a password with the configured salt
+
+        :param password: plain password
+        :return: bcrypt hash, same as Config.bcrypt_password
+        :raise: ErrorModel(code=status.HTTP_503_SERVICE_UNAVAILABLE) if the queue is full
+        """
+        if self._in_flight >= self.workers + self.max_queue:
+            raise ErrorModel(
+                code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+                message="Server is busy, try again later",
+            ).as_http_exception()
+
+        hashed = await self._submit(_hashpw, password.encode("utf-8"), self.salt)
+        return hashed.decode("utf-8")
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        # a cancelled request doesn't stop bcrypt, the hash stays counted
+        # until the pool is done with it
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(fn, *args)
+        self._in_flight += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return asyncio.wrap_future(future)
+
+    def _release(self):
+        self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def hash_password(password: str) -> str:
+    return await PasswordHasher().hash_password(password)
@@ -0,0 +1,16 @@
+from .logs import (
+    JsonFormatter,
+    SamplingFilter,
+    apply_levels,
+    setup_json_logging,
+    stop_logging,
+)
+
+
+__all__ = [
+    "JsonFormatter",
+    "SamplingFilter",
+    "apply_levels",
+    "setup_json_logging",
+    "stop_logging",
+]
@@ -0,0 +1,158 @@
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import typing
+
+from ..config.config import LoggingConfig
+
+# attributes every LogRecord has, everything else was passed via extra=
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__.keys()
+) | {"message", "asctime", "taskName"}
+
+_listener: typing.Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including the fields passed
+    via ``extra=``
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking or raising when the
+    writer thread can't keep up.
+
+    Records are queued unformatted, JsonFormatter runs in the listener thread
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the stdlib version formats the record here, on the caller's thread,
+        # and folds the traceback into msg. Only the args are merged, they may
+        # be mutated by the caller after the call returns
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a share of records below WARNING for the configured loggers.
+    The most specific configured logger name wins, warnings and errors are
+    never dropped
+    """
+
+    def __init__(self, rates: typing.Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: typing.Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def apply_levels(config: LoggingConfig):
+    """
+    Set the configured level of every listed logger
+
+    :param config: logging config
+    :return: None
+    """
+    for name, level in config.levels.items():
+        logging.getLogger(name or None).setLevel(level)
+
+
+def setup_json_logging(config: LoggingConfig):
+    """
+    Production logging: records are put on a queue by the caller and
+    formatted as JSON and written by a background thread, so the event loop
+    never blocks on stdout
+
+    :param config: logging config
+    :return: None
+    """
+    global _listener
+
+    log_queue: queue.Queue = queue.Queue(config.queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(config.sampling))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+
+    parent_logger = logging.getLogger("cc")
+    parent_logger.propagate = True
+    for handler in list(parent_logger.handlers):
+        parent_logger.removeHandler(handler)
+
+    apply_levels(config)
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the background thread
+
+    :return: None
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,3 +1,22 @@
-from .mail import send_custom_email, send_signup_email, send_password_reset_email
+from .mail import (
+    MailClient,
+    send_custom_email,
+    send_signup_email,
+    send_password_reset_email,
+    queue_custom_email,
+    queue_signup_email,
+    queue_password_reset_email,
+)
+from .outbox_dispatcher import CircuitBreaker, OutboxDispatcher
 
-__all__ = ["send_custom_email", "send_signup_email", "send_password_reset_email"]
+__all__ = [
+    "MailClient",
+    "send_custom_email",
+    "send_signup_email",
+    "send_password_reset_email",
+    "queue_custom_email",
+    "queue_signup_email",
+    "queue_password_reset_email",
+    "CircuitBreaker",
+    "OutboxDispatcher",
+]
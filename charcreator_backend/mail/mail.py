@@ -1,56 +1,169 @@
+import time
+import typing
+
+from .. import metrics
 from ..config import Config
+from ..database import TransactionManager
 import aiohttp
 
 config = Config()
 
 
+class MailClient:
+    """
+    Long-lived HTTP client for the mail API.
+
+    Keeps one ClientSession with a pooled keep-alive connector, so emails
+    don't pay DNS, TCP and TLS setup each time. Started on app startup and
+    closed on shutdown; created on first use if it wasn't started.
+    """
+
+    _instance: typing.Optional["MailClient"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        self._session: typing.Optional[aiohttp.ClientSession] = None
+        self.initialized = True
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=config.mail_client.limit,
+                    limit_per_host=config.mail_client.limit_per_host,
+                    keepalive_timeout=config.mail_client.keepalive_timeout,
+                    ttl_dns_cache=config.mail_client.dns_cache_ttl,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=config.mail_client.total_timeout,
+                    connect=config.mail_client.connect_timeout,
+                ),
+                headers={"X-Auth-Token": config.mail_send_token},
+                raise_for_status=True,
+            )
+        return self._session
+
+    async def start(self):
+        _ = self.session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def post(self, path: str, payload: dict):
+        """
+        Send a request to the mail API
+
+        :param path: API method, relative to mail_send_api
+        :param payload: JSON body
+        :return: None
+        :raise: aiohttp.ClientError if the request failed
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self.session.post(
+                f"{config.mail_send_api}/{path}", json=payload
+            ) as resp:
+                await resp.read()
+            outcome = "ok"
+        finally:
+            metrics.MAIL_SEND_DURATION.labels(path, outcome).observe(
+                time.perf_counter() - started
+            )
+
+
+def _custom_email(
+    recipient: str,
+    subject: str,
+    plain_body: str,
+    html_body: str = None,
+) -> typing.Tuple[str, dict]:
+    return "send_email", {
+        "subject": subject,
+        "plain_body": plain_body,
+        "to": recipient,
+        "html_body": html_body,
+    }
+
+
+def _signup_email(email: str, url: str) -> typing.Tuple[str, dict]:
+    return "send_signup_email", {"email": email, "url": url}
+
+
+def _password_reset_email(email: str, url: str) -> typing.Tuple[str, dict]:
+    return "send_reset_password_email", {"email": email, "url": url}
+
+
 async def send_custom_email(
     recipient: str,
     subject: str,
     plain_body: str,
     html_body: str = None,
 ):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f"{config.mail_send_api}/send_email",
-            json={
-                "subject": subject,
-                "plain_body": plain_body,
-                "to": recipient,
-                "html_body": html_body,
-            },
-            headers={"X-Auth-Token": config.mail_send_token},
-        ) as resp:
-            resp.raise_for_status()
+    await MailClient().post(*_custom_email(recipient, subject, plain_body, html_body))
 
 
 async def send_signup_email(
     email: str,
     url: str,
 ):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f"{config.mail_send_api}/send_signup_email",
-            json={
-                "email": email,
-                "url": url,
-            },
-            headers={"X-Auth-Token": config.mail_send_token},
-        ) as resp:
-            resp.raise_for_status()
+    await MailClient().post(*_signup_email(email, url))
 
 
 async def send_password_reset_email(
     email: str,
     url: str,
 ):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f"{config.mail_send_api}/send_reset_password_email",
-            json={
-                "email": email,
-                "url": url,
-            },
-            headers={"X-Auth-Token": config.mail_send_token},
-        ) as resp:
-            resp.raise_for_status()
+    await MailClient().post(*_password_reset_email(email, url))
+
+
+async def queue_custom_email(
+    transaction_manager: TransactionManager,
+    recipient: str,
+    subject: str,
+    plain_body: str,
+    html_body: str = None,
+):
+    """
+    Like send_custom_email, but the email is written to the outbox in the
+    caller's transaction and sent in the background after it commits
+    """
+    await transaction_manager.functions.outbox.enqueue(
+        *_custom_email(recipient, subject, plain_body, html_body)
+    )
+
+
+async def queue_signup_email(
+    transaction_manager: TransactionManager,
+    email: str,
+    url: str,
+):
+    """
+    Like send_signup_email, but the email is sent in the background after
+    the caller's transaction commits
+    """
+    await transaction_manager.functions.outbox.enqueue(*_signup_email(email, url))
+
+
+async def queue_password_reset_email(
+    transaction_manager: TransactionManager,
+    email: str,
+    url: str,
+):
+    """
+    Like send_password_reset_email, but the email is sent in the background
+    after the caller's transaction commits
+    """
+    await transaction_manager.functions.outbox.enqueue(
+        *_password_reset_email(email, url)
+    )
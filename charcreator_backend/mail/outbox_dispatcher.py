@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import random
+import time
+import typing
+
+import aiohttp
+
+from ..config import Config
+from ..database import TransactionManager
+from ..database.functions.outbox import OutboxMessage
+from .mail import MailClient
+
+logger = logging.getLogger("cc.mail.outbox")
+
+# client errors that may go away on retry, the rest of 4xx never will
+RETRYABLE_STATUSES = (408, 425, 429)
+
+
+class DeliveryFailure(typing.NamedTuple):
+    error: str
+    # the mail API rejected the message itself, retrying won't help
+    permanent: bool = False
+
+
+class CircuitBreaker:
+    """
+    Stops calling the mail API after ``threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial call is let through: success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: typing.Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def retry_in(self) -> float:
+        """
+        Seconds until a trial call will be allowed, 0 if calls are allowed now
+        """
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._trial_running or self.retry_in > 0:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning("Mail API circuit breaker opened")
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+
+class OutboxDispatcher:
+    """
+    Background worker that delivers outbox messages to the mail API.
+
+    Messages are claimed in batches with ``FOR UPDATE SKIP LOCKED``, so several
+    app processes can run dispatchers side by side, and sent with bounded
+    concurrency over the shared MailClient. Failed messages are retried with
+    exponential backoff until ``max_attempts`` is reached, messages rejected
+    by the mail API with a 4xx are not retried.
+    """
+
+    _instance: typing.Optional["OutboxDispatcher"] = None
+    initialized = False
+
+    CLEANUP_INTERVAL = 60 * 60
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        self.config = Config().outbox
+        self.breaker = CircuitBreaker(
+            self.config.breaker_threshold, self.config.breaker_reset_timeout
+        )
+        self._semaphore = asyncio.Semaphore(self.config.concurrency)
+        self._task: typing.Optional[asyncio.Task] = None
+        self._next_cleanup = 0.0
+        self.initialized = True
+
+    async def start(self):
+        if self._task is not None:
+            return
+        async with TransactionManager(readonly=True) as transaction_manager:
+            exists = await transaction_manager.functions.outbox.table_exists()
+        if not exists:
+            logger.error(
+                "The outbox table doesn't exist, queued emails are not sent. "
+                "Run python -m charcreator_backend.database"
+            )
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.dispatch_batch()
+                if time.monotonic() >= self._next_cleanup:
+                    await self._cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Outbox dispatch failed")
+                logger.exception(e)
+                sent = 0
+
+            if sent < self.config.batch_size:
+                await asyncio.sleep(max(self.config.poll_interval, self.breaker.retry_in))
+
+    async def dispatch_batch(self) -> int:
+        """
+        Claim and deliver one batch of due messages
+
+        :return: number of claimed messages
+        """
+        if self.breaker.retry_in > 0:
+            return 0
+
+        async with TransactionManager() as transaction_manager:
+            messages = await transaction_manager.functions.outbox.claim(
+                self.config.batch_size, self.config.max_attempts, self.config.lease
+            )
+        if not messages:
+            return 0
+
+        results = await asyncio.gather(
+            *(self._deliver(message) for message in messages)
+        )
+
+        sent = [message.id for message, error in zip(messages, results) if error is None]
+        skipped = [message.id for message, error in zip(messages, results) if error is False]
+        async with TransactionManager() as transaction_manager:
+            if sent:
+                await transaction_manager.functions.outbox.mark_sent(sent)
+            if skipped:
+                await transaction_manager.functions.outbox.release(
+                    skipped, self.breaker.retry_in
+                )
+            for message, failure in zip(messages, results):
+                if not isinstance(failure, DeliveryFailure):
+                    continue
+                attempts = message.attempts + 1
+                if failure.permanent or attempts >= self.config.max_attempts:
+                    logger.error(
+                        "Outbox message %d to %s failed permanently after %d attempts: %s",
+                        message.id,
+                        message.path,
+                        attempts,
+                        failure.error,
+                    )
+                if failure.permanent:
+                    await transaction_manager.functions.outbox.mark_rejected(
+                        message.id, failure.error, self.config.max_attempts
+                    )
+                else:
+                    await transaction_manager.functions.outbox.mark_failed(
+                        message.id, failure.error, self._backoff(message.attempts)
+                    )
+        return len(messages)
+
+    async def _deliver(
+            self, message: OutboxMessage
+    ) -> typing.Union[None, DeliveryFailure, bool]:
+        """
+        :return: None if sent, DeliveryFailure if failed,
+            False if not attempted because the breaker is open
+        """
+        async with self._semaphore:
+            if not self.breaker.allow():
+                return False
+            try:
+                await MailClient().post(message.path, message.payload)
+            except aiohttp.ClientResponseError as e:
+                error = f"{e.status}: {e.message}"
+                if e.status >= 500 or e.status == 429:
+                    self.breaker.record_failure()
+                    return DeliveryFailure(error)
+                # the API is up, the message itself is rejected
+                self.breaker.record_success()
+                return DeliveryFailure(error, permanent=e.status not in RETRYABLE_STATUSES)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                return DeliveryFailure(f"{type(e).__name__}: {e}")
+            self.breaker.record_success()
+            return None
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.config.backoff_max, self.config.backoff_base * 2**attempts)
+        return delay * random.uniform(0.5, 1)
+
+    async def _cleanup(self):
+        async with TransactionManager() as transaction_manager:
+            await transaction_manager.functions.outbox.delete_sent_before(
+                self.config.keep_sent_for
+            )
+        self._next_cleanup = time.monotonic() + self.CLEANUP_INTERVAL
@@ -0,0 +1,32 @@
+from .metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    REGISTRY,
+    HTTP_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    DB_POOL_SIZE,
+    DB_POOL_IDLE,
+    DB_POOL_ACQUIRE_DURATION,
+    DB_TRANSACTIONS,
+    MAIL_SEND_DURATION,
+)
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "HTTP_REQUESTS",
+    "HTTP_REQUEST_DURATION",
+    "HTTP_REQUESTS_IN_FLIGHT",
+    "DB_POOL_SIZE",
+    "DB_POOL_IDLE",
+    "DB_POOL_ACQUIRE_DURATION",
+    "DB_TRANSACTIONS",
+    "MAIL_SEND_DURATION",
+]
@@ -0,0 +1,250 @@
+import bisect
+import math
+import typing
+
+# Metrics are updated from the event loop thread only, so plain attribute
+# updates are enough and no locks are taken on the hot path. Every process
+# (uvicorn worker) exposes its own values.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: typing.Sequence[str], values: typing.Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: typing.Dict[typing.Tuple[str, ...], typing.Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self) -> typing.List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> typing.List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+        ]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._children[()].inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "function")
+
+    def __init__(self):
+        self._value = 0.0
+        self.function: typing.Optional[typing.Callable[[], float]] = None
+
+    @property
+    def value(self) -> float:
+        if self.function is not None:
+            return self.function()
+        return self._value
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def dec(self, amount: float = 1):
+        self._value -= amount
+
+    def set_function(self, function: typing.Callable[[], float]):
+        """
+        Compute the value when the metrics are collected instead of storing it
+        """
+        self.function = function
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._children[()].dec(amount)
+
+    def set_function(self, function: typing.Callable[[], float]):
+        self._children[()].set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: typing.Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # one slot per bucket plus +Inf, allocated once
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _render_child(self, values, child: _HistogramChild) -> typing.List[str]:
+        lines = []
+        cumulative = 0
+        for upper_bound, count in zip(self.upper_bounds + (math.inf,), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(upper_bound)}"'
+            lines.append(
+                f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            )
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: typing.Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+
+        :return: exposition text
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "cc_http_requests_total",
+        "HTTP requests by route template, method and status",
+        ("route", "method", "status"),
+    )
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "cc_http_request_duration_seconds",
+        "HTTP request latency by route template and method",
+        ("route", "method"),
+    )
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("cc_http_requests_in_flight", "HTTP requests being processed")
+)
+DB_POOL_SIZE = REGISTRY.register(
+    Gauge("cc_db_pool_size", "Open connections in the database pool")
+)
+DB_POOL_IDLE = REGISTRY.register(
+    Gauge("cc_db_pool_idle", "Idle connections in the database pool")
+)
+DB_POOL_ACQUIRE_DURATION = REGISTRY.register(
+    Histogram(
+        "cc_db_pool_acquire_duration_seconds",
+        "Time spent waiting for a connection from the database pool",
+    )
+)
+DB_TRANSACTIONS = REGISTRY.register(
+    Counter(
+        "cc_db_transactions_total",
+        "Finished TransactionManager transactions by outcome",
+        ("outcome",),
+    )
+)
+MAIL_SEND_DURATION = REGISTRY.register(
+    Histogram(
+        "cc_mail_send_duration_seconds",
+        "Mail API request latency by method and outcome",
+        ("path", "outcome"),
+    )
+)
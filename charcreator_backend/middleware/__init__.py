@@ -0,0 +1,14 @@
+from .middleware import (
+    check_auth,
+    DocsAuthMiddleware,
+    ErrorTranslationMiddleware,
+    MetricsMiddleware,
+)
+
+
+__all__ = [
+    "check_auth",
+    "DocsAuthMiddleware",
+    "ErrorTranslationMiddleware",
+    "MetricsMiddleware",
+]
@@ -0,0 +1,206 @@
+import base64
+import logging
+import secrets
+import time
+import typing
+
+import fastapi
+import fastapi.responses
+from fastapi import status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import metrics
+from ..responses import DOCS_UNAUTHORIZED, JsonResponse
+from ..shared_models import ErrorModel, ExceptionModel
+
+logger = logging.getLogger("cc.middleware")
+
+DOCS_PATHS = frozenset(["/docs", "/openapi.json", "/redoc"])
+LOCAL_HOSTS = frozenset(["127.0.0.1", "localhost"])
+
+
+def check_auth(auth_header: str) -> typing.Optional[fastapi.Response]:
+    """
+    Check docs credentials from the Authorization header
+
+    :param auth_header: value of the Authorization header
+    :return: None if the credentials are correct, 401 response otherwise
+    """
+    prefix = "Basic "
+    if not auth_header.startswith(prefix):
+        return DOCS_UNAUTHORIZED
+
+    auth_decoded = base64.b64decode(auth_header[len(prefix) :]).decode("utf-8")
+    username, _, password = auth_decoded.partition(":")
+
+    # этот пароль не особо важен, так что просто хранится в коде
+    correct_username = secrets.compare_digest(username, "docs_read")
+    correct_password = secrets.compare_digest(
+        password, "H6AmdL296HeMX094J7AqRQN2OC8TBvtP"
+    )
+
+    if not (correct_username and correct_password):
+        return DOCS_UNAUTHORIZED
+    return None
+
+
+class DocsAuthMiddleware:
+    """
+    Protects the API docs with basic auth for non-local clients.
+    Requests to other paths are passed through without looking at headers
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in DOCS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        client_host = headers.get("X-Real-IP") or (scope.get("client") or ("",))[0]
+        if client_host not in LOCAL_HOSTS:
+            auth = headers.get("Authorization")
+            try:
+                rejection = check_auth(auth) if auth else DOCS_UNAUTHORIZED
+            except Exception:
+                rejection = DOCS_UNAUTHORIZED
+            if rejection is not None:
+                await rejection(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+class ErrorTranslationMiddleware:
+    """
+    Turns exceptions escaping the app into ErrorModel / ExceptionModel responses
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                raise
+            response = self.translate(scope, e)
+            if response is None:
+                raise
+            await response(scope, receive, send)
+
+    @staticmethod
+    def translate(scope: Scope, e: Exception) -> typing.Optional[fastapi.Response]:
+        """
+        Build the response for an exception
+
+        :param scope: ASGI scope of the request
+        :param e: exception raised by the app
+        :return: response or None if the exception should be propagated
+        """
+        path = scope["path"]
+        method = scope["method"]
+        if isinstance(e, fastapi.HTTPException):
+            logger.info(
+                "An error was returned in %s",
+                path,
+                extra={
+                    "path": path,
+                    "method": method,
+                    "status_code": e.status_code,
+                    "exception": str(e),
+                },
+            )
+            if hasattr(e, "custom_data"):
+                custom_data: ErrorModel = getattr(e, "custom_data")
+                resp = JsonResponse(
+                    content=custom_data.model_dump(), status_code=custom_data.code
+                )
+                cookies_to_remove = getattr(e, "remove_cookies", None)
+                if cookies_to_remove:
+                    for cookie in cookies_to_remove:
+                        resp.delete_cookie(cookie)
+                return resp
+            elif e.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY:
+                return JsonResponse(
+                    content=ErrorModel(
+                        code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        message="Некорректные данные в запросе",
+                        fields=e.detail,
+                    ).model_dump(),
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            else:
+                return None
+
+        logger.error("An internal error occurred in %s", path)
+        logger.exception(e)
+        custom_error = ExceptionModel(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message="An internal error occurred",
+            fields={
+                "path": path,
+                "method": method,
+            },
+            exception={
+                "type": type(e).__name__,
+                "message": str(e),
+            },
+        )
+        return JsonResponse(
+            content=custom_error.model_dump(),
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and in-flight count of HTTP requests. Requests are
+    labeled with the route template, not the raw path, to keep the number of
+    series bounded
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            metrics.HTTP_REQUEST_DURATION.labels(route_path, method).observe(elapsed)
+            metrics.HTTP_REQUESTS.labels(route_path, method, str(status_code)).inc()
@@ -0,0 +1,5 @@
+from .rendering import URL_PREFIX, FORMATS, Renderer, RenderLayer, render_key
+from .render_cache import RenderCache
+
+
+__all__ = ["URL_PREFIX", "FORMATS", "Renderer", "RenderLayer", "RenderCache", "render_key"]
@@ -0,0 +1,76 @@
+import io
+import typing
+
+from PIL import Image, ImageColor
+
+# (file path, properties) from the bottom layer to the top one
+Layers = typing.List[typing.Tuple[str, dict]]
+
+
+def _tint(layer: Image.Image, color: str) -> Image.Image:
+    # colorable artwork is drawn in grayscale, the color multiplies it
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    gray = layer.convert("L")
+    tinted = Image.merge(
+        "RGB",
+        [gray.point(lambda value, c=c: value * c // 255) for c in (red, green, blue)],
+    )
+    tinted.putalpha(layer.getchannel("A"))
+    return tinted
+
+
+def _fade(layer: Image.Image, opacity: float) -> Image.Image:
+    opacity = min(max(opacity, 0.0), 1.0)
+    layer.putalpha(layer.getchannel("A").point(lambda value: round(value * opacity)))
+    return layer
+
+
+def _paste(canvas: Image.Image, layer: Image.Image, x: int, y: int):
+    # alpha_composite doesn't accept negative offsets, crop the layer instead
+    left, top = max(0, -x), max(0, -y)
+    if left >= layer.width or top >= layer.height or x >= canvas.width or y >= canvas.height:
+        # entirely outside of the canvas
+        return
+    canvas.alpha_composite(layer, dest=(max(0, x), max(0, y)), source=(left, top))
+
+
+def composite(layers: Layers, size: int, fmt: str) -> bytes:
+    """
+    Draw the layers on top of each other and make a square thumbnail.
+
+    Module-level so that it can be sent to a process pool. The canvas has the
+    size of the bottom layer.
+
+    :param layers: image paths with their properties: color (only passed for
+        colorable assets), opacity from 0 to 1, offset_x and offset_y in pixels
+    :param size: width and height of the thumbnail
+    :param fmt: "png" or "webp"
+    :return: encoded image
+    """
+    canvas: typing.Optional[Image.Image] = None
+    for path, properties in layers:
+        with Image.open(path) as image:
+            layer = image.convert("RGBA")
+        if properties.get("color"):
+            layer = _tint(layer, properties["color"])
+        if properties.get("opacity") is not None:
+            layer = _fade(layer, float(properties["opacity"]))
+        if canvas is None:
+            canvas = Image.new("RGBA", layer.size, (0, 0, 0, 0))
+        _paste(
+            canvas,
+            layer,
+            int(properties.get("offset_x", 0)),
+            int(properties.get("offset_y", 0)),
+        )
+
+    canvas.thumbnail((size, size), Image.LANCZOS)
+    thumbnail = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    thumbnail.paste(canvas, ((size - canvas.width) // 2, (size - canvas.height) // 2))
+
+    output = io.BytesIO()
+    if fmt == "webp":
+        thumbnail.save(output, "WEBP", quality=90)
+    else:
+        thumbnail.save(output, "PNG", optimize=True)
+    return output.getvalue()
@@ -0,0 +1,122 @@
+import asyncio
+import collections
+import logging
+import os
+import tempfile
+import typing
+
+logger = logging.getLogger("cc.rendering.cache")
+
+
+class RenderCache:
+    """
+    Rendered images on disk with LRU eviction by total size.
+
+    File names are content keys, so a file never changes once written. The
+    access order lives in memory and is rebuilt from file mtimes on startup,
+    a hit touches the file to keep that order across restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = os.path.realpath(directory)
+        self.max_bytes = max_bytes
+        # file name -> size, least recently used first
+        self._entries: typing.OrderedDict[str, int] = collections.OrderedDict()
+        self.total_bytes = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    async def load(self):
+        """
+        Index the files left from the previous run
+
+        :return: None
+        """
+        entries = await asyncio.to_thread(self._scan)
+        self._entries = collections.OrderedDict(entries)
+        self.total_bytes = sum(self._entries.values())
+        logger.info(
+            "Render cache loaded, %d files, %d bytes",
+            len(self._entries),
+            self.total_bytes,
+        )
+        await self._evict()
+
+    def _scan(self) -> typing.List[typing.Tuple[str, int]]:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        files.sort()
+        return [(name, size) for _, name, size in files]
+
+    def get(self, name: str) -> typing.Optional[str]:
+        """
+        :param name: file name
+        :return: path of the cached file or None
+        """
+        if name not in self._entries:
+            return None
+        self._entries.move_to_end(name)
+        path = self.path(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # removed behind our back
+            self.total_bytes -= self._entries.pop(name)
+            return None
+        return path
+
+    async def put(self, name: str, data: bytes) -> str:
+        """
+        Write a file and evict the least recently used ones over the limit
+
+        :param name: file name
+        :param data: file content
+        :return: path of the file
+        """
+        path = await asyncio.to_thread(self._write, name, data)
+        previous = self._entries.pop(name, 0)
+        self._entries[name] = len(data)
+        self.total_bytes += len(data) - previous
+        if self.total_bytes > self.max_bytes:
+            await self._evict()
+        return path
+
+    def _write(self, name: str, data: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        # readers never see a partially written file
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            path = self.path(name)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return path
+
+    async def _evict(self):
+        # the index is only touched on the event loop, the files in a thread
+        evicted = []
+        # the newest file always stays, even if it alone is over the limit
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            evicted.append(name)
+        if evicted:
+            await asyncio.to_thread(self._remove, evicted)
+            logger.debug("Evicted %d files from the render cache", len(evicted))
+
+    def _remove(self, names: typing.List[str]):
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
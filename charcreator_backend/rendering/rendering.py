@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import typing
+
+import fastapi
+
+from ..config import Config
+from ..shared_models import ErrorModel
+from .compositing import Layers, composite
+from .render_cache import RenderCache
+
+logger = logging.getLogger("cc.rendering")
+
+URL_PREFIX = "/render"
+FORMATS = ("png", "webp")
+
+
+class RenderLayer(typing.NamedTuple):
+    asset_id: int
+    path: str
+    # content hash of the file, a replaced image makes a new key
+    digest: str
+    properties: dict
+
+
+def render_key(layers: typing.Sequence[RenderLayer], size: int, fmt: str) -> str:
+    """
+    Content key of a render, same layers and settings give the same key
+
+    :return: hex digest
+    """
+    description = json.dumps(
+        {
+            "layers": [[layer.asset_id, layer.digest, layer.properties] for layer in layers],
+            "size": size,
+            "format": fmt,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(description.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Renderer:
+    """
+    Composites characters on a process pool and keeps the results in a
+    content-addressed disk cache.
+
+    Like PasswordHasher, at most ``workers + max_queue`` renders are accepted
+    at once and requests above that get 503. Concurrent requests for the same
+    key wait for a single render.
+    """
+
+    _instance: typing.Optional["Renderer"] = None
+    initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        config = Config().render
+        self.workers: int = config.workers
+        self.max_queue: int = config.max_queue
+        self.sizes: typing.List[int] = config.sizes
+        self.cache = RenderCache(config.cache_directory, config.cache_max_bytes)
+        self._executor: typing.Optional[concurrent.futures.Executor] = None
+        self._pending: typing.Dict[str, asyncio.Future] = {}
+        self._in_flight = 0
+        self.initialized = True
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers
+            )
+        return self._executor
+
+    async def start(self):
+        await self.cache.load()
+
+    async def render(
+            self, layers: typing.Sequence[RenderLayer], size: int, fmt: str
+    ) -> str:
+        """
+        Render a character or find it in the cache
+
+        :param layers: layers from the bottom to the top
+        :param size: one of Config.render.sizes
+        :param fmt: one of FORMATS
+        :return: file name in the cache
+        :raise: ErrorModel(code=status.HTTP_503_SERVICE_UNAVAILABLE) if the queue is full
+        """
+        name = f"{render_key(layers, size, fmt)}.{fmt}"
+        if self.cache.get(name) is not None:
+            return name
+
+        pending = self._pending.get(name)
+        if pending is not None:
+            await asyncio.shield(pending)
+            if self.cache.get(name) is not None:
+                return name
+            raise ErrorModel(
+                code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+                message="Render failed, try again later",
+            ).as_http_exception()
+
+        if self._in_flight >= self.workers + self.max_queue:
+            raise ErrorModel(
+                code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+                message="Server is busy, try again later",
+            ).as_http_exception()
+
+        loop = asyncio.get_running_loop()
+        done = self._pending[name] = loop.create_future()
+        try:
+            stack: Layers = [(layer.path, layer.properties) for layer in layers]
+            data = await self._submit(composite, stack, size, fmt)
+            await self.cache.put(name, data)
+            logger.debug("Rendered %s, %d bytes", name, len(data))
+        finally:
+            del self._pending[name]
+            # waiters check the cache, a failed render is not cached
+            done.set_result(None)
+        return name
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        """
+        Run a function on the worker pool. It counts towards the queue limit
+        until a worker is done with it, even if the request awaiting it is
+        cancelled, since the worker keeps running
+        """
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(fn, *args)
+        self._in_flight += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return asyncio.wrap_future(future)
+
+    def _release(self):
+        self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,34 @@
+from .responses import (
+    dumps,
+    JsonResponse,
+    dump_trusted,
+    validate_trusted,
+    trusted_response,
+    PrecomputedResponse,
+    PrecomputedError,
+    register_error,
+    registered_errors,
+    http_exception_handler,
+    DOCS_UNAUTHORIZED,
+    NOT_LOGGED_IN,
+    NOT_LOCAL,
+    NOT_ADMIN,
+)
+
+
+__all__ = [
+    "dumps",
+    "JsonResponse",
+    "dump_trusted",
+    "validate_trusted",
+    "trusted_response",
+    "PrecomputedResponse",
+    "PrecomputedError",
+    "register_error",
+    "registered_errors",
+    "http_exception_handler",
+    "DOCS_UNAUTHORIZED",
+    "NOT_LOGGED_IN",
+    "NOT_LOCAL",
+    "NOT_ADMIN",
+]
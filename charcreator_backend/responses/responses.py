@@ -0,0 +1,216 @@
+import decimal
+import typing
+
+import fastapi
+import fastapi.responses
+import orjson
+import pydantic
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.types import Receive, Scope, Send
+
+from ..shared_models import ErrorModel
+
+
+def _default(obj: typing.Any) -> typing.Any:
+    # datetime, date, UUID, enums and dataclasses are handled by orjson itself
+    if isinstance(obj, pydantic.BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: typing.Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON, same bytes as starlette's JSONResponse
+    produces for plain data
+
+    :param content: data to serialize
+    :return: JSON body
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class JsonResponse(fastapi.responses.JSONResponse):
+    """
+    Default response class of the app, serializes with orjson
+    """
+
+    def render(self, content: typing.Any) -> bytes:
+        return dumps(content)
+
+
+_adapters: typing.Dict[typing.Any, pydantic.TypeAdapter] = {}
+
+
+def _adapter(annotation: typing.Any) -> pydantic.TypeAdapter:
+    adapter = _adapters.get(annotation)
+    if adapter is None:
+        adapter = _adapters[annotation] = pydantic.TypeAdapter(annotation)
+    return adapter
+
+
+def validate_trusted(data: typing.Any, annotation: typing.Any) -> typing.Any:
+    """
+    Build models in bulk, e.g. from ``model_data()`` of the database
+    dataclasses. One call of the compiled validator for the whole list is
+    faster than ``model_construct`` per row
+
+    :param data: dict or list of dicts
+    :param annotation: type to build, e.g. typing.List[AssetModel]
+    :return: models
+    """
+    return _adapter(annotation).validate_python(data)
+
+
+def dump_trusted(content: typing.Any, annotation: typing.Any = None) -> bytes:
+    """
+    Serialize models built from trusted data, e.g. with ``validate_trusted``,
+    without validating them again
+
+    :param content: model or list of models
+    :param annotation: type of the content, e.g. typing.List[UserModel],
+        defaults to the type of the content
+    :return: JSON body
+    """
+    if annotation is None:
+        annotation = type(content)
+    return _adapter(annotation).dump_json(content)
+
+
+def trusted_response(
+        content: typing.Any,
+        annotation: typing.Any = None,
+        status_code: int = fastapi.status.HTTP_200_OK,
+) -> fastapi.Response:
+    """
+    Response with trusted models serialized by ``dump_trusted``.
+
+    Returning a Response skips FastAPI's response_model validation, keep
+    response_model on the route for the docs.
+
+    :param content: model or list of models
+    :param annotation: type of the content, defaults to the type of the content
+    :param status_code: status code of the response
+    :return: JSON response
+    """
+    return fastapi.Response(
+        content=dump_trusted(content, annotation),
+        status_code=status_code,
+        media_type=JsonResponse.media_type,
+    )
+
+
+class PrecomputedResponse(fastapi.Response):
+    """
+    Response with a body and headers built once, can be sent any number of
+    times without serializing anything
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        status_code: int,
+        headers: typing.Optional[typing.Mapping[str, str]] = None,
+        media_type: typing.Optional[str] = None,
+    ):
+        super().__init__(
+            content=body, status_code=status_code, headers=headers, media_type=media_type
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                # middleware like CORS appends to the list it gets
+                "headers": list(self.raw_headers),
+            }
+        )
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class PrecomputedError:
+    """
+    Constant ErrorModel error with its response body serialized in advance
+    """
+
+    def __init__(self, name: str, code: int, message: str):
+        self.name = name
+        self.model = ErrorModel(code=code, message=message)
+        # same detail as ErrorModel.as_http_exception builds
+        self.detail = {"message": message, "fields": {}}
+        self.response = PrecomputedResponse(
+            dumps({"detail": self.detail}),
+            status_code=code,
+            media_type=JsonResponse.media_type,
+        )
+
+    def as_http_exception(self) -> fastapi.HTTPException:
+        exception = fastapi.HTTPException(status_code=self.model.code, detail=self.detail)
+        exception.custom_data = self.model
+        exception.remove_cookies = None
+        exception.precomputed = self
+        return exception
+
+
+_errors: typing.Dict[str, PrecomputedError] = {}
+
+
+def register_error(name: str, code: int, message: str) -> PrecomputedError:
+    """
+    Add a constant error to the registry
+
+    :param name: unique name
+    :param code: HTTP status code
+    :param message: error message
+    :return: the registered error
+    """
+    if name in _errors:
+        raise ValueError(f"Error {name} is already registered")
+    error = PrecomputedError(name, code, message)
+    _errors[name] = error
+    return error
+
+
+def registered_errors() -> typing.List[PrecomputedError]:
+    return list(_errors.values())
+
+
+DOCS_UNAUTHORIZED = PrecomputedResponse(
+    b"Unauthorized",
+    status_code=fastapi.status.HTTP_401_UNAUTHORIZED,
+    headers={"WWW-Authenticate": "Basic"},
+)
+NOT_LOGGED_IN = register_error(
+    "not_logged_in", fastapi.status.HTTP_401_UNAUTHORIZED, "You must be logged in"
+)
+NOT_LOCAL = register_error(
+    "not_local",
+    fastapi.status.HTTP_403_FORBIDDEN,
+    "You are not allowed to perform this action",
+)
+NOT_ADMIN = register_error(
+    "not_admin", fastapi.status.HTTP_403_FORBIDDEN, "You must be an administrator"
+)
+
+
+async def http_exception_handler(
+        request: fastapi.Request, exc: fastapi.HTTPException
+) -> fastapi.Response:
+    """
+    Replacement of FastAPI's handler with the same output, registered errors
+    are answered with their precomputed response
+    """
+    precomputed: typing.Optional[PrecomputedError] = getattr(exc, "precomputed", None)
+    if precomputed is not None and not getattr(exc, "remove_cookies", None):
+        return precomputed.response
+
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return fastapi.Response(status_code=exc.status_code, headers=headers)
+    return JsonResponse(
+        {"detail": exc.detail}, status_code=exc.status_code, headers=headers
+    )
@@ -1,4 +1,18 @@
-from .shared_models import ErrorModel, UserModel, ExceptionModel
+from .shared_models import (
+    ErrorModel,
+    UserModel,
+    SessionModel,
+    CodeModel,
+    AssetModel,
+    ExceptionModel,
+)
 
 
-__all__ = ["ErrorModel", "UserModel", "ExceptionModel"]
+__all__ = [
+    "ErrorModel",
+    "UserModel",
+    "SessionModel",
+    "CodeModel",
+    "AssetModel",
+    "ExceptionModel",
+]
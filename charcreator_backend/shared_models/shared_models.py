@@ -1,3 +1,5 @@
+import datetime
+
 import pydantic
 import typing
 import fastapi
@@ -57,6 +59,68 @@ class UserModel(pydantic.BaseModel):
     )
 
 
+class SessionModel(pydantic.BaseModel):
+    """
+    Модель сессии
+    """
+
+    id: int = pydantic.Field(..., description="Идентификатор сессии", title="ID")
+    created_at: datetime.datetime = pydantic.Field(
+        ..., description="Время входа", title="Время входа"
+    )
+    last_used: datetime.datetime = pydantic.Field(
+        ..., description="Время последнего использования", title="Последнее использование"
+    )
+    expires_at: datetime.datetime = pydantic.Field(
+        ..., description="Время окончания сессии", title="Время окончания"
+    )
+
+
+class CodeModel(pydantic.BaseModel):
+    """
+    Модель кода подтверждения, без самого кода
+    """
+
+    id: int = pydantic.Field(..., description="Идентификатор кода", title="ID")
+    purpose: str = pydantic.Field(..., description="Назначение кода", title="Назначение")
+    created_at: datetime.datetime = pydantic.Field(
+        ..., description="Время создания", title="Время создания"
+    )
+    used_at: typing.Optional[datetime.datetime] = pydantic.Field(
+        None, description="Время использования", title="Время использования"
+    )
+    expires_at: typing.Optional[datetime.datetime] = pydantic.Field(
+        None, description="Время истечения", title="Время истечения"
+    )
+
+
+class AssetModel(pydantic.BaseModel):
+    """
+    Модель ассета
+    """
+
+    id: int = pydantic.Field(..., description="Идентификатор ассета", title="ID")
+    file_name: str = pydantic.Field(..., description="Имя файла", title="Имя файла")
+    asset_type: str = pydantic.Field(..., description="Тип ассета", title="Тип")
+    colorable: bool = pydantic.Field(
+        ..., description="Можно ли перекрашивать ассет", title="Перекрашиваемый"
+    )
+    default_properties: typing.Optional[typing.Dict[str, typing.Any]] = pydantic.Field(
+        None, description="Свойства по умолчанию", title="Свойства по умолчанию"
+    )
+    created_at: datetime.datetime = pydantic.Field(
+        ..., description="Время создания", title="Время создания"
+    )
+    modified_at: datetime.datetime = pydantic.Field(
+        ..., description="Время изменения", title="Время изменения"
+    )
+    url: typing.Optional[str] = pydantic.Field(
+        None,
+        description="Адрес файла ассета, меняется вместе с его содержимым",
+        title="Адрес файла",
+    )
+
+
 class ExceptionModel(pydantic.BaseModel):
     """
     Модель исключения
@@ -0,0 +1,197 @@
+"""
+End-to-end load test against a local Postgres
+
+    docker compose up -d postgres
+    python -m charcreator_backend.database
+    python -m loadtest --config config.json --users 20 --duration 60
+    python -m loadtest --save-baseline loadtest/baseline.json
+    python -m loadtest --baseline loadtest/baseline.json --tolerance 0.2
+
+The app is started from main.py in a subprocess with a copy of the given
+config, pointed at a local mail API stub. Virtual users run journeys against
+the same database until the duration runs out, then latency percentiles per
+step, throughput and pool saturation are printed and written as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the app and the harness both read config.json from a temporary working directory
+sys.path.insert(0, ROOT)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_config(source: str, directory: str, mail_url: str):
+    with open(source, "r") as f:
+        data = json.load(f)
+    data["mail_send_api"] = mail_url
+    data.setdefault("outbox", {}).update({"enabled": True, "poll_interval": 0.2})
+    data["is_production"] = False
+    with open(os.path.join(directory, "config.json"), "w") as f:
+        json.dump(data, f)
+
+
+async def wait_until_ready(client, process: subprocess.Popen, timeout: float = 30):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode}")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not start in time")
+
+
+async def run(args, app_url: str, process: subprocess.Popen, mail_stub) -> dict:
+    import httpx
+
+    from charcreator_backend.database.transaction_manager import DBPool
+    from charcreator_backend.hashing import PasswordHasher
+
+    from loadtest import journeys, stats
+
+    await mail_stub.start()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=30) as client:
+        await wait_until_ready(client, process)
+
+        pool = await DBPool.get_instance()
+        harness_pool = stats.PoolSampler(pool.get_size, pool.get_idle_size, pool.get_max_size())
+        app_samples = []
+
+        async def sample_app():
+            values = stats.parse_metrics((await client.get("/metrics")).text)
+            app_samples.append(values)
+
+        sampler = asyncio.create_task(
+            stats.sample_periodically([harness_pool.sample, sample_app], 0.25)
+        )
+
+        recorder = stats.Recorder()
+        run_id = uuid.uuid4().hex[:8]
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(
+            *(
+                journeys.virtual_user(recorder, client, run_id, args.saves, deadline)
+                for _ in range(args.users)
+            )
+        )
+        recorder.finish()
+        sampler.cancel()
+
+        # let the dispatcher deliver the queued signup emails
+        await asyncio.sleep(1)
+
+    await mail_stub.stop()
+    await DBPool.close()
+    PasswordHasher().shutdown()
+
+    report = recorder.summary()
+    report["users"] = args.users
+    report["harness_pool"] = harness_pool.summary()
+    report["app_pool"] = app_pool_summary(app_samples, stats)
+    report["mail"] = dict(mail_stub.received)
+    return report
+
+
+def app_pool_summary(samples, stats) -> dict:
+    samples = [s for s in samples if "cc_db_pool_size" in s]
+    if not samples:
+        return {}
+    from charcreator_backend.config import Config
+
+    summary = stats.pool_summary(
+        [int(s["cc_db_pool_size"] - s["cc_db_pool_idle"]) for s in samples],
+        Config().db.max_pool_size,
+    )
+    last = samples[-1]
+    if last.get("cc_db_pool_acquire_duration_seconds_count"):
+        summary["acquire_wait_mean"] = (
+            last["cc_db_pool_acquire_duration_seconds_sum"]
+            / last["cc_db_pool_acquire_duration_seconds_count"]
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    parser.add_argument("--config", type=str, default="config.json")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--saves", type=int, default=3, help="saves per journey")
+    parser.add_argument("--output", type=str, default="loadtest-report.json")
+    parser.add_argument("--baseline", type=str, default=None)
+    parser.add_argument("--save-baseline", type=str, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    paths = {
+        name: os.path.abspath(getattr(args, name))
+        for name in ("config", "output", "baseline", "save_baseline")
+        if getattr(args, name)
+    }
+
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        from loadtest.mail_stub import MailStub
+
+        mail_stub = MailStub(free_port())
+        write_config(paths["config"], directory, mail_stub.url)
+        app_port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.join(ROOT, "main.py"),
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(app_port),
+            ],
+            cwd=directory,
+            env={**os.environ, "NO_COLOR": "1"},
+        )
+        os.chdir(directory)
+        try:
+            report = asyncio.run(
+                run(args, f"http://127.0.0.1:{app_port}", process, mail_stub)
+            )
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            os.chdir(previous)
+
+    from loadtest import stats
+
+    stats.print_report(report)
+    stats.save(paths["output"], report)
+    if "save_baseline" in paths:
+        stats.save(paths["save_baseline"], report)
+
+    if "baseline" in paths:
+        regressions = stats.compare(paths["baseline"], report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
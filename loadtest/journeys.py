@@ -0,0 +1,126 @@
+import contextlib
+import datetime
+import logging
+import time
+import uuid
+
+import httpx
+import jwt
+
+from charcreator_backend.config import Config
+from charcreator_backend.database import TransactionManager
+from charcreator_backend.database.functions.codes import CodePurpose
+from charcreator_backend.hashing import hash_password
+from charcreator_backend.mail import queue_signup_email
+
+from .stats import Recorder
+
+logger = logging.getLogger("cc.loadtest")
+
+PASSWORD = "load-test-password"
+
+
+@contextlib.asynccontextmanager
+async def step(recorder: Recorder, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        recorder.record(name, time.perf_counter() - started, ok=False)
+        raise
+    recorder.record(name, time.perf_counter() - started)
+
+
+async def journey(recorder: Recorder, client: httpx.AsyncClient, run_id: str, saves: int):
+    """
+    One user going through signup, email verification, login, a few saves
+    and logout
+
+    Signup, verification, login and logout go through the database function
+    layer. Each save is an authenticated request to the running app with the
+    session cookie ("me", the auth path) followed by an unauthenticated write
+    ("save")
+    """
+    config = Config()
+    email = f"loadtest-{run_id}-{uuid.uuid4().hex[:12]}@example.com"
+
+    async with step(recorder, "signup"):
+        password_hash = await hash_password(PASSWORD)
+        async with TransactionManager() as transaction_manager:
+            user = await transaction_manager.functions.users.signup_create_user(
+                email, password_hash
+            )
+            code = await transaction_manager.functions.codes.create_code(
+                user.id,
+                CodePurpose.EMAIL_VERIFICATION,
+                datetime.datetime.now() + datetime.timedelta(days=1),
+            )
+            await queue_signup_email(
+                transaction_manager, email, f"{config.frontend_url}/verify?code={code.code}"
+            )
+
+    async with step(recorder, "verify"):
+        async with TransactionManager() as transaction_manager:
+            used = await transaction_manager.functions.codes.get_and_mark_code_as_used(
+                code.code
+            )
+            if used is None:
+                raise RuntimeError("Verification code not found")
+            await transaction_manager.functions.users.mark_verified_email(used.user_id)
+
+    async with step(recorder, "login"):
+        password_hash = await hash_password(PASSWORD)
+        expires_at = datetime.datetime.now() + datetime.timedelta(
+            seconds=config.jwt.expiration
+        )
+        token = jwt.encode(
+            {"sub": str(user.id), "exp": int(expires_at.timestamp())},
+            config.jwt.secret,
+            algorithm=config.jwt.algorithm,
+        )
+        async with TransactionManager() as transaction_manager:
+            user = await transaction_manager.functions.users.verify_password(
+                email, password_hash
+            )
+            await transaction_manager.functions.sessions.create(user.id, token, expires_at)
+            await transaction_manager.functions.users.update_last_login(user)
+
+    for i in range(saves):
+        async with step(recorder, "me"):
+            response = await client.get(
+                "/example/me", headers={"Cookie": f"authorization={token}"}
+            )
+            response.raise_for_status()
+
+        # /example/submit has no auth dependency
+        async with step(recorder, "save"):
+            response = await client.post(
+                "/example/submit",
+                json={
+                    "id": i,
+                    "name": f"Character {i}",
+                    "description": "Load test character",
+                    "tags": ["loadtest"],
+                },
+            )
+            response.raise_for_status()
+
+    async with step(recorder, "logout"):
+        async with TransactionManager() as transaction_manager:
+            await transaction_manager.functions.sessions.delete(token)
+
+    recorder.journeys += 1
+
+
+async def virtual_user(
+        recorder: Recorder,
+        client: httpx.AsyncClient,
+        run_id: str,
+        saves: int,
+        deadline: float,
+):
+    while time.monotonic() < deadline:
+        try:
+            await journey(recorder, client, run_id, saves)
+        except Exception as e:
+            logger.warning("Journey failed: %s", e)
@@ -0,0 +1,37 @@
+import typing
+
+from aiohttp import web
+
+
+class MailStub:
+    """
+    Local stand-in for the mail API, accepts every request and counts them
+    by path
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.received: typing.Dict[str, int] = {}
+        self._runner: typing.Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        await request.read()
+        path = request.match_info["path"]
+        self.received[path] = self.received.get(path, 0) + 1
+        return web.json_response({"status": "ok"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import math
+import time
+import typing
+
+
+def percentile(values: typing.List[float], q: float) -> float:
+    """
+    Nearest-rank percentile
+
+    :param values: sorted values
+    :param q: percentile, 0-100
+    :return: value or 0 if there are no values
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Recorder:
+    """
+    Latencies and errors of journey steps
+    """
+
+    def __init__(self):
+        self.latencies: typing.Dict[str, typing.List[float]] = {}
+        self.errors: typing.Dict[str, int] = {}
+        self.journeys = 0
+        self.started = time.monotonic()
+        self.finished: typing.Optional[float] = None
+
+    def record(self, step: str, elapsed: float, ok: bool = True):
+        self.latencies.setdefault(step, []).append(elapsed)
+        if not ok:
+            self.errors[step] = self.errors.get(step, 0) + 1
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self) -> dict:
+        steps = {}
+        total = 0
+        for step, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            total += len(latencies)
+            steps[step] = {
+                "count": len(latencies),
+                "errors": self.errors.get(step, 0),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1],
+            }
+        return {
+            "duration": self.duration,
+            "journeys": self.journeys,
+            "journeys_per_second": self.journeys / self.duration,
+            "requests": total,
+            "requests_per_second": total / self.duration,
+            "steps": steps,
+        }
+
+
+class PoolSampler:
+    """
+    Samples how many connections of a pool are in use
+    """
+
+    def __init__(
+            self,
+            size: typing.Callable[[], int],
+            idle: typing.Callable[[], int],
+            max_size: int,
+    ):
+        self.size = size
+        self.idle = idle
+        self.max_size = max_size
+        self.samples: typing.List[int] = []
+
+    def sample(self):
+        self.samples.append(self.size() - self.idle())
+
+    def summary(self) -> dict:
+        return pool_summary(self.samples, self.max_size)
+
+
+def pool_summary(samples: typing.List[int], max_size: int) -> dict:
+    """
+    :param samples: numbers of connections in use
+    :param max_size: pool size limit
+    :return: max and mean usage and the share of samples when the pool was exhausted
+    """
+    if not samples:
+        return {"max_size": max_size}
+    return {
+        "max_size": max_size,
+        "max_in_use": max(samples),
+        "mean_in_use": sum(samples) / len(samples),
+        # a new query would have had to wait for a connection
+        "saturated": sum(1 for s in samples if s >= max_size) / len(samples),
+    }
+
+
+async def sample_periodically(callbacks: typing.List[typing.Callable], interval: float):
+    while True:
+        for callback in callbacks:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                await result
+        await asyncio.sleep(interval)
+
+
+def parse_metrics(text: str) -> typing.Dict[str, float]:
+    """
+    Unlabeled samples of a Prometheus text exposition
+    """
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#") or "{" in line:
+            continue
+        name, _, value = line.partition(" ")
+        try:
+            values[name] = float(value)
+        except ValueError:
+            pass
+    return values
+
+
+def save(path: str, report: dict):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def compare(baseline_path: str, report: dict, tolerance: float) -> typing.List[str]:
+    """
+    Compare throughput and p95 latencies with a stored baseline
+
+    :param baseline_path: report of a previous run
+    :param report: report of this run
+    :param tolerance: allowed relative change, 0.2 is 20%
+    :return: descriptions of regressions
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    old_rps = baseline["requests_per_second"]
+    new_rps = report["requests_per_second"]
+    if new_rps < old_rps * (1 - tolerance):
+        regressions.append(f"throughput {old_rps:.1f} -> {new_rps:.1f} req/s")
+
+    for step, result in report["steps"].items():
+        old = baseline["steps"].get(step)
+        if old is None:
+            continue
+        if result["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{step} p95 {old['p95'] * 1000:.1f} -> {result['p95'] * 1000:.1f} ms"
+            )
+        if result["errors"] > old["errors"]:
+            regressions.append(f"{step} errors {old['errors']} -> {result['errors']}")
+    return regressions
+
+
+def print_report(report: dict):
+    print(
+        f"{report['journeys']} journeys in {report['duration']:.1f} s, "
+        f"{report['journeys_per_second']:.1f} journeys/s, "
+        f"{report['requests_per_second']:.1f} req/s"
+    )
+    print(f"{'step':<16} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step, result in report["steps"].items():
+        print(
+            f"{step:<16} {result['count']:>7} {result['errors']:>7} "
+            f"{result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} {result['p99'] * 1000:>9.1f}"
+        )
+    for name in ("harness_pool", "app_pool"):
+        pool = report.get(name)
+        if pool and "max_in_use" in pool:
+            print(
+                f"{name}: {pool['max_in_use']}/{pool['max_size']} max in use, "
+                f"{pool['mean_in_use']:.1f} mean, saturated {pool['saturated']:.0%} of the time"
+            )
+    if report.get("mail"):
+        print(f"mail stub received: {report['mail']}")
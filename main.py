@@ -1,21 +1,29 @@
 import logging
 import os
-import base64
-import secrets
-import tracemalloc
 
 import fastapi
 from fastapi import status
 import fastapi.exceptions
 import fastapi.responses
+import starlette.exceptions
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
 
 import charcreator_backend
-
-tracemalloc.start()
+import charcreator_backend.asset_files
+import charcreator_backend.config
+import charcreator_backend.logs
+import charcreator_backend.middleware
+import charcreator_backend.rendering
+import charcreator_backend.responses
 
 NO_COLOR_MODE = os.getenv("NO_COLOR", "").lower() in ("true", "1", "yes")
+# allocation tracing is expensive, it can also be started at runtime via /debug
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC", "0") or 0)
+if TRACEMALLOC_FRAMES > 0:
+    import tracemalloc
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
 # logging level for 3rd party libraries
 GLOBAL_LOGGING_LEVEL = logging.WARNING
 # logging level for the bot
@@ -23,7 +31,11 @@ LOCAL_LOGGING_LEVEL = logging.DEBUG
 LOGGING_FORMAT = "%(asctime)-15s.%(msecs)03d [%(levelname)-8s] %(name)-22s > %(filename)-18s:%(lineno)-5d - %(message)s"
 LOGGING_DT_FORMAT = "%b %d %H:%M:%S"
 
-if not NO_COLOR_MODE:
+LOGGING_CONFIG = charcreator_backend.config.Config().logging
+
+if LOGGING_CONFIG.mode == "json":
+    charcreator_backend.logs.setup_json_logging(LOGGING_CONFIG)
+elif not NO_COLOR_MODE:
     import colorlog
 
     # color handler+formatter
@@ -67,14 +79,42 @@ else:
     parent_logger = logging.getLogger("cc")
     parent_logger.setLevel(LOCAL_LOGGING_LEVEL)
 
+if LOGGING_CONFIG.mode != "json":
+    charcreator_backend.logs.apply_levels(LOGGING_CONFIG)
+
 logger = logging.getLogger("cc").getChild("main")
 
 app = fastapi.FastAPI(
+    default_response_class=charcreator_backend.responses.JsonResponse,
     openapi_tags=[
         {
             "name": "Example module",
             "description": "Модуль-пример",
         },
+        {
+            "name": "Assets",
+            "description": "Каталог ассетов",
+        },
+        {
+            "name": "Asset files",
+            "description": "Файлы ассетов по адресам с хешем содержимого",
+        },
+        {
+            "name": "Render",
+            "description": "Отрисовка персонажей в миниатюры",
+        },
+        {
+            "name": "Admin",
+            "description": "Администрирование, доступно только администраторам",
+        },
+        {
+            "name": "Debug",
+            "description": "Отладка, доступна только с локальных адресов",
+        },
+        {
+            "name": "Monitoring",
+            "description": "Метрики, доступны только с локальных адресов",
+        },
     ]
 )
 app.add_middleware(
@@ -84,6 +124,10 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+# pure ASGI middleware, the last added one is the outermost
+app.add_middleware(charcreator_backend.middleware.DocsAuthMiddleware)
+app.add_middleware(charcreator_backend.middleware.ErrorTranslationMiddleware)
+app.add_middleware(charcreator_backend.middleware.MetricsMiddleware)
 
 
 async def init_modules():
@@ -92,35 +136,28 @@ async def init_modules():
     await charcreator_backend.endpoints.example.init_submodule(
         app, "/example", "example"
     )
+    await charcreator_backend.endpoints.assets.init_submodule(app, "/assets", "assets")
+    await charcreator_backend.endpoints.asset_files.init_submodule(
+        app, charcreator_backend.asset_files.URL_PREFIX, "asset_files"
+    )
+    await charcreator_backend.endpoints.render.init_submodule(
+        app, charcreator_backend.rendering.URL_PREFIX, "render"
+    )
+    await charcreator_backend.endpoints.admin.init_submodule(app, "/admin", "admin")
+    await charcreator_backend.endpoints.debug.init_submodule(app, "/debug", "debug")
+    await charcreator_backend.endpoints.monitoring.init_submodule(
+        app, "", "monitoring"
+    )
 
 
 security = HTTPBasic()
 
 
-def check_auth(auth_header: str):
-    prefix = "Basic "
-    if not auth_header.startswith(prefix):
-        return fastapi.Response(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            headers={"WWW-Authenticate": "Basic"},
-            content="Unauthorized",
-        )
-
-    auth_decoded = base64.b64decode(auth_header[len(prefix) :]).decode("utf-8")
-    username, _, password = auth_decoded.partition(":")
-
-    # этот пароль не особо важен, так что просто хранится в коде
-    correct_username = secrets.compare_digest(username, "docs_read")
-    correct_password = secrets.compare_digest(
-        password, "H6AmdL296HeMX094J7AqRQN2OC8TBvtP"
-    )
-
-    if not (correct_username and correct_password):
-        return fastapi.Response(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            headers={"WWW-Authenticate": "Basic"},
-            content="Unauthorized",
-        )
+# same output as FastAPI's own handler, constant errors are sent pre-serialized
+app.add_exception_handler(
+    starlette.exceptions.HTTPException,
+    charcreator_backend.responses.http_exception_handler,
+)
 
 
 @app.exception_handler(fastapi.exceptions.RequestValidationError)
@@ -134,7 +171,8 @@ async def validation_exception_handler(
         )
 
     logger.info(
-        f"Returning validation error in {request.url.path}",
+        "Returning validation error in %s",
+        request.url.path,
         extra={
             "path": request.url.path,
             "method": request.method,
@@ -147,104 +185,70 @@ async def validation_exception_handler(
         message="Некорректные данные в запросе",
         fields={"errors": error_messages},
     )
-    return fastapi.responses.JSONResponse(content=e.model_dump(), status_code=e.code)
-
-
-@app.middleware("http")
-async def docs_auth_handler(request: fastapi.Request, call_next):
-    if request.url.path in ["/docs", "/openapi.json", "/redoc"]:
-        client_host = request.headers.get("X-Real-IP") or request.client[0]
-        if client_host not in ["127.0.0.1", "localhost"]:
-            auth = request.headers.get("Authorization")
-            if not auth:
-                return fastapi.Response(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    headers={"WWW-Authenticate": "Basic"},
-                    content="Unauthorized",
-                )
-
-            try:
-                check_auth(auth)
-            except Exception:
-                return fastapi.Response(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    headers={"WWW-Authenticate": "Basic"},
-                    content="Unauthorized",
-                )
-
-    response = await call_next(request)
-    return response
-
-
-@app.middleware("http")
-async def custom_exception_handler(request: fastapi.Request, call_next):
-    try:
-        response = await call_next(request)
-        return response
-    except fastapi.HTTPException as e:
-        logger.info(
-            f"An error was returned in {request.url.path}",
-            extra={
-                "path": request.url.path,
-                "method": request.method,
-                "status_code": e.status_code,
-                "exception": str(e),
-            },
-        )
-        if hasattr(e, "custom_data"):
-            custom_data: charcreator_backend.shared_models.ErrorModel = getattr(
-                e, "custom_data"
-            )
-            resp = fastapi.responses.JSONResponse(
-                content=custom_data.model_dump(), status_code=custom_data.code
-            )
-            cookies_to_remove = getattr(e, "remove_cookies", None)
-            if cookies_to_remove:
-                for cookie in cookies_to_remove:
-                    resp.delete_cookie(cookie)
-            return resp
-        elif e.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY:
-            return fastapi.responses.JSONResponse(
-                content=charcreator_backend.shared_models.ErrorModel(
-                    code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                    message="Некорректные данные в запросе",
-                    fields=e.detail,
-                ).model_dump(),
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            )
-        else:
-            return e
-    except Exception as e:
-        logger.error(f"An internal error occurred in {request.url.path}")
-        logger.exception(e)
-        custom_error = charcreator_backend.shared_models.ExceptionModel(
-            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            message="An internal error occurred",
-            fields={
-                "path": request.url.path,
-                "method": request.method,
-            },
-            exception={
-                "type": type(e).__name__,
-                "message": str(e),
-            },
-        )
-        return fastapi.responses.JSONResponse(
-            content=custom_error.model_dump(),
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    return charcreator_backend.responses.JsonResponse(
+        content=e.model_dump(), status_code=e.code
+    )
 
 
 @app.on_event("startup")
 async def startup_event():
     await init_modules()
     logger.info("Modules initialized")
-    from charcreator_backend.database import TransactionManager
+    from charcreator_backend.asset_upload import AssetUploads
+    from charcreator_backend.config import Config
+    from charcreator_backend.database import (
+        AssetCatalog,
+        AuthCache,
+        LastUsedBuffer,
+        SessionEventsListener,
+    )
+    from charcreator_backend.database.transaction_manager import DBPool
+    from charcreator_backend.mail import MailClient, OutboxDispatcher
 
-    async with TransactionManager() as conn:
-        pass
+    await DBPool.warm_up()
     logger.info("Database connection established")
 
+    await LastUsedBuffer().start()
+    await charcreator_backend.asset_files.AssetFiles().scan()
+    await charcreator_backend.rendering.Renderer().start()
+    await AssetUploads().start()
+    if AssetCatalog().enabled:
+        await AssetCatalog().start()
+    if Config().auth.mode == "jwt" or AuthCache().enabled:
+        await SessionEventsListener().start()
+    await MailClient().start()
+    if Config().outbox.enabled:
+        await OutboxDispatcher().start()
+    logger.info("Background services started")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from charcreator_backend.asset_upload import AssetUploads
+    from charcreator_backend.database import (
+        AssetCatalog,
+        LastUsedBuffer,
+        SessionEventsListener,
+    )
+    from charcreator_backend.database.transaction_manager import DBPool
+    from charcreator_backend.hashing import PasswordHasher
+    from charcreator_backend.mail import MailClient, OutboxDispatcher
+
+    await AssetUploads().stop()
+    await OutboxDispatcher().stop()
+    await MailClient().close()
+    PasswordHasher().shutdown()
+    charcreator_backend.rendering.Renderer().shutdown()
+    await SessionEventsListener().stop()
+    await AssetCatalog().stop()
+    await LastUsedBuffer().stop()
+    logger.info("Pending session updates flushed")
+
+    await DBPool.close()
+    logger.info("Database connection closed")
+
+    charcreator_backend.logs.stop_logging()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -255,4 +259,12 @@ if __name__ == "__main__":
     parser.add_argument("--port", type=int, default=2612)
     args = parser.parse_args()
 
-    uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        # in json mode uvicorn's loggers go through the same queue
+        log_config=(
+            None if LOGGING_CONFIG.mode == "json" else uvicorn.config.LOGGING_CONFIG
+        ),
+    )
\ No newline at end of file
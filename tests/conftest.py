@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# the tests import the app packages from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import environment  # noqa: E402
+from charcreator_backend.config import Config  # noqa: E402
+
+
+def _load_test_config():
+    """
+    Load a throwaway config before the test modules are imported, modules
+    like charcreator_backend.mail read Config() on import
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # Config() is a singleton, later calls keep this one
+        Config.__new__(Config).load_from_file(environment.write_config(directory))
+
+
+_load_test_config()
+
+from charcreator_backend.database.transaction_manager import DBPool  # noqa: E402
+from charcreator_backend.mail import MailClient  # noqa: E402
+
+
+class RecordingTransaction:
+    def __init__(self, events: list):
+        self.events = events
+
+    async def start(self):
+        self.events.append("begin")
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.events.append("rollback")
+
+
+class RecordingConnection:
+    def __init__(self, events: list):
+        self.events = events
+
+    def transaction(self):
+        return RecordingTransaction(self.events)
+
+    async def execute(self, query, *args, **kwargs):
+        self.events.append("execute")
+        return "DELETE 1"
+
+
+class RecordingPool:
+    """
+    Stands in for the asyncpg pool, ``events`` lists what happened in order
+    """
+
+    def __init__(self):
+        self.events = []
+
+    async def acquire(self):
+        return RecordingConnection(self.events)
+
+    async def release(self, conn):
+        self.events.append("release")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = RecordingPool()
+    monkeypatch.setattr(DBPool, "_instance", pool)
+    return pool
+
+
+class MailApi:
+    """
+    Stub of the mail API, records the client port of every request
+    """
+
+    def __init__(self):
+        # seconds before answering and the status of the answers
+        self.delay = 0.0
+        self.status = 200
+        self.ports = []
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.ports.append(request.transport.get_extra_info("peername")[1])
+        self.requests.append(
+            (request.match_info["method"], request.headers.get("X-Auth-Token"), await request.json())
+        )
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return web.json_response({"ok": True}, status=self.status)
+
+
+@pytest.fixture
+def mail_api() -> MailApi:
+    return MailApi()
+
+
+@pytest.fixture
+def serve_mail_api(mail_api, monkeypatch):
+    """
+    Async context manager that runs ``mail_api`` on a local port and points
+    MailClient at it, the client is closed on exit
+    """
+    @contextlib.asynccontextmanager
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/{method}", mail_api.handle)
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setattr(Config(), "mail_send_api", str(server.make_url("")).rstrip("/"))
+        try:
+            yield MailClient()
+        finally:
+            await MailClient().close()
+            await server.close()
+
+    return serve
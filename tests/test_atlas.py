@@ -0,0 +1,66 @@
+import asyncio
+import datetime
+import os
+
+import pytest
+from PIL import Image
+
+from charcreator_backend.asset_files import AssetFiles
+from charcreator_backend.atlas import build_atlases, manifest_name
+from charcreator_backend.database.functions.assets import Asset, AssetType
+
+NOW = datetime.datetime(2024, 10, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    files = AssetFiles()
+    monkeypatch.setattr(files, "directory", os.path.realpath(tmp_path))
+    monkeypatch.setattr(files, "_files", {})
+    return files
+
+
+def make_asset(files: AssetFiles, asset_id: int, color, modified_at=NOW) -> Asset:
+    file_name = f"hairstyle/{asset_id}.png"
+    path = os.path.join(files.directory, file_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGBA", (16, 16), color).save(path)
+    return Asset(asset_id, file_name, NOW, modified_at, AssetType.HAIRSTYLE, False, None)
+
+
+def build(assets) -> dict:
+    return asyncio.run(build_atlases(assets))
+
+
+def page_files(manifest: dict) -> list:
+    return [page["file"] for page in manifest["types"]["hairstyle"]["pages"]]
+
+
+def manifest_bytes(files: AssetFiles) -> bytes:
+    with open(os.path.join(files.directory, manifest_name()), "rb") as f:
+        return f.read()
+
+
+def test_noop_build_keeps_manifest(files):
+    assets = [make_asset(files, 1, (255, 0, 0, 255))]
+    build(assets)
+    first = manifest_bytes(files)
+    build(assets)
+    assert manifest_bytes(files) == first
+
+
+def test_pages_are_named_by_content(files):
+    first = page_files(build([make_asset(files, 1, (255, 0, 0, 255))]))
+    later = NOW + datetime.timedelta(minutes=1)
+    second = page_files(build([make_asset(files, 1, (0, 255, 0, 255), later)]))
+    assert first != second
+    # clients holding the previous manifest can still load its pages
+    for file_name in first + second:
+        assert os.path.exists(files.resolve(file_name))
+
+    latest = NOW + datetime.timedelta(minutes=2)
+    third = page_files(build([make_asset(files, 1, (0, 0, 255, 255), latest)]))
+    for file_name in first:
+        assert not os.path.exists(files.resolve(file_name))
+    for file_name in second + third:
+        assert os.path.exists(files.resolve(file_name))
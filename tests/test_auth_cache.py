@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from charcreator_backend.database import TransactionManager, auth_cache
+from charcreator_backend.database.auth_cache import AuthCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    # a fresh singleton for every test
+    monkeypatch.setattr(AuthCache, "_instance", None)
+    cache = AuthCache()
+    cache.ttl = 10
+    cache.max_size = 3
+    return cache
+
+
+def put(cache: AuthCache, token: str, user_id: int = 1, session_id: int = 1):
+    cache.put(token, f"data of {token}", user_id, session_id, cache.epoch)
+
+
+def test_get_put(cache):
+    assert cache.get("a") is None
+    put(cache, "a")
+    assert cache.get("a") == "data of a"
+
+
+def test_ttl(cache, clock):
+    put(cache, "a")
+    clock.now += 9
+    assert cache.get("a") == "data of a"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache._entries) == 0
+
+
+def test_least_recently_used_is_evicted(cache):
+    put(cache, "a", session_id=1)
+    put(cache, "b", session_id=2)
+    put(cache, "c", session_id=3)
+    cache.get("a")
+    put(cache, "d", session_id=4)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_stale_epoch_is_not_stored(cache):
+    epoch = cache.epoch
+    # the lookup started before a concurrent invalidation
+    cache.invalidate_user(1)
+    cache.put("a", "stale", 1, 1, epoch)
+    assert cache.get("a") is None
+
+
+def test_invalidate_token_and_session(cache):
+    put(cache, "a", session_id=1)
+    put(cache, "b", session_id=2)
+    cache.invalidate_token("a")
+    cache.invalidate_session(2)
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache._by_user == {} and cache._by_session == {}
+
+
+def test_invalidate_user_keeps_excepted_session(cache):
+    put(cache, "a", user_id=1, session_id=1)
+    put(cache, "b", user_id=1, session_id=2)
+    put(cache, "c", user_id=2, session_id=3)
+    cache.invalidate_user(1, except_session_id=2)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+
+def test_disabled(cache):
+    cache.ttl = 0
+    put(cache, "a")
+    assert cache.get("a") is None
+
+
+def test_session_delete_invalidates_after_commit(cache, pool):
+    put(cache, "a")
+
+    async def scenario():
+        async with TransactionManager() as transaction_manager:
+            await transaction_manager.functions.sessions.delete("a")
+            # a lookup before the commit still sees the session in the database
+            assert cache.get("a") is not None
+        assert cache.get("a") is None
+
+    asyncio.run(scenario())
+    assert pool.events == ["begin", "execute", "commit", "release"]
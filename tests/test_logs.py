@@ -0,0 +1,76 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+
+from charcreator_backend.logs.logs import DroppingQueueHandler, JsonFormatter
+
+
+class RecordingFormatter(JsonFormatter):
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def format(self, record: logging.LogRecord) -> str:
+        self.threads.append(threading.current_thread())
+        return super().format(record)
+
+
+def log_through_queue(emit) -> tuple:
+    log_queue: queue.Queue = queue.Queue(100)
+    output = io.StringIO()
+    stream_handler = logging.StreamHandler(output)
+    formatter = RecordingFormatter()
+    stream_handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+
+    logger = logging.getLogger("cc.tests.logs")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        emit(logger)
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    return lines, formatter.threads
+
+
+def test_exception_field():
+    def emit(logger):
+        try:
+            raise ValueError("broken")
+        except ValueError:
+            logger.exception("Failed %d", 1)
+
+    (line,), _ = log_through_queue(emit)
+    assert line["message"] == "Failed 1"
+    assert "Traceback" in line["exception"]
+    assert "ValueError: broken" in line["exception"]
+    assert "Traceback" not in line["message"]
+
+
+def test_formatted_in_listener_thread():
+    def emit(logger):
+        logger.info("Hello %s", "world", extra={"user_id": 5})
+
+    (line,), threads = log_through_queue(emit)
+    assert line["message"] == "Hello world"
+    assert line["user_id"] == 5
+    assert threads and all(thread is not threading.main_thread() for thread in threads)
+
+
+def test_args_are_merged_before_queueing():
+    values = ["before"]
+
+    def emit(logger):
+        logger.info("Value %s", values)
+        values[0] = "after"
+
+    (line,), _ = log_through_queue(emit)
+    assert line["message"] == "Value ['before']"
@@ -0,0 +1,88 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from charcreator_backend.config import Config
+from charcreator_backend.mail import send_custom_email
+
+
+@pytest.fixture
+def mail_client_config(monkeypatch):
+    # the session is created with these on first use
+    config = Config().mail_client
+    monkeypatch.setattr(config, "limit_per_host", 2)
+    monkeypatch.setattr(config, "total_timeout", 0.5)
+    return config
+
+
+def test_keep_alive_reuses_connection(mail_api, serve_mail_api, mail_client_config):
+
+    async def scenario():
+        async with serve_mail_api():
+            for _ in range(3):
+                await send_custom_email("user@example.com", "Subject", "Body")
+
+    asyncio.run(scenario())
+    assert len(mail_api.ports) == 3
+    assert len(set(mail_api.ports)) == 1
+    method, token, payload = mail_api.requests[0]
+    assert method == "send_email"
+    assert token == "KEY"
+    assert payload["to"] == "user@example.com"
+
+
+def test_limit_per_host(mail_api, serve_mail_api, mail_client_config):
+    mail_api.delay = 0.1
+
+    async def scenario():
+        async with serve_mail_api() as client:
+            await asyncio.gather(
+                *(client.post("send_email", {"n": n}) for n in range(6))
+            )
+
+    asyncio.run(scenario())
+    assert len(mail_api.requests) == 6
+    assert mail_api.max_active == mail_client_config.limit_per_host
+    assert len(set(mail_api.ports)) == mail_client_config.limit_per_host
+
+
+def test_timeout(mail_api, serve_mail_api, mail_client_config):
+    mail_api.delay = 5
+
+    async def scenario():
+        async with serve_mail_api() as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.post("send_email", {})
+
+    asyncio.run(scenario())
+
+
+def test_error_status_raises(mail_api, serve_mail_api, mail_client_config):
+    mail_api.status = 422
+
+    async def scenario():
+        async with serve_mail_api() as client:
+            with pytest.raises(aiohttp.ClientResponseError) as info:
+                await client.post("send_email", {})
+            assert info.value.status == 422
+
+    asyncio.run(scenario())
+
+
+def test_close(mail_api, serve_mail_api, mail_client_config):
+
+    async def scenario():
+        async with serve_mail_api() as client:
+            await client.post("send_email", {})
+            session = client.session
+            await client.close()
+            assert session.closed
+            assert client._session is None
+            # the next request opens a new session and connection
+            await client.post("send_email", {})
+            assert client.session is not session
+
+    asyncio.run(scenario())
+    assert len(mail_api.ports) == 2
+    assert mail_api.ports[0] != mail_api.ports[1]
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import logging
+
+import pytest
+
+from charcreator_backend.database.functions.outbox import OutboxMessage
+from charcreator_backend.mail import OutboxDispatcher
+from charcreator_backend.mail import outbox_dispatcher
+from charcreator_backend.mail.outbox_dispatcher import DeliveryFailure
+
+
+def message(attempts: int = 0) -> OutboxMessage:
+    now = datetime.datetime(2024, 10, 1, 12, 0, 0)
+    return OutboxMessage(1, "send_email", {"to": "user@example.com"}, now, attempts, now, None, None)
+
+
+class RecordingOutbox:
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    async def claim(self, limit, max_attempts, lease):
+        messages, self.messages = self.messages, []
+        return messages
+
+    async def mark_sent(self, message_ids):
+        self.calls.append(("mark_sent", message_ids))
+
+    async def release(self, message_ids, retry_in):
+        self.calls.append(("release", message_ids))
+
+    async def mark_failed(self, message_id, error, retry_in):
+        self.calls.append(("mark_failed", message_id))
+
+    async def mark_rejected(self, message_id, error, max_attempts):
+        self.calls.append(("mark_rejected", message_id, max_attempts))
+
+
+class RecordingTransactionManager:
+    outbox: RecordingOutbox
+
+    def __init__(self):
+        self.functions = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = OutboxDispatcher()
+    dispatcher.breaker.record_success()
+    return dispatcher
+
+
+def dispatch(dispatcher, monkeypatch, serve_mail_api, messages) -> RecordingOutbox:
+    outbox = RecordingOutbox(messages)
+    monkeypatch.setattr(RecordingTransactionManager, "outbox", outbox, raising=False)
+    monkeypatch.setattr(outbox_dispatcher, "TransactionManager", RecordingTransactionManager)
+
+    async def scenario():
+        async with serve_mail_api():
+            await dispatcher.dispatch_batch()
+
+    asyncio.run(scenario())
+    return outbox
+
+
+@pytest.mark.parametrize(
+    "status, permanent", [(400, True), (422, True), (429, False), (503, False)]
+)
+def test_deliver_failure(dispatcher, mail_api, serve_mail_api, status, permanent):
+    mail_api.status = status
+
+    async def scenario():
+        async with serve_mail_api():
+            return await dispatcher._deliver(message())
+
+    failure = asyncio.run(scenario())
+    dispatcher.breaker.record_success()
+    assert isinstance(failure, DeliveryFailure)
+    assert failure.error.startswith(str(status))
+    assert failure.permanent is permanent
+
+
+def test_rejected_on_first_attempt(dispatcher, mail_api, serve_mail_api, monkeypatch, caplog):
+    mail_api.status = 422
+    with caplog.at_level(logging.ERROR, logger="cc.mail.outbox"):
+        outbox = dispatch(dispatcher, monkeypatch, serve_mail_api, [message()])
+    assert outbox.calls == [("mark_rejected", 1, dispatcher.config.max_attempts)]
+    assert "failed permanently after 1 attempts" in caplog.text
+
+
+def test_retried_until_max_attempts(dispatcher, mail_api, serve_mail_api, monkeypatch, caplog):
+    mail_api.status = 503
+    with caplog.at_level(logging.ERROR, logger="cc.mail.outbox"):
+        outbox = dispatch(dispatcher, monkeypatch, serve_mail_api, [message()])
+    dispatcher.breaker.record_success()
+    assert outbox.calls == [("mark_failed", 1)]
+    assert caplog.text == ""
+
+    last = message(attempts=dispatcher.config.max_attempts - 1)
+    with caplog.at_level(logging.ERROR, logger="cc.mail.outbox"):
+        outbox = dispatch(dispatcher, monkeypatch, serve_mail_api, [last])
+    dispatcher.breaker.record_success()
+    assert outbox.calls == [("mark_failed", 1)]
+    assert f"after {dispatcher.config.max_attempts} attempts" in caplog.text
+
+
+def test_sent(dispatcher, serve_mail_api, monkeypatch):
+    outbox = dispatch(dispatcher, monkeypatch, serve_mail_api, [message()])
+    assert outbox.calls == [("mark_sent", [1])]
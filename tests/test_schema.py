@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from charcreator_backend.database import schema
+
+
+class FakeConnection:
+    def __init__(self, duplicates=()):
+        self.duplicates = list(duplicates)
+        self.executed = []
+
+    async def fetch(self, query, *args):
+        return self.duplicates
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+
+
+class FakeAssets:
+    def __init__(self, indexed: bool):
+        self.indexed = indexed
+
+    async def has_unique_file_name(self) -> bool:
+        return self.indexed
+
+
+class FakeOutbox:
+    async def table_exists(self) -> bool:
+        return True
+
+
+class FakeTransactionManager:
+    def __init__(self, indexed: bool, duplicates=()):
+        self.functions = self
+        self.connection = FakeConnection(duplicates)
+        self.assets = FakeAssets(indexed)
+        self.outbox = FakeOutbox()
+
+
+def test_apply_creates_missing_index():
+    transaction_manager = FakeTransactionManager(indexed=False)
+    assert asyncio.run(schema.missing(transaction_manager)) == ["assets.file_name_key"]
+    assert asyncio.run(schema.apply(transaction_manager)) == ["assets.file_name_key"]
+    assert any(
+        "CREATE UNIQUE INDEX CONCURRENTLY" in statement
+        for statement in transaction_manager.connection.executed
+    )
+
+
+def test_apply_skips_applied_changes():
+    transaction_manager = FakeTransactionManager(indexed=True)
+    assert asyncio.run(schema.missing(transaction_manager)) == []
+    assert asyncio.run(schema.apply(transaction_manager)) == []
+    assert transaction_manager.connection.executed == []
+
+
+def test_apply_refuses_duplicates():
+    transaction_manager = FakeTransactionManager(
+        indexed=False, duplicates=[("hairstyle/long.png", 2)]
+    )
+    with pytest.raises(schema.SchemaError, match="hairstyle/long.png"):
+        asyncio.run(schema.apply(transaction_manager))
+    assert transaction_manager.connection.executed == []
@@ -0,0 +1,75 @@
+import asyncio
+
+from charcreator_backend.database import TransactionManager
+
+
+def run(pool, readonly=False, fail=False, rollback=False):
+    async def scenario():
+        async with TransactionManager(readonly=readonly) as transaction_manager:
+            connection = transaction_manager.functions.connection
+            await connection.execute("DELETE FROM sessions")
+            connection.on_commit(lambda: pool.events.append("callback"))
+            if rollback:
+                await transaction_manager.rollback()
+            if fail:
+                raise ValueError("broken")
+
+    try:
+        asyncio.run(scenario())
+    except ValueError:
+        pass
+    return pool.events
+
+
+def test_on_commit_runs_after_commit(pool):
+    assert run(pool) == ["begin", "execute", "commit", "callback", "release"]
+
+
+def test_on_commit_dropped_on_error(pool):
+    assert run(pool, fail=True) == ["begin", "execute", "rollback", "release"]
+
+
+def test_on_commit_dropped_on_explicit_rollback(pool):
+    assert run(pool, rollback=True) == ["begin", "execute", "rollback", "release"]
+
+
+def test_on_commit_runs_right_away_when_readonly(pool):
+    assert run(pool, readonly=True) == ["execute", "callback", "release"]
+
+
+def test_autocommit_statements_run_before_begin(pool):
+    async def scenario():
+        async with TransactionManager() as transaction_manager:
+            await transaction_manager.autocommit_functions.connection.execute("SELECT 1")
+            await transaction_manager.functions.connection.execute("DELETE FROM sessions")
+            # inside the transaction once it is started
+            await transaction_manager.autocommit_functions.connection.execute("SELECT 1")
+
+    asyncio.run(scenario())
+    assert pool.events == ["execute", "begin", "execute", "execute", "commit", "release"]
+
+
+def test_autocommit_only_never_begins(pool):
+    async def scenario():
+        async with TransactionManager() as transaction_manager:
+            await transaction_manager.autocommit_functions.connection.execute("SELECT 1")
+
+    asyncio.run(scenario())
+    assert pool.events == ["execute", "release"]
+
+
+def test_release_before_exit(pool):
+    async def scenario():
+        async with TransactionManager() as transaction_manager:
+            connection = transaction_manager.functions.connection
+            await connection.execute("DELETE FROM sessions")
+            connection.on_commit(lambda: pool.events.append("callback"))
+            await transaction_manager.release()
+            pool.events.append("handler")
+            await connection.execute("DELETE FROM sessions")
+
+    asyncio.run(scenario())
+    assert pool.events == [
+        "begin", "execute", "commit", "callback", "release",
+        "handler", "begin", "execute", "commit", "release",
+    ]